@@ -0,0 +1,8 @@
+"""
+Performance benchmarks for wbdata.
+
+Run with `python -m benchmarks`. The benchmarks run entirely offline against
+World Bank API responses recorded with `python -m benchmarks.record`, falling
+back to deterministic synthetic responses with the same structure when no
+recordings are available.
+"""
@@ -0,0 +1,98 @@
+"""
+Run the benchmark suite.
+
+Usage: python -m benchmarks [--runs N] [--filter TEXT] [--save PATH]
+    [--compare PATH] [--threshold RATIO] [--require-recordings]
+"""
+
+import argparse
+import dataclasses
+import json
+import sys
+from pathlib import Path
+
+import tabulate
+
+from . import bench_client, bench_codec, bench_dates, bench_fetcher, fixtures  # noqa: F401
+from .harness import REGISTRY, Measurement, measure
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--runs", type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument(
+        "--filter", default="", help="only run benchmarks whose name contains this"
+    )
+    parser.add_argument("--save", type=Path, help="write results to a JSON file")
+    parser.add_argument(
+        "--compare", type=Path, help="compare results with a saved JSON file"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.25,
+        help="slowdown ratio at which --compare reports a regression",
+    )
+    parser.add_argument(
+        "--require-recordings",
+        action="store_true",
+        help="fail instead of generating fixtures that have no recording",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    missing = fixtures.missing_recordings()
+    if missing:
+        print(
+            f"No recordings in {fixtures.RECORDINGS_PATH} for "
+            f"{', '.join(missing)}; record them with `python -m benchmarks.record` "
+            "(or `--testserver` to record offline)",
+            file=sys.stderr,
+        )
+        if args.require_recordings:
+            return 2
+        print("Using synthetic data for them instead", file=sys.stderr)
+    baseline: dict[str, dict] = {}
+    if args.compare:
+        baseline = {i["name"]: i for i in json.loads(args.compare.read_text())}
+    results: list[Measurement] = []
+    table = []
+    regressions = []
+    for bench in REGISTRY:
+        if args.filter not in bench.name:
+            continue
+        result = measure(bench, runs=args.runs)
+        results.append(result)
+        row = [
+            result.name,
+            f"{result.best * 1000:.1f}",
+            f"{result.median * 1000:.1f}",
+            f"{result.allocated_blocks:,}",
+            f"{result.peak_bytes / 2**20:.1f}",
+        ]
+        if args.compare:
+            old = baseline.get(result.name)
+            ratio = result.best / old["best"] if old else None
+            row.append("" if ratio is None else f"{ratio:.2f}x")
+            if ratio and ratio > args.threshold:
+                regressions.append(result.name)
+        table.append(row)
+        print(f"Finished {result.name}", file=sys.stderr)
+    headers = ["benchmark", "best (ms)", "median (ms)", "live blocks", "peak (MiB)"]
+    if args.compare:
+        headers.append("vs. baseline")
+    print(tabulate.tabulate(table, headers=headers, tablefmt="simple"))
+    if args.save:
+        args.save.write_text(
+            json.dumps([dataclasses.asdict(i) for i in results], indent=2)
+        )
+    if regressions:
+        print(f"Regressions: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
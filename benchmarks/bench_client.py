@@ -0,0 +1,292 @@
+"""
+Benchmarks for the client, including conversion to pandas
+"""
+
+import concurrent.futures
+import csv
+import dataclasses
+import io
+import tempfile
+from unittest import mock
+
+from wbdata import metadata, store
+
+from . import fixtures
+from .harness import benchmark
+
+DATAFRAME_INDICATORS = ("NY.GDP.MKTP.CD", "NY.GDP.PCAP.CD", "SP.POP.TOTL")
+
+
+@benchmark("client")
+def get_data_cold_annual():
+    fixture_client = fixtures.make_client(fixtures.annual_all_countries())
+    return lambda: fixture_client.get_data(fixtures.ANNUAL_INDICATOR)
+
+
+@benchmark("client")
+def get_data_warm_annual():
+    fixture_client = fixtures.make_client(fixtures.annual_all_countries(), warm=True)
+    return lambda: fixture_client.get_data(fixtures.ANNUAL_INDICATOR)
+
+
+@benchmark("client")
+def get_data_warm_annual_compact():
+    fixture_client = fixtures.make_client(fixtures.annual_all_countries(), warm=True)
+    return lambda: fixture_client.get_data(fixtures.ANNUAL_INDICATOR, compact=True)
+
+
+@benchmark("client")
+def get_series_warm_annual():
+    fixture_client = fixtures.make_client(fixtures.annual_all_countries(), warm=True)
+    return lambda: fixture_client.get_series(fixtures.ANNUAL_INDICATOR)
+
+
+@benchmark("client")
+def get_series_conversion_annual():
+    """Only the conversion of already fetched rows to a pandas Series"""
+    fixture = fixtures.annual_all_countries()
+    rows = fixtures.make_fetcher(fixture).fetch(fixture.url, fixture.params)
+    fixture_client = fixtures.make_client()
+    fixture_client.get_data = mock.Mock(return_value=rows)
+    return lambda: fixture_client.get_series(fixtures.ANNUAL_INDICATOR)
+
+
+@benchmark("client")
+def get_series_warm_annual_parse_dates():
+    fixture_client = fixtures.make_client(fixtures.annual_all_countries(), warm=True)
+    return lambda: fixture_client.get_series(
+        fixtures.ANNUAL_INDICATOR, parse_dates=True
+    )
+
+
+@benchmark("client")
+def get_series_warm_annual_periods():
+    fixture_client = fixtures.make_client(fixtures.annual_all_countries(), warm=True)
+    return lambda: fixture_client.get_series(
+        fixtures.ANNUAL_INDICATOR, parse_dates=True, periods=True
+    )
+
+
+@benchmark("client")
+def get_series_warm_monthly():
+    fixture = fixtures.monthly_series()
+    fixture_client = fixtures.make_client(fixture, warm=True)
+    return lambda: fixture_client.get_series(
+        fixtures.MONTHLY_INDICATOR,
+        date=fixtures.MONTHLY_DATES,
+        freq="M",
+        source=fixtures.MONTHLY_SOURCE,
+    )
+
+
+def _dataframe_client():
+    annual = fixtures.annual_all_countries()
+    return fixtures.make_client(
+        *(
+            dataclasses.replace(
+                annual, url=annual.url.replace(fixtures.ANNUAL_INDICATOR, indicator)
+            )
+            for indicator in DATAFRAME_INDICATORS
+        ),
+        warm=True,
+    )
+
+
+@benchmark("client")
+def get_dataframe_warm_annual():
+    fixture_client = _dataframe_client()
+    return lambda: fixture_client.get_dataframe(
+        {indicator: indicator for indicator in DATAFRAME_INDICATORS}
+    )
+
+
+@benchmark("client")
+def get_series_warm_annual_polars():
+    fixture_client = fixtures.make_client(fixtures.annual_all_countries(), warm=True)
+    return lambda: fixture_client.get_series(
+        fixtures.ANNUAL_INDICATOR, backend="polars"
+    )
+
+
+@benchmark("client")
+def get_dataframe_warm_annual_polars():
+    fixture_client = _dataframe_client()
+    return lambda: fixture_client.get_dataframe(
+        {indicator: indicator for indicator in DATAFRAME_INDICATORS},
+        backend="polars",
+    )
+
+
+@benchmark("client")
+def get_table_warm_annual():
+    fixture_client = fixtures.make_client(fixtures.annual_all_countries(), warm=True)
+    return lambda: fixture_client.get_table(fixtures.ANNUAL_INDICATOR)
+
+
+@benchmark("client")
+def export_parquet_warm_annual():
+    fixture_client = _dataframe_client()
+    path = tempfile.mkdtemp(prefix="wbdata-benchmarks-")
+    return lambda: fixture_client.export_parquet(DATAFRAME_INDICATORS, path)
+
+
+@benchmark("client")
+def dataframe_to_parquet_warm_annual():
+    """The pandas route to the same files as `export_parquet_warm_annual`"""
+    fixture_client = _dataframe_client()
+    path = tempfile.mkdtemp(prefix="wbdata-benchmarks-")
+    return lambda: fixture_client.get_dataframe(
+        {indicator: indicator for indicator in DATAFRAME_INDICATORS}
+    ).to_parquet(f"{path}/data.parquet")
+
+
+@benchmark("client")
+def get_indicators_query_warm():
+    fixture_client = fixtures.make_client(fixtures.indicator_catalog(), warm=True)
+    return lambda: fixture_client.get_indicators(query="ar.*be")
+
+
+@benchmark("client")
+def search_indicators_warm():
+    fixture_client = fixtures.make_client(fixtures.indicator_catalog(), warm=True)
+    fixture_client.search_indicators("ar")
+    return lambda: fixture_client.search_indicators("ar be*")
+
+
+@benchmark("client")
+def search_indicators_load_index():
+    """Loading the saved index in a new process, then searching"""
+    fixture_client = fixtures.make_client(fixtures.indicator_catalog(), warm=True)
+    fixture_client.search_indicators("ar")
+
+    def run():
+        fixture_client._search_index = None
+        return fixture_client.search_indicators("ar be*")
+
+    return run
+
+
+@benchmark("client")
+def get_countries_filter_warm():
+    fixture_client = fixtures.make_client(fixtures.country_list())
+    fixture_client.get_countries(incomelevel="HIC", query="ka")
+    return lambda: fixture_client.get_countries(incomelevel="HIC", query="ka")
+
+
+@benchmark("client")
+def get_countries_filter_local_metadata():
+    fixture_client = fixtures.make_client(fixtures.country_list())
+    fixture_client.metadata = metadata.Metadata(load=fixture_client._load_metadata)
+    fixture_client.get_countries(incomelevel="HIC", query="ka")
+    return lambda: fixture_client.get_countries(incomelevel="HIC", query="ka")
+
+
+def _store_client():
+    """A client with the annual fixture ingested into a local data store"""
+    fixture = fixtures.annual_all_countries()
+    rows = fixtures.make_fetcher(fixture).fetch(fixture.url, fixture.params)
+    dates = sorted({row["date"] for row in rows})
+    values = {(row["countryiso3code"], row["date"]): row["value"] for row in rows}
+    countries = {row["countryiso3code"]: row["country"]["value"] for row in rows}
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(
+        ["Country Name", "Country Code", "Indicator Name", "Indicator Code", *dates]
+    )
+    for code, name in countries.items():
+        writer.writerow(
+            [
+                name,
+                code,
+                rows[0]["indicator"]["value"],
+                fixtures.ANNUAL_INDICATOR,
+                *("" if values[code, i] is None else values[code, i] for i in dates),
+            ]
+        )
+    data_store = store.DataStore(tempfile.mkdtemp(prefix="wbdata-store-"))
+    data_store.ingest(io.BytesIO(output.getvalue().encode()), source=2)
+    fixture_client = fixtures.make_client(fixture, warm=True)
+    fixture_client.store = data_store
+    return fixture_client
+
+
+@benchmark("client")
+def get_data_store_annual():
+    fixture_client = _store_client()
+    return lambda: fixture_client.get_data(fixtures.ANNUAL_INDICATOR)
+
+
+@benchmark("client")
+def get_series_store_annual():
+    fixture_client = _store_client()
+    return lambda: fixture_client.get_series(fixtures.ANNUAL_INDICATOR)
+
+
+def _subset_countries() -> list[str]:
+    """Three of the countries in the annual fixture"""
+    fixture = fixtures.annual_all_countries()
+    rows = fixtures.make_fetcher(fixture).fetch(fixture.url, fixture.params)
+    return sorted({row["countryiso3code"] for row in rows})[:3]
+
+
+@benchmark("client")
+def get_data_sqlite_store_annual():
+    fixture_client = fixtures.make_client(fixtures.annual_all_countries(), warm=True)
+    fixture_client.store = store.SQLiteStore(":memory:")
+    fixture_client.get_data(fixtures.ANNUAL_INDICATOR)
+    return lambda: fixture_client.get_data(fixtures.ANNUAL_INDICATOR)
+
+
+@benchmark("client")
+def get_data_sqlite_store_subset():
+    """A few countries and years, answered from a store filled by a query for all"""
+    fixture_client = fixtures.make_client(fixtures.annual_all_countries(), warm=True)
+    fixture_client.store = store.SQLiteStore(":memory:")
+    fixture_client.get_data(fixtures.ANNUAL_INDICATOR)
+    countries = _subset_countries()
+    return lambda: fixture_client.get_data(
+        fixtures.ANNUAL_INDICATOR, country=countries, date=("2000", "2010")
+    )
+
+
+@benchmark("client")
+def get_data_covered_subset():
+    """A few countries and years, selected from a cached query for all"""
+    fixture_client = fixtures.make_client(fixtures.annual_all_countries(), warm=True)
+    countries = _subset_countries()
+    return lambda: fixture_client.get_data(
+        fixtures.ANNUAL_INDICATOR, country=countries, date=("2000", "2010")
+    )
+
+
+THREADED_CALLS = 32
+
+
+@benchmark("client")
+def get_data_warm_annual_sequential():
+    """`THREADED_CALLS` cache hits on a cache on disk, one after another"""
+    fixture_client = fixtures.make_client(
+        fixtures.annual_all_countries(), warm=True, disk=True
+    )
+    return lambda: [
+        fixture_client.get_data(fixtures.ANNUAL_INDICATOR, compact=True)
+        for _ in range(THREADED_CALLS)
+    ]
+
+
+@benchmark("client")
+def get_data_warm_annual_threaded():
+    """
+    `THREADED_CALLS` cache hits on a cache on disk, from a pool of 8 threads
+    sharing a client
+    """
+    fixture_client = fixtures.make_client(
+        fixtures.annual_all_countries(), warm=True, disk=True
+    )
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=8)
+    return lambda: list(
+        executor.map(
+            lambda _: fixture_client.get_data(fixtures.ANNUAL_INDICATOR, compact=True),
+            range(THREADED_CALLS),
+        )
+    )
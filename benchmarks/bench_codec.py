@@ -0,0 +1,50 @@
+"""
+Benchmarks comparing the installed JSON codecs
+
+A benchmark is registered for each codec that can be imported, so the results
+only include orjson and msgspec where they are installed.
+"""
+
+from wbdata import codec, fetcher
+
+from . import fixtures
+from .harness import benchmark
+
+
+def _installed() -> list[str]:
+    return [
+        name
+        for name in codec.CODECS
+        if name == "json" or getattr(codec, name) is not None
+    ]
+
+
+def _register(name: str) -> None:
+    @benchmark("codec", name=f"decode_annual_{name}")
+    def decode_annual():
+        pages = fixtures.annual_all_countries().pages
+        page_codec = codec.get_codec(name)
+        return lambda: [
+            fetcher.ParsedResponse.from_response(page_codec.decode_page(page))
+            for page in pages
+        ]
+
+    @benchmark("codec", name=f"decode_catalog_{name}")
+    def decode_catalog():
+        pages = fixtures.indicator_catalog().pages
+        page_codec = codec.get_codec(name)
+        return lambda: [
+            fetcher.ParsedResponse.from_response(page_codec.decode_page(page))
+            for page in pages
+        ]
+
+    @benchmark("codec", name=f"fetch_warm_annual_{name}")
+    def fetch_warm_annual():
+        fixture = fixtures.annual_all_countries()
+        fixture_fetcher = fixtures.make_fetcher(fixture, warm=True)
+        fixture_fetcher.codec = codec.get_codec(name)
+        return lambda: fixture_fetcher.fetch(fixture.url, fixture.params)
+
+
+for _name in _installed():
+    _register(_name)
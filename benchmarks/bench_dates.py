@@ -0,0 +1,38 @@
+"""
+Benchmarks for date parsing
+"""
+
+from wbdata import dates
+
+from . import fixtures
+from .harness import benchmark
+
+
+def _rows(fixture: fixtures.Fixture):
+    return fixtures.make_fetcher(fixture).fetch(fixture.url, fixture.params)
+
+
+@benchmark("dates")
+def parse_row_dates_annual():
+    data = _rows(fixtures.annual_all_countries())
+    return lambda: dates.parse_row_dates(data)
+
+
+@benchmark("dates")
+def parse_row_dates_monthly():
+    data = _rows(fixtures.monthly_series())
+    return lambda: dates.parse_row_dates(data)
+
+
+@benchmark("dates")
+def parse_date_index_annual():
+    data = _rows(fixtures.annual_all_countries())
+    values = [row["date"] for row in data]
+    return lambda: dates.parse_date_index(values)
+
+
+@benchmark("dates")
+def parse_date_index_monthly_periods():
+    data = _rows(fixtures.monthly_series())
+    values = [row["date"] for row in data]
+    return lambda: dates.parse_date_index(values, periods=True)
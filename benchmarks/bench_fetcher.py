@@ -0,0 +1,108 @@
+"""
+Benchmarks for retrieving and parsing paged responses
+"""
+
+import json
+
+from wbdata import cache, client, fetcher
+
+from . import fixtures
+from .harness import benchmark
+
+
+@benchmark("fetcher")
+def fetch_cold_annual():
+    fixture = fixtures.annual_all_countries()
+    fixture_fetcher = fixtures.make_fetcher(fixture)
+    return lambda: fixture_fetcher.fetch(fixture.url, fixture.params)
+
+
+def _disk_cache_fetcher(write_behind: bool) -> fetcher.Fetcher:
+    fixture_fetcher = fixtures.make_fetcher(fixtures.annual_all_countries())
+    fixture_fetcher.cache = cache.get_cache(path=fixtures.cache_path())
+    if write_behind:
+        fixture_fetcher.cache = cache.WriteBehindCache(fixture_fetcher.cache)
+    return fixture_fetcher
+
+
+@benchmark("fetcher")
+def fetch_cold_annual_disk_cache():
+    """Every page is written to the persistent cache as it is fetched"""
+    fixture = fixtures.annual_all_countries()
+    fixture_fetcher = _disk_cache_fetcher(write_behind=False)
+    return lambda: fixture_fetcher.fetch(fixture.url, fixture.params)
+
+
+@benchmark("fetcher")
+def fetch_cold_annual_write_behind():
+    """Pages are written to the persistent cache by a background thread"""
+    fixture = fixtures.annual_all_countries()
+    fixture_fetcher = _disk_cache_fetcher(write_behind=True)
+    return lambda: fixture_fetcher.fetch(fixture.url, fixture.params)
+
+
+@benchmark("fetcher")
+def fetch_cold_annual_streamed():
+    fixture = fixtures.annual_all_countries()
+    fixture_fetcher = fixtures.make_fetcher(fixture, stream=True)
+    return lambda: fixture_fetcher.fetch(fixture.url, fixture.params)
+
+
+@benchmark("fetcher")
+def fetch_cold_annual_streamed_compact():
+    fixture = fixtures.annual_all_countries()
+    fixture_fetcher = fixtures.make_fetcher(fixture, stream=True)
+    return lambda: fixture_fetcher.fetch(fixture.url, fixture.params, compact=True)
+
+
+@benchmark("fetcher")
+def fetch_cold_annual_compact():
+    fixture = fixtures.annual_all_countries()
+    fixture_fetcher = fixtures.make_fetcher(fixture)
+    return lambda: fixture_fetcher.fetch(fixture.url, fixture.params, compact=True)
+
+
+@benchmark("fetcher")
+def fetch_warm_annual():
+    fixture = fixtures.annual_all_countries()
+    fixture_fetcher = fixtures.make_fetcher(fixture, warm=True)
+    return lambda: fixture_fetcher.fetch(fixture.url, fixture.params)
+
+
+@benchmark("fetcher")
+def fetch_warm_monthly():
+    fixture = fixtures.monthly_series()
+    fixture_fetcher = fixtures.make_fetcher(fixture, warm=True)
+    return lambda: fixture_fetcher.fetch(fixture.url, fixture.params)
+
+
+@benchmark("fetcher")
+def fetch_warm_catalog():
+    fixture = fixtures.indicator_catalog()
+    fixture_fetcher = fixtures.make_fetcher(fixture, warm=True)
+    return lambda: fixture_fetcher.fetch(fixture.url, fixture.params)
+
+
+@benchmark("fetcher")
+def parse_response_annual():
+    pages = fixtures.annual_all_countries().pages
+    return lambda: [
+        fetcher.ParsedResponse.from_response(tuple(json.loads(page))) for page in pages
+    ]
+
+
+@benchmark("fetcher")
+def disk_cache_misses():
+    """The cache lookups a fetch makes before requesting each of 100 pages"""
+    shared = cache.get_cache(path=fixtures.cache_path())
+    shared["other"] = "entry"
+    url = f"{client.COUNTRIES_URL}/all/indicators/NOT.CACHED"
+    keys = [fetcher.cache_key(url, {"format": "json", "page": i}) for i in range(100)]
+
+    def look_up():
+        for key in keys:
+            _ = key in shared
+            shared.get(fetcher._error_key(key))
+            shared.get(key)
+
+    return look_up
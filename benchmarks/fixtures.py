@@ -0,0 +1,379 @@
+"""
+World Bank API responses used to drive the benchmarks.
+
+Each fixture is a multi-page API response. If a recording made with
+`python -m benchmarks.record` exists in the `recordings` directory it is used;
+otherwise a deterministic synthetic response with the same structure, page
+layout and approximate size as the real API is generated. `missing_recordings`
+lists the fixtures that would be generated, so that runs that must use
+recordings, such as in CI, can refuse to fall back. Recordings can also be
+made offline from a `wbdata.testserver` stand-in serving `STAND_IN_DATASET`.
+"""
+
+import dataclasses
+import functools
+import gzip
+import json
+import random
+import string
+import tempfile
+from pathlib import Path
+from typing import Any, cast
+
+import requests
+
+from wbdata import client, fetcher, testserver
+
+RECORDINGS_PATH = Path(__file__).parent / "recordings"
+LAST_UPDATED = "2024-06-28"
+N_ECONOMIES = 217
+N_AGGREGATES = 49
+
+_CACHE_DIR = tempfile.TemporaryDirectory(prefix="wbdata-benchmarks-")
+
+
+@dataclasses.dataclass
+class Fixture:
+    """
+    A recorded or generated multi-page API response.
+
+    Parameters:
+        name: the name of the fixture
+        url: the url of the query
+        params: the parameters of the query, excluding paging and format
+        pages: the response body for each page, in order
+    """
+
+    name: str
+    url: str
+    params: dict[str, Any]
+    pages: list[str]
+
+    @property
+    def size(self) -> int:
+        """Total size of the response bodies in characters"""
+        return sum(len(page) for page in self.pages)
+
+
+class FixtureResponse:
+    def __init__(self, text: str):
+        self.text = text
+        self.status_code = 200
+        self.encoding = "utf-8"
+
+    def iter_content(self, chunk_size: int, decode_unicode: bool = False):
+        for i in range(0, len(self.text), chunk_size):
+            yield self.text[i : i + chunk_size]
+
+
+class FixtureSession:
+    """
+    A stand-in for `requests.Session` that serves fixture pages.
+
+    Parameters:
+        fixtures: the fixtures to serve
+    """
+
+    def __init__(self, *fixtures: Fixture):
+        self.pages = {fixture.url: fixture.pages for fixture in fixtures}
+        self.requests = 0
+
+    def get(self, url: str, params: dict[str, Any], **kwargs) -> FixtureResponse:
+        self.requests += 1
+        return FixtureResponse(self.pages[url][int(params.get("page", 1)) - 1])
+
+
+def _indicator_code(rng: random.Random, used: set[str]) -> str:
+    while True:
+        code = ".".join(
+            "".join(rng.choices(string.ascii_uppercase, k=rng.randint(2, 4)))
+            for _ in range(rng.randint(2, 4))
+        )
+        if code not in used:
+            used.add(code)
+            return code
+
+
+@functools.cache
+def countries() -> list[dict[str, str]]:
+    """Generate a stable list of economies and aggregates"""
+    rng = random.Random(0)
+    iso2: set[str] = set()
+    iso3: set[str] = set()
+    return [
+        {
+            "id": testserver.random_code(rng, 2, iso2),
+            "iso3": testserver.random_code(rng, 3, iso3),
+            "value": testserver.random_name(rng, rng.randint(1, 3)),
+        }
+        for _ in range(N_ECONOMIES + N_AGGREGATES)
+    ]
+
+
+def _paginate(rows: list[dict[str, Any]], header: dict[str, Any]) -> list[str]:
+    per_page = fetcher.PER_PAGE
+    pages = max(1, -(-len(rows) // per_page))
+    return [
+        json.dumps(
+            [
+                {
+                    "page": page + 1,
+                    "pages": pages,
+                    "per_page": per_page,
+                    "total": len(rows),
+                    **header,
+                },
+                rows[page * per_page : (page + 1) * per_page],
+            ]
+        )
+        for page in range(pages)
+    ]
+
+
+def _observations(
+    indicator: dict[str, str], dates: list[str], seed: int
+) -> list[dict[str, Any]]:
+    rng = random.Random(seed)
+    return [
+        {
+            "indicator": indicator,
+            "country": {"id": country["id"], "value": country["value"]},
+            "countryiso3code": country["iso3"],
+            "date": date,
+            "value": None if rng.random() < 0.2 else round(rng.lognormvariate(20, 3)),
+            "unit": "",
+            "obs_status": "",
+            "decimal": 0,
+        }
+        for country in countries()
+        for date in dates
+    ]
+
+
+def _recording_path(name: str) -> Path:
+    return RECORDINGS_PATH / f"{name}.json.gz"
+
+
+def _load_recording(name: str) -> Fixture | None:
+    path = _recording_path(name)
+    if not path.exists():
+        return None
+    with gzip.open(path, "rt") as inf:
+        return Fixture(**json.load(inf))
+
+
+def save_recording(fixture: Fixture) -> Path:
+    """Write a fixture to the recordings directory"""
+    RECORDINGS_PATH.mkdir(exist_ok=True)
+    path = _recording_path(fixture.name)
+    with gzip.open(path, "wt") as outf:
+        json.dump(dataclasses.asdict(fixture), outf)
+    return path
+
+
+ANNUAL_INDICATOR = "NY.GDP.MKTP.CD"
+MONTHLY_INDICATOR = "DPANUSSPB"
+MONTHLY_SOURCE = 15
+MONTHLY_DATES = ("2014M01", "2023M12")
+
+#: A stand-in dataset with the fixtures' indicators, sized like the API
+STAND_IN_DATASET = testserver.Dataset(
+    n_countries=N_ECONOMIES,
+    n_indicators=21000,
+    named_indicators=(
+        (ANNUAL_INDICATOR, "GDP (current US$)", "2"),
+        (
+            MONTHLY_INDICATOR,
+            "Exchange rate, new LCU per USD extended backward, period average",
+            str(MONTHLY_SOURCE),
+        ),
+    ),
+)
+
+
+@functools.cache
+def annual_all_countries() -> Fixture:
+    """A yearly indicator for all countries and aggregates, 1960-2023"""
+    url = f"{client.COUNTRIES_URL}/all/indicators/{ANNUAL_INDICATOR}"
+    recorded = _load_recording("annual_all_countries")
+    if recorded:
+        return recorded
+    indicator = {"id": ANNUAL_INDICATOR, "value": "GDP (current US$)"}
+    dates = [str(year) for year in range(2023, 1959, -1)]
+    return Fixture(
+        name="annual_all_countries",
+        url=url,
+        params={},
+        pages=_paginate(
+            _observations(indicator, dates, seed=1),
+            {"sourceid": "2", "lastupdated": LAST_UPDATED},
+        ),
+    )
+
+
+@functools.cache
+def monthly_series() -> Fixture:
+    """A monthly indicator for all countries over ten years"""
+    url = f"{client.COUNTRIES_URL}/all/indicators/{MONTHLY_INDICATOR}"
+    recorded = _load_recording("monthly_series")
+    if recorded:
+        return recorded
+    indicator = {
+        "id": MONTHLY_INDICATOR,
+        "value": "Exchange rate, new LCU per USD extended backward, period average",
+    }
+    dates = [
+        f"{year}M{month:02d}"
+        for year in range(2023, 2013, -1)
+        for month in range(12, 0, -1)
+    ]
+    return Fixture(
+        name="monthly_series",
+        url=url,
+        params={"date": ":".join(MONTHLY_DATES), "source": MONTHLY_SOURCE},
+        pages=_paginate(
+            _observations(indicator, dates, seed=2),
+            {"sourceid": str(MONTHLY_SOURCE), "lastupdated": LAST_UPDATED},
+        ),
+    )
+
+
+@functools.cache
+def indicator_catalog() -> Fixture:
+    """The full indicator catalog"""
+    recorded = _load_recording("indicator_catalog")
+    if recorded:
+        return recorded
+    rng = random.Random(3)
+    used: set[str] = set()
+    topics = [
+        {"id": str(i), "value": testserver.random_name(rng, 3) + " "}
+        for i in range(1, 22)
+    ]
+    sources = [
+        {"id": str(i), "value": testserver.random_name(rng, 4)} for i in range(1, 90)
+    ]
+    rows = [
+        {
+            "id": _indicator_code(rng, used),
+            "name": testserver.random_name(rng, rng.randint(3, 10)),
+            "unit": "",
+            "source": rng.choice(sources),
+            "sourceNote": " ".join(
+                testserver.random_name(rng, 1) for _ in range(rng.randint(10, 80))
+            ),
+            "sourceOrganization": testserver.random_name(rng, rng.randint(2, 8)),
+            "topics": rng.sample(topics, k=rng.randint(0, 3)),
+        }
+        for _ in range(21000)
+    ]
+    return Fixture(
+        name="indicator_catalog",
+        url=client.INDICATOR_URL,
+        params={},
+        pages=_paginate(rows, {}),
+    )
+
+
+@functools.cache
+def country_list() -> Fixture:
+    """The list of economies and aggregates"""
+    recorded = _load_recording("country_list")
+    if recorded:
+        return recorded
+    rng = random.Random(4)
+
+    def code(id_: str, value: str) -> dict[str, str]:
+        return {"id": id_, "iso2code": id_[:2], "value": value}
+
+    regions = [
+        code(i, testserver.random_name(rng, 3))
+        for i in ("EAS", "ECS", "LCN", "MEA", "NAC")
+    ]
+    incomes = [
+        code(i, testserver.random_name(rng, 2)) for i in ("HIC", "UMC", "LMC", "LIC")
+    ]
+    lending = [
+        code(i, testserver.random_name(rng, 2)) for i in ("IBD", "IDB", "IDX", "LNX")
+    ]
+    rows = [
+        {
+            "id": country["iso3"],
+            "iso2Code": country["id"],
+            "name": country["value"],
+            "region": rng.choice(regions),
+            "adminregion": {"id": "", "iso2code": "", "value": ""},
+            "incomeLevel": rng.choice(incomes),
+            "lendingType": rng.choice(lending),
+            "capitalCity": testserver.random_name(rng, 1),
+            "longitude": str(round(rng.uniform(-180, 180), 4)),
+            "latitude": str(round(rng.uniform(-90, 90), 4)),
+        }
+        for country in countries()
+    ]
+    return Fixture(
+        name="country_list",
+        url=client.COUNTRIES_URL,
+        params={},
+        pages=_paginate(rows, {}),
+    )
+
+
+ALL = (annual_all_countries, monthly_series, indicator_catalog, country_list)
+
+
+def missing_recordings() -> list[str]:
+    """List the fixtures that have no recording, so are synthetic"""
+    return [i.__name__ for i in ALL if not _recording_path(i.__name__).exists()]
+
+
+def cache_path() -> str:
+    """Make a path for a new, empty cache in the benchmarks' directory"""
+    return tempfile.mkdtemp(dir=_CACHE_DIR.name) + "/cache"
+
+
+def make_fetcher(
+    *fixtures: Fixture, warm: bool = False, stream: bool = False
+) -> fetcher.Fetcher:
+    """
+    Create a fetcher with an in-memory cache serving fixtures
+
+    Parameters:
+        fixtures: the fixtures to serve
+        warm: if True, fetch every fixture once so the cache is populated
+        stream: if True, decode responses incrementally
+    """
+    session = cast(requests.Session, FixtureSession(*fixtures))
+    fixture_fetcher = fetcher.Fetcher(cache={}, session=session, stream=stream)
+    if warm:
+        for fixture in fixtures:
+            fixture_fetcher.fetch(fixture.url, fixture.params)
+    return fixture_fetcher
+
+
+def make_client(
+    *fixtures: Fixture, warm: bool = False, disk: bool = False
+) -> client.Client:
+    """
+    Create a client with an in-memory cache serving fixtures
+
+    Parameters:
+        fixtures: the fixtures to serve
+        warm: if True, fetch every fixture once so the cache is populated
+        disk: if True, keep the client's own cache, in a new file on disk,
+            instead of the in-memory cache
+    """
+    if disk:
+        fixture_client = client.Client(cache_path=cache_path())
+        fixture_client.fetcher.session = cast(
+            requests.Session, FixtureSession(*fixtures)
+        )
+        if warm:
+            for fixture in fixtures:
+                fixture_client.fetcher.fetch(fixture.url, fixture.params)
+        return fixture_client
+    fixture_client = client.Client(cache_path=_CACHE_DIR.name + "/cache")
+    fixture_fetcher = make_fetcher(*fixtures, warm=warm)
+    fixture_client.fetcher.cache = fixture_fetcher.cache
+    fixture_client.fetcher.session = fixture_fetcher.session
+    return fixture_client
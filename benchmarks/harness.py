@@ -0,0 +1,123 @@
+"""
+Measurement and registration helpers for benchmarks
+"""
+
+import dataclasses
+import gc
+import statistics
+import time
+import tracemalloc
+from collections.abc import Callable
+from typing import Any
+
+Setup = Callable[[], Callable[[], Any]]
+
+
+@dataclasses.dataclass
+class Benchmark:
+    """
+    A registered benchmark.
+
+    Parameters:
+        name: the name of the benchmark
+        group: the group the benchmark belongs to, used for filtering
+        setup: a callable that prepares state and returns the callable to time
+    """
+
+    name: str
+    group: str
+    setup: Setup
+
+
+@dataclasses.dataclass
+class Measurement:
+    """
+    The results of running a benchmark.
+
+    Parameters:
+        name: the name of the benchmark
+        best: fastest wall time of a single run, in seconds
+        median: median wall time of a single run, in seconds
+        runs: number of timed runs
+        allocated_blocks: memory blocks allocated by one run and still alive
+            when it returned
+        peak_bytes: peak memory traced during one run
+    """
+
+    name: str
+    best: float
+    median: float
+    runs: int
+    allocated_blocks: int
+    peak_bytes: int
+
+
+REGISTRY: list[Benchmark] = []
+
+
+def benchmark(group: str, name: str | None = None) -> Callable[[Setup], Setup]:
+    """
+    Register a benchmark setup function.
+
+    The decorated function is called before every run and must return a
+    zero-argument callable; only that callable is measured.
+
+    Parameters:
+        group: the group of the benchmark
+        name: the name of the benchmark, defaults to the function name
+    """
+
+    def decorator(setup: Setup) -> Setup:
+        setup_name = name or getattr(setup, "__name__", repr(setup))
+        REGISTRY.append(
+            Benchmark(name=f"{group}.{setup_name}", group=group, setup=setup)
+        )
+        return setup
+
+    return decorator
+
+
+def measure(bench: Benchmark, runs: int = 5) -> Measurement:
+    """
+    Time a benchmark and measure its memory use.
+
+    Wall times are measured without tracing. Memory is measured in a separate
+    run with `tracemalloc`, since tracing slows down execution considerably.
+
+    Parameters:
+        bench: the benchmark to run
+        runs: the number of timed runs
+
+    Returns:
+        the measurement for the benchmark
+    """
+    timings = []
+    for _ in range(runs):
+        func = bench.setup()
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    func = bench.setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        result = func()
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    del result
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+    return Measurement(
+        name=bench.name,
+        best=min(timings),
+        median=statistics.median(timings),
+        runs=runs,
+        allocated_blocks=blocks,
+        peak_bytes=peak - base,
+    )
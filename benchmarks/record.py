@@ -0,0 +1,78 @@
+"""
+Record World Bank API responses for use as benchmark fixtures.
+
+Run with `python -m benchmarks.record` while online. Recordings are written to
+`benchmarks/recordings` and take precedence over the synthetic fixtures.
+
+With `--testserver`, the responses are recorded offline from a
+`wbdata.testserver` stand-in serving `fixtures.STAND_IN_DATASET`, which has
+the fixtures' indicators and is sized like the API. The CI benchmarks job
+records these before it runs the benchmarks with `--require-recordings`.
+"""
+
+import argparse
+import json
+
+import requests
+
+from wbdata import client, fetcher, testserver
+
+from . import fixtures
+
+
+def record(
+    fixture: fixtures.Fixture, session: requests.Session, base_url: str | None = None
+) -> fixtures.Fixture:
+    """
+    Download every page of the query described by a fixture
+
+    Parameters:
+        fixture: the fixture to record
+        session: the session to make requests with
+        base_url: the root url to request in place of `client.BASE_URL`, such
+            as a stand-in server's
+    """
+    url = fixture.url
+    if base_url is not None:
+        url = base_url + url.removeprefix(client.BASE_URL)
+    params = {**fixture.params, "format": "json", "per_page": fetcher.PER_PAGE}
+    pages: list[str] = []
+    page, n_pages = 0, 1
+    while page < n_pages:
+        params["page"] = page + 1
+        response = session.get(url, params=params)
+        response.raise_for_status()
+        pages.append(response.text)
+        header = json.loads(response.text)[0]
+        page, n_pages = int(header["page"]), int(header["pages"])
+    return fixtures.Fixture(
+        name=fixture.name, url=fixture.url, params=fixture.params, pages=pages
+    )
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.record")
+    parser.add_argument(
+        "--testserver",
+        action="store_true",
+        help="record from a local wbdata.testserver instead of the API",
+    )
+    args = parser.parse_args(argv)
+    session = requests.Session()
+    server = None
+    if args.testserver:
+        server = testserver.StandInServer(dataset=fixtures.STAND_IN_DATASET).start()
+    try:
+        for make_fixture in fixtures.ALL:
+            recorded = record(
+                make_fixture(), session, server.base_url if server else None
+            )
+            path = fixtures.save_recording(recorded)
+            print(f"Recorded {len(recorded.pages)} pages to {path}")
+    finally:
+        if server is not None:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
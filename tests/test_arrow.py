@@ -0,0 +1,138 @@
+import datetime as dt
+from unittest import mock
+
+import pytest
+
+from wbdata import arrow, client, fetcher
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def observation(country, date, value, indicator="FOO"):
+    return {
+        "indicator": {"id": indicator, "value": indicator.title()},
+        "country": {"id": country[:2], "value": country},
+        "countryiso3code": country[:3].upper(),
+        "date": date,
+        "value": value,
+        "unit": "",
+        "obs_status": "",
+        "decimal": 1,
+    }
+
+
+@pytest.fixture
+def observations():
+    return fetcher.CompactResult(
+        [
+            observation("usa", "2023", 5.5),
+            observation("usa", "2022", None),
+            observation("gbr", "2023", 3),
+        ],
+        last_updated=dt.datetime(2023, 2, 1),
+    )
+
+
+def test_to_table(observations):
+    table = arrow.to_table(observations)
+    assert table.column_names == list(arrow.COLUMNS)
+    assert table.schema.metadata == {b"last_updated": b"2023-02-01"}
+    for name in arrow.DICTIONARY_COLUMNS:
+        assert pa.types.is_dictionary(table.schema.field(name).type)
+    assert table.schema.field("date").type == pa.date32()
+    assert table.schema.field("value").type == pa.float64()
+    assert table.column("country").to_pylist() == ["us", "us", "gb"]
+    assert table.column("country_name").to_pylist() == ["usa", "usa", "gbr"]
+    assert table.column("date").to_pylist() == [
+        dt.date(2023, 1, 1),
+        dt.date(2022, 1, 1),
+        dt.date(2023, 1, 1),
+    ]
+    assert table.column("value").to_pylist() == [5.5, None, 3.0]
+    assert table.column("decimal").to_pylist() == [1, 1, 1]
+
+
+@pytest.mark.parametrize(
+    ["row_dates", "expected_type", "expected"],
+    [
+        pytest.param(
+            ["2023M01", "2023M02"],
+            pa.date32(),
+            [dt.date(2023, 1, 1), dt.date(2023, 2, 1)],
+            id="monthly",
+        ),
+        pytest.param(
+            ["2023Q1", "2023Q4"],
+            pa.date32(),
+            [dt.date(2023, 1, 1), dt.date(2023, 10, 1)],
+            id="quarterly",
+        ),
+        pytest.param(
+            ["2023", "2000-2010"],
+            pa.string(),
+            ["2023", "2000-2010"],
+            id="unparseable",
+        ),
+    ],
+)
+def test_to_table_dates(row_dates, expected_type, expected):
+    table = arrow.to_table(
+        fetcher.CompactResult(observation("usa", i, 1.0) for i in row_dates)
+    )
+    assert table.schema.field("date").type == expected_type
+    assert table.column("date").to_pylist() == expected
+
+
+def test_to_table_empty():
+    table = arrow.to_table(fetcher.CompactResult(), columns=["country", "value"])
+    assert table.num_rows == 0
+    assert table.column_names == ["country", "value"]
+    assert not table.schema.metadata
+
+
+def test_write_partition(observations, tmp_path):
+    path = arrow.write_partition(observations, tmp_path, indicator="FOO")
+    assert path == tmp_path / "indicator=FOO" / "part-0.parquet"
+    assert "indicator" not in pq.read_schema(path).names
+    table = pq.read_table(tmp_path)
+    assert table.column("indicator").to_pylist() == ["FOO"] * 3
+    assert table.column("value").to_pylist() == [5.5, None, 3.0]
+
+
+@pytest.fixture
+def mock_client():
+    with mock.patch("wbdata.client.fetcher.Fetcher", mock.Mock):
+        yield client.Client()
+
+
+def test_get_table(mock_client, observations):
+    mock_client.fetcher.fetch = mock.Mock(return_value=observations)
+    table = mock_client.get_table("FOO", country=["us", "gb"])
+    assert mock_client.fetcher.fetch.call_args.kwargs["compact"] is True
+    assert table.num_rows == 3
+
+
+def test_export_parquet(mock_client, tmp_path):
+    mock_client.fetcher.fetch = mock.Mock(
+        side_effect=[
+            fetcher.CompactResult([observation("usa", "2023", 1.0, "FOO")]),
+            fetcher.CompactResult([observation("usa", "2023", 2.0, "BAR")]),
+        ]
+    )
+    written = mock_client.export_parquet(["FOO", "BAR"], tmp_path)
+    assert written == [
+        tmp_path / "indicator=FOO" / "part-0.parquet",
+        tmp_path / "indicator=BAR" / "part-0.parquet",
+    ]
+    table = pq.read_table(tmp_path).sort_by("value")
+    assert table.column("indicator").to_pylist() == ["FOO", "BAR"]
+    assert table.column("indicator_name").to_pylist() == ["Foo", "Bar"]
+
+
+def test_needs_pyarrow(mock_client):
+    with (
+        mock.patch.object(arrow, "pa", None),
+        pytest.raises(RuntimeError, match="get_table requires pyarrow"),
+    ):
+        mock_client.get_table("FOO")
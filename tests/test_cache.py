@@ -0,0 +1,415 @@
+import concurrent.futures
+import dataclasses
+import datetime as dt
+import logging
+import multiprocessing
+import pickle
+import shelve
+import time
+from unittest import mock
+
+import cachetools
+import pytest
+
+from wbdata import cache, fetcher
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "cache")
+
+
+def test_entries_shared_between_caches(path):
+    first = cache.get_cache(path=path)
+    second = cache.get_cache(path=path)
+    first["key"] = "value"
+    assert "key" in second
+    assert second["key"] == "value"
+
+
+def test_entries_persist(path):
+    cache.get_cache(path=path)[("url", (("a", 1),))] = "value"
+    assert dict(cache.get_cache(path=path)) == {("url", (("a", 1),)): "value"}
+
+
+def test_legacy_keys_migrated(path):
+    with shelve.open(path, protocol=pickle.HIGHEST_PROTOCOL) as shelf:
+        shelf["12345"] = ("key", "value")
+    loaded = cache.get_cache(path=path)
+    assert loaded["key"] == "value"
+    with shelve.open(path) as shelf:
+        assert list(shelf) == [cache.SharedCache.hash_key("key")]
+        key, value, stored = shelf[cache.SharedCache.hash_key("key")]
+    assert (key, value) == ("key", "value")
+    assert dt.datetime.now() - stored < dt.timedelta(minutes=1)
+
+
+def test_legacy_entries_expire(path):
+    with shelve.open(path, protocol=pickle.HIGHEST_PROTOCOL) as shelf:
+        shelf["12345"] = ("key", "value")
+    cache.get_cache(path=path)
+    later = dt.datetime.now() + dt.timedelta(days=8)
+    reloaded = cache.SharedCache(
+        cachetools.TTLCache,
+        path,
+        maxsize=10,
+        ttl=dt.timedelta(days=7),
+        timer=lambda: later,
+    )
+    assert "key" not in reloaded
+    with shelve.open(path) as shelf:
+        assert len(shelf) == 0
+
+
+def test_misses_only_read_changed_shelf(path, monkeypatch):
+    shared = cache.get_cache(path=path)
+    shared["key"] = "value"
+    opened = []
+    open_shelf = cache._open_shelf
+    monkeypatch.setattr(
+        cache, "_open_shelf", lambda filename: opened.append(1) or open_shelf(filename)
+    )
+    for _ in range(3):
+        assert "missing" not in shared
+    assert not opened
+    cache.get_cache(path=path)["other"] = "value"
+    opened.clear()
+    assert shared["other"] == "value"
+    assert opened
+
+
+def test_writes_keep_shelf_open(path, monkeypatch):
+    shared = cache.get_cache(path=path)
+    shared["key"] = "value"
+    opened = []
+    open_shelf = cache._open_shelf
+    monkeypatch.setattr(
+        cache, "_open_shelf", lambda filename: opened.append(1) or open_shelf(filename)
+    )
+    shared.update({"a": 1, "b": 2})
+    shared["c"] = 3
+    assert not opened
+    cache.get_cache(path=path)["other"] = "value"
+    opened.clear()
+    shared["d"] = 4
+    assert opened == [1]
+    shared.close()
+    assert dict(cache.get_cache(path=path)) == {
+        "key": "value",
+        "a": 1,
+        "b": 2,
+        "c": 3,
+        "other": "value",
+        "d": 4,
+    }
+
+
+def test_expired_entries_dropped(path):
+    now = dt.datetime.now()
+    with shelve.open(path, protocol=pickle.HIGHEST_PROTOCOL) as shelf:
+        shelf[cache.SharedCache.hash_key("old")] = ("old", 1, now - dt.timedelta(8))
+        shelf[cache.SharedCache.hash_key("new")] = ("new", 2, now)
+    loaded = cache.get_cache(path=path, ttl_days=7)
+    assert "old" not in loaded
+    assert loaded["new"] == 2
+    with shelve.open(path) as shelf:
+        assert len(shelf) == 1
+
+
+def test_unreadable_cache_replaced(path, caplog):
+    with open(f"{path}.dir", "w") as f:
+        f.write("not an index\n")
+    loaded = cache.get_cache(path=path)
+    with caplog.at_level(logging.WARNING, logger="wbdata.cache"):
+        loaded["key"] = "value"
+    assert "replacing it" in caplog.text
+    assert cache.get_cache(path=path)["key"] == "value"
+
+
+def test_other_open_errors_propagate(path, monkeypatch):
+    def fail(*args, **kwargs):
+        raise PermissionError("denied")
+
+    monkeypatch.setattr(cache.shelve, "open", fail)
+    with pytest.raises(PermissionError):
+        cache.get_cache(path=path)["key"] = "value"
+
+
+def _write_entries(path, worker):
+    shared = cache.get_cache(path=path, max_size=1000)
+    for i in range(20):
+        shared[(worker, i)] = f"{worker}-{i}"
+
+
+def test_concurrent_writers(path):
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=_write_entries, args=(path, i)) for i in range(4)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+    loaded = cache.get_cache(path=path, max_size=1000)
+    assert len(loaded) == 80
+    assert loaded[(3, 19)] == "3-19"
+
+
+def test_memory_hits_dont_wait_for_disk(path):
+    shared = cache.get_cache(path=path)
+    assert isinstance(shared, cache.SharedCache)
+    shared["key"] = "value"
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    with cache._file_lock(shared.lock_path):
+        assert executor.submit(shared.get, "key").result(timeout=5) == "value"
+    executor.shutdown()
+
+
+def test_reset_sessions_closes_connections():
+    fetched = fetcher.Fetcher(cache={})
+    with mock.patch.object(fetched.session, "close") as close:
+        fetcher._reset_sessions()
+    close.assert_called_once()
+
+
+def _wait_for(condition):
+    deadline = time.monotonic() + 5
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+class RecordingCache(dict):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+        self.fail = False
+
+    def update(self, other=(), /, **kwargs):
+        if self.fail:
+            raise OSError("disk full")
+        self.batches.append(dict(other, **kwargs))
+        super().update(other, **kwargs)
+
+
+def test_write_behind_reads_buffered_entries():
+    wrapped = RecordingCache()
+    write_behind = cache.WriteBehindCache(wrapped, flush_interval=60)
+    write_behind["key"] = "value"
+    assert write_behind["key"] == "value"
+    assert "key" in write_behind
+    assert list(write_behind) == ["key"]
+    assert wrapped == {}
+    write_behind.close()
+    assert wrapped == {"key": "value"}
+
+
+def test_write_behind_flushes_batches_by_size():
+    wrapped = RecordingCache()
+    write_behind = cache.WriteBehindCache(wrapped, flush_interval=60, flush_size=3)
+    for i in range(3):
+        write_behind[i] = i
+    _wait_for(lambda: wrapped)
+    assert wrapped.batches == [{0: 0, 1: 1, 2: 2}]
+    write_behind.close()
+
+
+def test_write_behind_flushes_by_interval():
+    wrapped = RecordingCache()
+    write_behind = cache.WriteBehindCache(wrapped, flush_interval=0.01)
+    write_behind["key"] = "value"
+    _wait_for(lambda: wrapped)
+    assert wrapped == {"key": "value"}
+    write_behind.close()
+
+
+def test_write_behind_retries_failed_batches():
+    wrapped = RecordingCache()
+    wrapped.fail = True
+    write_behind = cache.WriteBehindCache(wrapped, flush_interval=60)
+    write_behind["key"] = "value"
+    write_behind.flush()
+    assert write_behind["key"] == "value"
+    wrapped.fail = False
+    write_behind.flush()
+    assert wrapped == {"key": "value"}
+    write_behind.close()
+
+
+def test_write_behind_closed():
+    write_behind = cache.WriteBehindCache(RecordingCache())
+    write_behind.close()
+    with pytest.raises(ValueError):
+        write_behind["key"] = "value"
+
+
+def test_shared_cache_update(path):
+    cache.get_cache(path=path).update({"a": 1, "b": 2})
+    assert dict(cache.get_cache(path=path)) == {"a": 1, "b": 2}
+
+
+def test_sharded_cache(path):
+    sharded = cache.get_cache(path=path, shards=4, max_size=100)
+    assert isinstance(sharded, cache.ShardedCache)
+    assert all(i.maxsize == 25 for i in sharded.shards)
+    entries = {("url", (("page", i),)): str(i) for i in range(40)}
+    sharded.update(entries)
+    for key, value in entries.items():
+        assert sharded.shard(key)[key] == value
+    assert len({id(sharded.shard(key)) for key in entries}) == 4
+    reloaded = cache.get_cache(path=path, shards=4, max_size=100)
+    assert dict(reloaded) == entries
+    del reloaded[("url", (("page", 0),))]
+    assert ("url", (("page", 0),)) not in reloaded
+    assert len(reloaded) == 39
+
+
+def test_shards_spread_over_directories(tmp_path):
+    dirs = [tmp_path / "a", tmp_path / "b"]
+    sharded = cache.get_cache(path=tmp_path / "cache", shards=4, shard_dirs=dirs)
+    assert [i.filename for i in sharded.shards] == [
+        str(dirs[0] / "cache.0"),
+        str(dirs[1] / "cache.1"),
+        str(dirs[0] / "cache.2"),
+        str(dirs[1] / "cache.3"),
+    ]
+    sharded["key"] = "value"
+    assert (
+        cache.get_cache(path=tmp_path / "cache", shards=4, shard_dirs=dirs)["key"]
+        == "value"
+    )
+
+
+POLICY = cache.TTLPolicy(
+    default=dt.timedelta(days=1),
+    endpoints={
+        "https://api.worldbank.org/v2/countries": dt.timedelta(days=30),
+        "https://api.worldbank.org/v2/countries/USA": dt.timedelta(days=2),
+    },
+    sources={2: dt.timedelta(days=10)},
+)
+
+
+@pytest.mark.parametrize(
+    ["key", "expected"],
+    [
+        pytest.param(
+            ("https://api.worldbank.org/v2/countries", (("format", "json"),)),
+            dt.timedelta(days=30),
+            id="endpoint",
+        ),
+        pytest.param(
+            ("https://api.worldbank.org/v2/Countries/GBR", ()),
+            dt.timedelta(days=30),
+            id="under endpoint",
+        ),
+        pytest.param(
+            ("https://api.worldbank.org/v2/countriesandmore", ()),
+            dt.timedelta(days=1),
+            id="not under endpoint",
+        ),
+        pytest.param(
+            ("https://api.worldbank.org/v2/countries/usa", ()),
+            dt.timedelta(days=2),
+            id="longest prefix",
+        ),
+        pytest.param(
+            ("https://api.worldbank.org/v2/countries/USA/indicators/FOO", ()),
+            dt.timedelta(days=10),
+            id="default source",
+        ),
+        pytest.param(
+            (
+                "https://api.worldbank.org/v2/countries/all/indicators/FOO",
+                (("source", 2),),
+            ),
+            dt.timedelta(days=10),
+            id="source param",
+        ),
+        pytest.param(
+            ("https://api.worldbank.org/v2/sources/2/indicators", ()),
+            dt.timedelta(days=1),
+            id="source metadata",
+        ),
+        pytest.param(
+            ("https://api.worldbank.org/v2/indicator", (("source", 2),)),
+            dt.timedelta(days=1),
+            id="source catalog",
+        ),
+        pytest.param(
+            (
+                "https://api.worldbank.org/v2/countries/all/indicators/FOO",
+                (("source", 3),),
+            ),
+            dt.timedelta(days=1),
+            id="other source",
+        ),
+        pytest.param("key", dt.timedelta(days=1), id="other key"),
+    ],
+)
+def test_ttl_policy(key, expected):
+    assert POLICY(key) == expected
+
+
+def test_ttl_policy_expires_entries(path):
+    now = dt.datetime.now()
+    countries = ("https://api.worldbank.org/v2/countries", ())
+    data = (
+        "https://api.worldbank.org/v2/countries/all/indicators/FOO",
+        (("source", 3),),
+    )
+    with shelve.open(path, protocol=pickle.HIGHEST_PROTOCOL) as shelf:
+        for key in (countries, data):
+            shelf[cache.SharedCache.hash_key(key)] = (
+                key,
+                "body",
+                now - dt.timedelta(5),
+            )
+    loaded = cache.get_cache(path=path, ttl_policy=POLICY)
+    assert countries in loaded
+    assert data not in loaded
+
+
+def test_ttl_policy_in_memory(path):
+    now = [dt.datetime(2024, 1, 1)]
+    shared = cache.SharedCache(
+        cachetools.TLRUCache,
+        path,
+        maxsize=10,
+        ttl=POLICY,
+        timer=lambda: now[0],
+    )
+    shared[("https://api.worldbank.org/v2/countries", ())] = "countries"
+    shared[("https://api.worldbank.org/v2/topics", ())] = "topics"
+    now[0] += dt.timedelta(days=3)
+    assert list(shared) == [("https://api.worldbank.org/v2/countries", ())]
+
+
+def test_ttl_policy_endpoints_exclude_observations():
+    policy = cache.TTLPolicy(
+        default=dt.timedelta(days=1),
+        endpoints={"https://api.worldbank.org/v2/countries": dt.timedelta(days=30)},
+    )
+    assert policy(("https://api.worldbank.org/v2/countries", ())) == dt.timedelta(30)
+    observations = ("https://api.worldbank.org/v2/countries/USA/indicators/FOO", ())
+    assert policy(observations) == dt.timedelta(days=1)
+
+
+def test_ttl_policy_default_from_ttl_days(path):
+    loaded = cache.get_cache(
+        path=path, ttl_days=3, ttl_policy=cache.TTLPolicy(sources={2: dt.timedelta(9)})
+    )
+    assert isinstance(loaded, cache.SharedCache)
+    assert isinstance(loaded.ttl, cache.TTLPolicy)
+    assert loaded.ttl.default == dt.timedelta(days=3)
+
+
+def test_ttl_policy_versioned():
+    policy = dataclasses.replace(POLICY, versioned=dt.timedelta(days=365))
+    url = "https://api.worldbank.org/v2/countries/all/indicators/FOO"
+    assert policy((url, (("source", 3),))) == dt.timedelta(days=365)
+    assert policy((url, (("source", 2),))) == dt.timedelta(days=10)
+    assert policy((url, ())) == dt.timedelta(days=10)
+    assert policy(("https://api.worldbank.org/v2/countries", ())) == dt.timedelta(30)
+    metadata = ("https://api.worldbank.org/v2/sources/2/indicators", ())
+    assert policy(metadata) == dt.timedelta(days=1)
@@ -1,12 +1,16 @@
+import concurrent.futures
 import datetime as dt
 import itertools
+import json
+import pickle
 import re
+import shelve
 from unittest import mock
 
 import pandas as pd  # type: ignore[import-untyped]
 import pytest
 
-from wbdata import client, fetcher
+from wbdata import cache, client, fetcher
 
 
 @pytest.mark.parametrize(
@@ -51,6 +55,19 @@ def test_cast_float(value, expected):
     assert client._cast_float(value) == expected
 
 
+@pytest.mark.parametrize(
+    ["values", "expected"],
+    [
+        pytest.param(["5.1", 3, None, "heloooo"], [5.1, 3.0, None, None], id="mixed"),
+        pytest.param([None, "heloooo"], [None, None], id="no numbers"),
+        pytest.param([], [], id="empty"),
+    ],
+)
+def test_cast_float_array(values, expected):
+    got = client._cast_float_array(values)
+    assert [None if pd.isna(i) else i for i in got] == expected
+
+
 @pytest.fixture
 def mock_client():
     with mock.patch("wbdata.client.fetcher.Fetcher", mock.Mock):
@@ -115,6 +132,7 @@ def test_get_data_args(mock_client, kwargs, expected_url, expected_args):
         url=expected_url,
         params=expected_args,
         skip_cache=kwargs.get("skip_cache", False),
+        compact=False,
     )
 
 
@@ -349,6 +367,8 @@ def test_get_series_passthrough(mock_client):
         )
         mock_client.get_series(**kwargs)
 
+        # Dates are parsed after conversion to pandas
+        del kwargs["parse_dates"]
         mock_get_data.assert_called_once_with(**kwargs)
 
 
@@ -474,6 +494,46 @@ def test_get_series(mock_client, response, keep_levels, expected):
         pd.testing.assert_series_equal(got, expected)
 
 
+@pytest.mark.parametrize(
+    ["periods", "expected"],
+    (
+        pytest.param(
+            False,
+            pd.MultiIndex.from_arrays(
+                [
+                    ["usa", "usa", "gbr"],
+                    pd.DatetimeIndex(["2023-04-01", "2023-07-01", "2023-04-01"]),
+                ],
+                names=["country", "date"],
+            ),
+            id="timestamps",
+        ),
+        pytest.param(
+            True,
+            pd.MultiIndex.from_arrays(
+                [
+                    ["usa", "usa", "gbr"],
+                    pd.PeriodIndex(["2023Q2", "2023Q3", "2023Q2"], freq="Q"),
+                ],
+                names=["country", "date"],
+            ),
+            id="periods",
+        ),
+    ),
+)
+def test_get_series_parse_dates(mock_client, periods, expected):
+    response = fetcher.Result(
+        [
+            {"country": {"value": "usa"}, "date": "2023Q2", "value": "5"},
+            {"country": {"value": "usa"}, "date": "2023Q3", "value": "6"},
+            {"country": {"value": "gbr"}, "date": "2023Q2", "value": "7"},
+        ]
+    )
+    with mock.patch.object(mock_client, "get_data", mock.Mock(return_value=response)):
+        got = mock_client.get_series("foo", parse_dates=True, periods=periods)
+    pd.testing.assert_index_equal(got.index, expected)
+
+
 def test_get_dataframe_passthrough(mock_client):
     with mock.patch.object(
         mock_client,
@@ -513,6 +573,7 @@ def test_get_dataframe_passthrough(mock_client):
             freq="Q",
             source="2",
             parse_dates=True,
+            periods=True,
             keep_levels=True,
             skip_cache=True,
         )
@@ -807,3 +868,263 @@ def test_get_dataframe(mock_client, results, indicators, keep_levels, expected):
     with mock.patch.object(mock_client, "get_series", mock.Mock(side_effect=results)):
         got = mock_client.get_dataframe(indicators=indicators, keep_levels=keep_levels)
         pd.testing.assert_frame_equal(got.loc[expected.index], expected)
+
+
+def compact_observations(*observations, indicator="foo"):
+    return fetcher.CompactResult(
+        (
+            {
+                "indicator": {"id": indicator, "value": indicator},
+                "country": {"id": country[:2], "value": country},
+                "countryiso3code": country,
+                "date": date,
+                "value": value,
+                "unit": "",
+                "obs_status": "",
+                "decimal": 0,
+            }
+            for country, date, value in observations
+        ),
+        last_updated=dt.datetime(2023, 2, 1),
+    )
+
+
+needs_polars = pytest.mark.skipif(client.pl is None, reason="polars not installed")
+
+
+@needs_polars
+@pytest.mark.parametrize(
+    ["observations", "keep_levels", "expected"],
+    (
+        pytest.param(
+            [("usa", "2023", 5), ("usa", "2024", None), ("gbr", "2023", 7)],
+            False,
+            {
+                "country": ["usa", "usa", "gbr"],
+                "date": ["2023", "2024", "2023"],
+                "value": [5.0, None, 7.0],
+            },
+            id="multi-country, multi-date",
+        ),
+        pytest.param(
+            [("usa", "2023", 5), ("usa", "2024", 6)],
+            False,
+            {"date": ["2023", "2024"], "value": [5.0, 6.0]},
+            id="one-country, multi-date, no keep_levels",
+        ),
+        pytest.param(
+            [("usa", "2023", 5), ("gbr", "2023", 7)],
+            False,
+            {"country": ["usa", "gbr"], "value": [5.0, 7.0]},
+            id="multi-country, one-date, no keep_levels",
+        ),
+        pytest.param(
+            [("usa", "2023", 5)],
+            False,
+            {"date": ["2023"], "value": [5.0]},
+            id="one-country, one-date, no keep_levels",
+        ),
+        pytest.param(
+            [("usa", "2023", 5)],
+            True,
+            {"country": ["usa"], "date": ["2023"], "value": [5.0]},
+            id="one-country, one-date, keep_levels",
+        ),
+    ),
+)
+def test_get_series_polars(mock_client, observations, keep_levels, expected):
+    mock_client.fetcher.fetch = mock.Mock(
+        return_value=compact_observations(*observations)
+    )
+    got = mock_client.get_series("foo", keep_levels=keep_levels, backend="polars")
+    assert mock_client.fetcher.fetch.call_args.kwargs["compact"] is True
+    assert client.pl is not None
+    assert isinstance(got, client.pl.DataFrame)
+    assert got.to_dict(as_series=False) == expected
+    assert got.last_updated == dt.datetime(2023, 2, 1)
+
+
+@needs_polars
+def test_get_series_polars_parse_dates(mock_client):
+    mock_client.fetcher.fetch = mock.Mock(
+        return_value=compact_observations(("usa", "2023Q2", 5), ("usa", "2023Q3", 6))
+    )
+    got = mock_client.get_series("foo", parse_dates=True, backend="polars")
+    assert client.pl is not None
+    assert got.schema["date"] == client.pl.Date
+    assert got["date"].to_list() == [dt.date(2023, 4, 1), dt.date(2023, 7, 1)]
+    with pytest.raises(ValueError, match="periods"):
+        mock_client.get_series("foo", parse_dates=True, periods=True, backend="polars")
+
+
+@needs_polars
+@pytest.mark.parametrize("lazy", [False, True])
+def test_get_dataframe_polars(mock_client, lazy):
+    mock_client.fetcher.fetch = mock.Mock(
+        side_effect=[
+            compact_observations(("usa", "2023", 5), ("gbr", "2023", 7)),
+            compact_observations(("usa", "2023", 9), ("usa", "2024", 10)),
+        ]
+    )
+    got = mock_client.get_dataframe(
+        {"foo": "bar", "baz": "bat"}, backend="polars", lazy=lazy
+    )
+    assert client.pl is not None
+    assert isinstance(got, client.pl.LazyFrame if lazy else client.pl.DataFrame)
+    assert got.last_updated == {
+        "bar": dt.datetime(2023, 2, 1),
+        "bat": dt.datetime(2023, 2, 1),
+    }
+    if lazy:
+        got = got.collect()
+    assert got.sort("country", "date").to_dict(as_series=False) == {
+        "country": ["gbr", "usa", "usa"],
+        "date": ["2023", "2023", "2024"],
+        "bar": [7.0, 5.0, None],
+        "bat": [None, 9.0, 10.0],
+    }
+
+
+@needs_polars
+def test_get_dataframe_polars_drops_levels(mock_client):
+    mock_client.fetcher.fetch = mock.Mock(
+        side_effect=[
+            compact_observations(("usa", "2023", 5), ("gbr", "2023", 7)),
+            compact_observations(("usa", "2023", 9)),
+        ]
+    )
+    got = mock_client.get_dataframe({"foo": "bar", "baz": "bat"}, backend="polars")
+    assert got.sort("country").to_dict(as_series=False) == {
+        "country": ["gbr", "usa"],
+        "bar": [7.0, 5.0],
+        "bat": [None, 9.0],
+    }
+
+
+def test_unknown_backend(mock_client):
+    with pytest.raises(ValueError, match="Unknown backend"):
+        mock_client.get_series("foo", backend="spark")
+
+
+@pytest.mark.parametrize(["backend", "module"], [("pandas", "pd"), ("polars", "pl")])
+def test_missing_backend(mock_client, backend, module):
+    with (
+        mock.patch.object(client, module, None),
+        pytest.raises(RuntimeError, match=f"get_dataframe requires {backend}"),
+    ):
+        mock_client.get_dataframe({"foo": "bar"}, backend=backend)
+
+
+def _observations_page(indicator):
+    rows = [
+        {
+            "indicator": {"id": indicator, "value": indicator},
+            "country": {"id": country, "value": country},
+            "countryiso3code": country,
+            "date": str(year),
+            "value": year,
+            "unit": "",
+            "obs_status": "",
+            "decimal": 0,
+        }
+        for country in ("AAA", "BBB", "CCC")
+        for year in range(2000, 2010)
+    ]
+    header = {"page": 1, "pages": 1, "per_page": 1000, "total": len(rows)}
+    return json.dumps([{**header, "lastupdated": "2023-01-01"}, rows])
+
+
+def test_get_data_shared_between_threads(tmp_path):
+    indicators = [f"IND.{i}" for i in range(20)]
+    session = mock.Mock()
+    session.get.side_effect = lambda url, params, timeout: mock.Mock(
+        text=_observations_page(url.rsplit("/", 1)[-1])
+    )
+    shared = client.Client(cache_path=tmp_path / "cache", session=session)
+
+    def get(indicator):
+        return indicator, shared.get_data(indicator, country="all")
+
+    calls = indicators * 25
+    with concurrent.futures.ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(executor.map(get, calls))
+    assert len(results) == len(calls)
+    for indicator, result in results:
+        assert len(result) == 30
+        assert {row["indicator"]["id"] for row in result} == {indicator}
+    # Threads may miss the same page at once, but never once it's cached
+    fetched = {i.kwargs["url"] for i in session.get.mock_calls}
+    assert len(fetched) == len(indicators)
+    session.get.reset_mock()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=16) as executor:
+        list(executor.map(get, calls))
+    session.get.assert_not_called()
+    reloaded = cache.get_cache(path=tmp_path / "cache")
+    assert len(reloaded) == len(indicators)
+
+
+def test_session_passed_to_fetcher(tmp_path):
+    session = mock.Mock()
+    shared = client.Client(cache_path=tmp_path / "cache", session=session)
+    assert shared.fetcher.session is session
+
+
+def test_close_flushes_cache(tmp_path):
+    path = tmp_path / "cache"
+    buffered = client.Client(cache_path=path, write_behind=True, flush_interval=60)
+    key = (client.COUNTRIES_URL, ())
+    buffered.fetcher.cache[key] = "value"
+    assert key not in cache.get_cache(path=path)
+    buffered.close()
+    assert cache.get_cache(path=path)[key] == "value"
+
+
+def test_ttl_policy_rebased(tmp_path):
+    policy = cache.TTLPolicy(endpoints={client.COUNTRIES_URL: dt.timedelta(days=30)})
+    rebased = client.Client(
+        cache_path=tmp_path / "cache",
+        base_url="http://localhost:8000",
+        cache_ttl_policy=policy,
+    )
+    key = ("http://localhost:8000/countries", ())
+    rebased_cache = rebased.fetcher.cache
+    assert isinstance(rebased_cache, cache.SharedCache)
+    assert isinstance(rebased_cache.ttl, cache.TTLPolicy)
+    assert rebased_cache.ttl(key) == dt.timedelta(days=30)
+
+
+def test_deadline_partial_results(mock_client):
+    partial = fetcher.Result(
+        [{"country": {"value": "Albania"}, "date": "2020", "value": "1.5"}]
+    )
+
+    def fetch(**kwargs):
+        current = fetcher._deadline.get()
+        assert current is not None and current.remaining() <= 5
+        raise fetcher.DeadlineExceeded(pages=1, total=3, partial=partial)
+
+    mock_client.fetcher.fetch = mock.Mock(side_effect=fetch)
+    with pytest.raises(fetcher.DeadlineExceeded):
+        mock_client.get_data("foo", timeout=5)
+    assert mock_client.get_data("foo", timeout=5, partial=True) is partial
+    series = mock_client.get_series("foo", timeout=5, partial=True)
+    assert series.to_dict() == {"2020": 1.5}
+    with pytest.raises(fetcher.DeadlineExceeded):
+        mock_client.get_series("foo", timeout=5)
+
+
+def test_source_metadata_expires_with_source_versions(tmp_path):
+    path = tmp_path / "cache"
+    stored = dt.datetime.now() - dt.timedelta(days=4)
+    metadata = (f"{client.BASE_URL}/sources/2/indicators", (("format", "json"),))
+    data = (f"{client.COUNTRIES_URL}/all/indicators/FOO", (("format", "json"),))
+    with shelve.open(str(path), protocol=pickle.HIGHEST_PROTOCOL) as shelf:
+        for key in (metadata, data):
+            shelf[cache.SharedCache.hash_key(key)] = (key, "body", stored)
+    versioned = client.Client(cache_path=path, cache_ttl_days=3, source_versions=True)
+    versioned_cache = versioned.fetcher.cache
+    assert isinstance(versioned_cache, cache.SharedCache)
+    assert isinstance(versioned_cache.ttl, cache.TTLPolicy)
+    assert versioned_cache.ttl(metadata) == dt.timedelta(days=3)
+    assert metadata not in versioned_cache
+    assert data in versioned_cache
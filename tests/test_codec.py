@@ -0,0 +1,126 @@
+import datetime as dt
+import json
+from unittest import mock
+
+import pytest
+
+from wbdata import codec, fetcher
+
+
+def available_codecs():
+    return [
+        pytest.param(
+            name,
+            marks=pytest.mark.skipif(
+                getattr(codec, name, True) is None, reason=f"{name} not installed"
+            ),
+        )
+        for name in codec.CODECS
+    ]
+
+
+@pytest.fixture(params=available_codecs())
+def any_codec(request) -> codec.Codec:
+    return codec.get_codec(request.param)
+
+
+@pytest.mark.parametrize(
+    ["response", "expected"],
+    (
+        pytest.param(
+            [{"page": "1", "pages": "2"}, [{"hello": "there"}]],
+            ({"page": "1", "pages": "2"}, [{"hello": "there"}]),
+            id="string pages",
+        ),
+        pytest.param(
+            [
+                {
+                    "page": 1,
+                    "pages": 1,
+                    "per_page": 50,
+                    "total": 1,
+                    "lastupdated": "2023-02-01",
+                },
+                [{"hello": "there", "nested": {"id": "a"}}],
+            ],
+            (
+                {"page": 1, "pages": 1, "lastupdated": "2023-02-01"},
+                [{"hello": "there", "nested": {"id": "a"}}],
+            ),
+            id="with date",
+        ),
+        pytest.param(
+            [{"page": 1, "pages": 0}, None],
+            ({"page": 1, "pages": 0}, None),
+            id="null rows",
+        ),
+        pytest.param(
+            [{"message": [{"id": "120", "key": "Invalid value", "value": "x"}]}],
+            ({"message": [{"id": "120", "key": "Invalid value", "value": "x"}]},),
+            id="error",
+        ),
+    ),
+)
+def test_decode_page(response, expected, any_codec):
+    header, *rows = any_codec.decode_page(json.dumps(response))
+    expected_header, *expected_rows = expected
+    assert rows == expected_rows
+    assert header.get("page") == expected_header.get("page")
+    assert header.get("pages") == expected_header.get("pages")
+    assert header.get("lastupdated") == expected_header.get("lastupdated")
+    assert header.get("message") == expected_header.get("message")
+
+
+def test_loads(any_codec):
+    document = {"a": [1, 2.5, None, "four"], "b": {"c": True}}
+    assert any_codec.loads(json.dumps(document)) == document
+
+
+def test_invalid_json(any_codec):
+    with pytest.raises(ValueError):
+        any_codec.decode_page("<html>Service unavailable</html>")
+
+
+def test_fetch_with_codec(any_codec):
+    url = "http://foo.bar"
+    response = [
+        {"page": "1", "pages": "1", "lastupdated": "2023-02-01"},
+        [{"id": "  a  "}],
+    ]
+    session = mock.Mock()
+    session.get.return_value = mock.Mock(text=json.dumps(response))
+    got = fetcher.Fetcher(cache={}, session=session, codec=any_codec).fetch(url)
+    assert got == [{"id": "a"}]
+    assert got.last_updated == dt.datetime(2023, 2, 1)
+
+
+def test_get_codec_by_name():
+    assert type(codec.get_codec("json")) is codec.Codec
+    assert type(codec.get_codec("JSON")) is codec.Codec
+
+
+def test_get_codec_auto():
+    expected = (
+        "orjson"
+        if codec.orjson is not None
+        else "msgspec"
+        if codec.msgspec is not None
+        else "json"
+    )
+    assert codec.get_codec("auto").name == expected
+
+
+def test_get_codec_environment():
+    with mock.patch.object(codec, "CODEC", "json"):
+        assert codec.get_codec().name == "json"
+
+
+def test_get_codec_unknown():
+    with pytest.raises(ValueError):
+        codec.get_codec("yaml")
+
+
+@pytest.mark.parametrize("name", ["orjson", "msgspec"])
+def test_get_codec_missing(name):
+    with mock.patch.object(codec, name, None), pytest.raises(RuntimeError):
+        codec.get_codec(name)
@@ -1,5 +1,6 @@
 import datetime as dt
 
+import pandas as pd  # type: ignore[import-untyped]
 import pytest
 
 from wbdata import dates
@@ -144,3 +145,75 @@ def test_format_dates(dates_, freq, expected):
 def test_bad_dates(dates_):
     with pytest.raises(ValueError, match="dates argument"):
         dates.format_dates(dates_, "Y")
+
+
+@pytest.mark.parametrize(
+    ["values", "periods", "expected"],
+    (
+        pytest.param(
+            ["2023", "2022", "2023"],
+            False,
+            pd.DatetimeIndex(["2023-01-01", "2022-01-01", "2023-01-01"]),
+            id="year",
+        ),
+        pytest.param(
+            ["2023M02", "2023M1"],
+            False,
+            pd.DatetimeIndex(["2023-02-01", "2023-01-01"]),
+            id="month",
+        ),
+        pytest.param(
+            ["2023Q2", "2023Q1"],
+            False,
+            pd.DatetimeIndex(["2023-04-01", "2023-01-01"]),
+            id="quarter",
+        ),
+        pytest.param(
+            ["2023", "2022"],
+            True,
+            pd.PeriodIndex(["2023", "2022"], freq="Y"),
+            id="year periods",
+        ),
+        pytest.param(
+            ["2023M02", "2023M01"],
+            True,
+            pd.PeriodIndex(["2023-02", "2023-01"], freq="M"),
+            id="month periods",
+        ),
+        pytest.param(
+            ["2023Q2", "2023Q1"],
+            True,
+            pd.PeriodIndex(["2023Q2", "2023Q1"], freq="Q"),
+            id="quarter periods",
+        ),
+        pytest.param(
+            ["2023", "MRV"],
+            False,
+            pd.Index([dt.datetime(2023, 1, 1), "MRV"], dtype=object),
+            id="unparseable",
+        ),
+        pytest.param(
+            ["2023", None, "2022"],
+            False,
+            pd.DatetimeIndex(["2023-01-01", pd.NaT, "2022-01-01"]),
+            id="missing",
+        ),
+        pytest.param(
+            [None, "2023Q1"],
+            True,
+            pd.PeriodIndex([pd.NaT, "2023Q1"], freq="Q"),
+            id="missing periods",
+        ),
+        pytest.param(
+            ["2023", float("nan"), "MRV"],
+            False,
+            pd.Index([dt.datetime(2023, 1, 1), pd.NaT, "MRV"], dtype=object),
+            id="missing unparseable",
+        ),
+        pytest.param([], False, pd.Index([]), id="empty"),
+    ),
+)
+def test_parse_date_index(values, periods, expected):
+    pd.testing.assert_index_equal(
+        dates.parse_date_index(values, periods=periods), expected
+    )
@@ -1,8 +1,12 @@
 import datetime as dt
 import json
+import time
+from array import array
 from unittest import mock
 
 import pytest
+import requests
+import requests.adapters
 
 from wbdata import fetcher
 
@@ -23,7 +27,9 @@ def test_get_request_content(mock_fetcher):
     expected = {"hello": "there"}
     mock_fetcher.session.get = mock.Mock(return_value=MockHTTPResponse(value=expected))
     result = mock_fetcher._get_response_body(url=url, params=params)
-    mock_fetcher.session.get.assert_called_once_with(url=url, params=params)
+    mock_fetcher.session.get.assert_called_once_with(
+        url=url, params=params, timeout=fetcher.TIMEOUT
+    )
     assert json.loads(result) == expected
 
 
@@ -62,7 +68,9 @@ def test_get_request_content(mock_fetcher):
 def test_get_response(url, params, response, expected, mock_fetcher):
     mock_fetcher.session.get = mock.Mock(return_value=MockHTTPResponse(value=response))
     got = mock_fetcher._get_response(url=url, params=params)
-    mock_fetcher.session.get.assert_called_once_with(url=url, params=params)
+    mock_fetcher.session.get.assert_called_once_with(
+        url=url, params=params, timeout=fetcher.TIMEOUT
+    )
     assert got == expected
     assert mock_fetcher.cache[(url), (("baz", "bat"),)] == json.dumps(response)
 
@@ -104,7 +112,9 @@ def test_skip_cache(mock_fetcher):
     mock_fetcher.session.get = mock.Mock(return_value=MockHTTPResponse(value=response))
     mock_fetcher.cache[(url), (("baz", "bat"),)] = json.dumps({"old": "garbage"})
     got = mock_fetcher._get_response(url=url, params=params, skip_cache=True)
-    mock_fetcher.session.get.assert_called_once_with(url=url, params=params)
+    mock_fetcher.session.get.assert_called_once_with(
+        url=url, params=params, timeout=fetcher.TIMEOUT
+    )
     assert got == expected
     assert mock_fetcher.cache[(url), (("baz", "bat"),)] == json.dumps(response)
 
@@ -245,3 +255,608 @@ def test_fetch(url, params, responses, expected, mock_fetcher):
 def test_parse_response_errors(response, expected):
     with pytest.raises(RuntimeError, match=expected):
         fetcher.ParsedResponse.from_response(response)
+
+
+def test_parse_response_null_rows():
+    header = {"page": 1, "pages": 1, "lastupdated": None}
+    assert fetcher.ParsedResponse.from_response((header, None)).rows == []
+
+
+@pytest.fixture
+def observation_rows():
+    return [
+        {
+            "indicator": {"id": "FOO", "value": "Foo"},
+            "country": {"id": "US", "value": "United States"},
+            "countryiso3code": "USA",
+            "date": "2023",
+            "value": 5.5,
+            "unit": "",
+            "obs_status": "",
+            "decimal": 1,
+        },
+        {
+            "indicator": {"id": "FOO", "value": "Foo"},
+            "country": {"id": "GB", "value": "United Kingdom"},
+            "countryiso3code": "GBR",
+            "date": "2023",
+            "value": None,
+            "unit": "",
+            "obs_status": "",
+            "decimal": 1,
+        },
+    ]
+
+
+def test_compact_result(observation_rows):
+    compact = fetcher.CompactResult(
+        observation_rows, last_updated=dt.datetime(2023, 2, 1)
+    )
+    assert len(compact) == 2
+    assert compact == observation_rows
+    assert list(compact.to_result()) == observation_rows
+    assert compact.to_result().last_updated == dt.datetime(2023, 2, 1)
+    assert compact[1]["country"] == {"id": "GB", "value": "United Kingdom"}
+    assert compact[-1].value is None
+    assert compact[0].countryiso3code == "USA"
+    assert [i.date for i in compact] == ["2023", "2023"]
+    assert compact.column("country.id") == ["US", "GB"]
+    assert compact.column("value") == [5.5, None]
+    assert compact.encoded("countryiso3code") == (["USA", "GBR"], array("I", [0, 1]))
+    assert compact.encoded("date") == (["2023"], array("I", [0, 0]))
+    assert compact._indicators.values == [("FOO", "Foo")]
+    with pytest.raises(AttributeError):
+        compact[0].foo = "bar"  # ty: ignore[unresolved-attribute]
+    with pytest.raises(IndexError):
+        compact[2]
+
+
+def test_compact_result_parse_dates(observation_rows):
+    compact = fetcher.CompactResult(observation_rows)
+    compact.parse_dates()
+    assert compact.column("date") == [dt.datetime(2023, 1, 1)] * 2
+
+
+def test_fetch_compact(mock_fetcher, observation_rows):
+    mock_fetcher.session.get = mock.Mock(
+        side_effect=[
+            MockHTTPResponse(
+                [
+                    {"page": "1", "pages": "2", "lastupdated": "2023-02-01"},
+                    observation_rows[:1],
+                ]
+            ),
+            MockHTTPResponse(
+                [
+                    {"page": "2", "pages": "2", "lastupdated": "2023-02-01"},
+                    observation_rows[1:],
+                ]
+            ),
+        ]
+    )
+    got = mock_fetcher.fetch(url="http://foo.bar", compact=True)
+    assert isinstance(got, fetcher.CompactResult)
+    assert got == observation_rows
+    assert got.last_updated == dt.datetime(2023, 2, 1)
+
+
+def test_compact_result_extend(observation_rows):
+    compact = fetcher.CompactResult(observation_rows[1:])
+    compact.extend(fetcher.CompactResult(observation_rows))
+    assert compact == observation_rows[1:] + observation_rows
+    assert compact.encoded("countryiso3code") == (
+        ["GBR", "USA"],
+        array("I", [0, 1, 0]),
+    )
+
+
+def test_compact_pages_decoded_once(mock_fetcher, observation_rows):
+    mock_fetcher.session.get.return_value = MockHTTPResponse(
+        [{"page": "1", "pages": "1"}, observation_rows]
+    )
+    mock_fetcher.tracer = mock.Mock(wraps=mock_fetcher.tracer)
+    first = mock_fetcher.fetch(url="http://foo.bar", compact=True)
+    second = mock_fetcher.fetch(url="http://foo.bar", compact=True)
+    assert first == second == observation_rows
+    spans = [i.args[0] for i in mock_fetcher.tracer.span.mock_calls if i.args]
+    assert spans.count("json_decode") == 1
+    assert mock_fetcher.fetch(url="http://foo.bar") == observation_rows
+
+
+def test_thread_safe_cache_not_locked(mock_fetcher):
+    class ThreadSafeCache(dict):
+        thread_safe = True
+
+    mock_fetcher.cache = ThreadSafeCache()
+    mock_fetcher.lock = mock.MagicMock()
+    mock_fetcher.session.get.return_value = MockHTTPResponse(
+        [{"page": 1, "pages": 1}, [{"hello": "there"}]]
+    )
+    assert mock_fetcher.fetch(url="http://foo.bar") == [{"hello": "there"}]
+    mock_fetcher.lock.__enter__.assert_not_called()
+
+
+class MockStreamedHTTPResponse:
+    def __init__(self, value, chunk_size=7):
+        self.text = json.dumps(value, indent=1)
+        self.encoding = "utf-8"
+        self.chunk_size = chunk_size
+
+    def iter_content(self, chunk_size, decode_unicode):
+        for i in range(0, len(self.text), self.chunk_size):
+            yield self.text[i : i + self.chunk_size]
+
+
+@pytest.mark.parametrize("chunk_size", (1, 2, 7, 1000))
+@pytest.mark.parametrize(
+    ["response", "expected_rows"],
+    (
+        pytest.param(
+            [{"page": 1, "pages": 1}, [{"a": [1, 2.5e3]}, {"b": "x]"}, {"c": None}]],
+            [{"a": [1, 2.5e3]}, {"b": "x]"}, {"c": None}],
+            id="rows",
+        ),
+        pytest.param([{"page": 1, "pages": 1}, []], [], id="no rows"),
+        pytest.param([{"page": 0, "pages": 0}, None], [], id="null rows"),
+    ),
+)
+def test_stream_decoder(response, expected_rows, chunk_size):
+    text = json.dumps(response, indent=2)
+    chunks = [text[i : i + chunk_size] for i in range(0, len(text), chunk_size)]
+    decoder = fetcher._StreamDecoder(chunks, keep_text=True)
+    got_response, rows = decoder.decode()
+    assert got_response == (response[0], [])
+    assert list(rows) == expected_rows
+    assert decoder.text == text
+
+
+def test_stream_decoder_error_response():
+    response = [{"message": [{"id": "120", "key": "bad", "value": "no good"}]}]
+    got_response, rows = fetcher._StreamDecoder([json.dumps(response)]).decode()
+    assert list(rows) == []
+    with pytest.raises(RuntimeError, match=r"Got error 120 \(bad\): no good"):
+        fetcher.ParsedResponse.from_response(got_response)
+
+
+def test_stream_decoder_invalid():
+    with pytest.raises(json.JSONDecodeError):
+        list(fetcher._StreamDecoder(["[{}, [{}, {]]"]).decode()[1])
+
+
+def test_fetch_streamed(mock_fetcher):
+    url = "http://foo.bar"
+    responses = [
+        [{"page": "1", "pages": "2", "lastupdated": "2023-02-01"}, [{"id": "a "}]],
+        [{"page": "2", "pages": "2", "lastupdated": "2023-02-01"}, [{"id": "b"}]],
+    ]
+    mock_fetcher.stream = True
+    mock_fetcher.session.get = mock.Mock(
+        side_effect=[MockStreamedHTTPResponse(i) for i in responses]
+    )
+    got = mock_fetcher.fetch(url=url)
+    assert got == fetcher.Result(
+        [{"id": "a"}, {"id": "b"}], last_updated=dt.datetime(2023, 2, 1)
+    )
+    assert all(i.kwargs["stream"] for i in mock_fetcher.session.get.mock_calls)
+    assert [json.loads(i) for i in mock_fetcher.cache.values()] == responses
+    mock_fetcher.session.get.reset_mock()
+    assert mock_fetcher.fetch(url=url) == got
+    mock_fetcher.session.get.assert_not_called()
+
+
+def test_iter_rows(mock_fetcher):
+    responses = [
+        [{"page": "1", "pages": "2"}, [{"id": "a "}, {"id": "b"}]],
+        [{"page": "2", "pages": "2"}, [{"id": "c"}]],
+    ]
+    mock_fetcher.session.get = mock.Mock(
+        side_effect=[MockStreamedHTTPResponse(i) for i in responses]
+    )
+    rows = mock_fetcher.iter_rows(url="http://foo.bar", store=True)
+    assert next(rows) == {"id": "a"}
+    assert mock_fetcher.session.get.call_count == 1
+    assert not mock_fetcher.cache
+    assert list(rows) == [{"id": "b"}, {"id": "c"}]
+    assert len(mock_fetcher.cache) == 2
+
+
+def test_iter_rows_not_stored(mock_fetcher):
+    response = [{"page": "1", "pages": "1"}, [{"id": "a"}]]
+    mock_fetcher.session.get = mock.Mock(
+        return_value=MockStreamedHTTPResponse(response)
+    )
+    assert list(mock_fetcher.iter_rows(url="http://foo.bar")) == [{"id": "a"}]
+    assert not mock_fetcher.cache
+    mock_fetcher.fetch(url="http://foo.bar")
+    mock_fetcher.session.get.return_value = MockStreamedHTTPResponse(response)
+    assert list(mock_fetcher.iter_rows(url="http://foo.bar")) == [{"id": "a"}]
+    assert mock_fetcher.session.get.call_count == 2
+
+
+def test_fetch_from_covering_query(mock_fetcher, observation_rows):
+    url = "https://api.worldbank.org/v2/countries/{}/indicators/NY.GDP.MKTP.CD"
+    page = [
+        {"page": 1, "pages": 1, "lastupdated": "2023-02-01"},
+        observation_rows,
+    ]
+    mock_fetcher.session.get.return_value = MockHTTPResponse(value=page)
+    everything = mock_fetcher.fetch(url.format("all"))
+    got = mock_fetcher.fetch(url.format("usa"), {"date": "2020:2023"}, compact=True)
+    mock_fetcher.session.get.assert_called_once()
+    assert got.to_result() == everything[:1]
+    assert got.last_updated == dt.datetime(2023, 2, 1)
+    mock_fetcher.fetch(url.format("all"), {"source": 11})
+    mock_fetcher.fetch(url.format("usa"), skip_cache=True)
+    assert mock_fetcher.session.get.call_count == 3
+
+
+def test_fetch_from_covering_query_keeps_values(mock_fetcher, observation_rows):
+    url = "https://api.worldbank.org/v2/countries/{}/indicators/NY.GDP.MKTP.CD"
+    observation_rows[0]["value"] = 5
+    page = [{"page": 1, "pages": 1}, observation_rows]
+    mock_fetcher.session.get.return_value = MockHTTPResponse(value=page)
+    mock_fetcher.fetch(url.format("all"))
+    got = mock_fetcher.fetch(url.format("usa"))
+    mock_fetcher.session.get.assert_called_once()
+    assert got == observation_rows[:1]
+    assert type(got[0]["value"]) is int
+
+
+def test_partly_cached_query_not_covering(mock_fetcher, observation_rows):
+    url = "https://api.worldbank.org/v2/countries/{}/indicators/NY.GDP.MKTP.CD"
+    pages = [
+        [{"page": 1, "pages": 2}, observation_rows[:1]],
+        [{"page": 2, "pages": 2}, observation_rows[1:]],
+    ]
+    mock_fetcher.session.get.side_effect = [MockHTTPResponse(i) for i in pages]
+    mock_fetcher.fetch(url.format("all"))
+    del mock_fetcher.cache[
+        fetcher.cache_key(
+            url.format("all"), {"format": "json", "per_page": 1000, "page": 2}
+        )
+    ]
+    mock_fetcher.session.get.side_effect = [
+        MockHTTPResponse([{"page": 1, "pages": 1}, observation_rows[1:]])
+    ]
+    got = mock_fetcher.fetch(url.format("gbr"))
+    assert got == observation_rows[1:]
+    assert mock_fetcher.session.get.mock_calls[-1].kwargs["url"] == url.format("gbr")
+
+
+@pytest.mark.parametrize(
+    ["first", "second"],
+    (
+        pytest.param(
+            ("https://x.org/v2/countries/USA;GBR/indicators/FOO", {}),
+            ("https://x.org/v2/countries/gbr;usa;USA/indicators/foo", {}),
+            id="country order and case",
+        ),
+        pytest.param(
+            ("https://x.org/v2/countries/ALL/indicators/FOO", {}),
+            ("https://x.org/v2/countries/all/indicators/FOO", {}),
+            id="all",
+        ),
+        pytest.param(
+            ("http://foo.bar", {"source": 2, "per_page": 1000}),
+            ("http://foo.bar", {"per_page": "1000", "source": "2"}),
+            id="numbers",
+        ),
+        pytest.param(
+            ("http://foo.bar", {"date": "2010M01:2010M12"}),
+            ("http://foo.bar", {"date": "2010m01:2010m12"}),
+            id="date",
+        ),
+        pytest.param(
+            ("http://foo.bar", {"incomeLevel": "HIC;LMC"}),
+            ("http://foo.bar", {"incomeLevel": "lmc;hic", "region": None}),
+            id="code params",
+        ),
+    ),
+)
+def test_cache_key_equivalent(first, second):
+    assert fetcher.cache_key(*first) == fetcher.cache_key(*second)
+
+
+def test_cache_key_distinct():
+    url = "https://x.org/v2/countries/USA/indicators/FOO"
+    assert fetcher.cache_key(url, {"baz": "bat"}) != fetcher.cache_key(
+        url, {"baz": "BAT"}
+    )
+    assert fetcher.cache_key(url, {}) != fetcher.cache_key(
+        url.replace("USA", "all"), {}
+    )
+
+
+def test_equivalent_queries_share_cache(mock_fetcher):
+    url = "https://x.org/v2/countries/{}/indicators/FOO"
+    response = [{"page": 1, "pages": 1}, [{"hello": "there"}]]
+    mock_fetcher.session.get.return_value = MockHTTPResponse(value=response)
+    mock_fetcher.fetch(url.format("usa;gbr"), {"source": 2})
+    got = mock_fetcher.fetch(url.format("GBR;USA"), {"source": "2"})
+    assert got == [{"hello": "there"}]
+    mock_fetcher.session.get.assert_called_once()
+
+
+def test_default_session_pooled():
+    session = fetcher.Fetcher(cache={}).session
+    adapter = session.get_adapter("https://api.worldbank.org/v2/sources")
+    assert isinstance(adapter, requests.adapters.HTTPAdapter)
+    assert adapter._pool_maxsize == fetcher.POOL_SIZE
+
+
+ERROR_RESPONSE = [
+    {"message": [{"id": "175", "key": "Invalid format", "value": "Not found"}]}
+]
+
+
+@pytest.mark.parametrize("stream", [False, True], ids=["buffered", "streamed"])
+def test_api_errors_cached(mock_fetcher, stream):
+    mock_fetcher.stream = stream
+    mock_fetcher.session.get = mock.Mock(
+        return_value=MockStreamedHTTPResponse(ERROR_RESPONSE)
+    )
+    for _ in range(2):
+        with pytest.raises(fetcher.APIError) as info:
+            mock_fetcher.fetch("http://foo.bar")
+        assert (info.value.id, info.value.key, info.value.value) == (
+            "175",
+            "Invalid format",
+            "Not found",
+        )
+    mock_fetcher.session.get.assert_called_once()
+    assert len(mock_fetcher.cache) == 1
+
+
+def test_api_errors_expire(mock_fetcher):
+    mock_fetcher.error_ttl = dt.timedelta(0)
+    mock_fetcher.session.get = mock.Mock(
+        return_value=MockHTTPResponse(value=ERROR_RESPONSE)
+    )
+    with pytest.raises(fetcher.APIError):
+        mock_fetcher.fetch("http://foo.bar")
+    mock_fetcher.session.get = mock.Mock(
+        return_value=MockHTTPResponse(
+            value=[{"page": 1, "pages": 1, "lastupdated": None}, [{"id": "a"}]]
+        )
+    )
+    assert mock_fetcher.fetch("http://foo.bar") == [{"id": "a"}]
+
+
+def test_transient_api_errors_not_cached(mock_fetcher):
+    mock_fetcher.retry = fetcher.RetryPolicy(tries=1)
+    response = [{"message": [{"id": "105", "key": "Unavailable", "value": "Later"}]}]
+    mock_fetcher.session.get = mock.Mock(return_value=MockHTTPResponse(value=response))
+    for _ in range(2):
+        with pytest.raises(fetcher.APIError):
+            mock_fetcher.fetch("http://foo.bar")
+    assert mock_fetcher.session.get.call_count == 2
+    assert mock_fetcher.cache == {}
+
+
+def test_undecodable_responses_not_cached(mock_fetcher):
+    mock_fetcher.retry = fetcher.RetryPolicy(tries=1)
+    mock_fetcher.session.get = mock.Mock(
+        side_effect=[
+            mock.Mock(text="<html><body>502 Bad Gateway</body></html>"),
+            MockHTTPResponse(
+                value=[{"page": 1, "pages": 1, "lastupdated": None}, [{"id": "a"}]]
+            ),
+        ]
+    )
+    with pytest.raises(ValueError):
+        mock_fetcher.fetch("http://foo.bar")
+    assert mock_fetcher.cache == {}
+    assert mock_fetcher.fetch("http://foo.bar") == [{"id": "a"}]
+
+
+def test_outdated_cached_pages_refetched(mock_fetcher):
+    def page(last_updated):
+        header = {"page": 1, "pages": 1, "lastupdated": last_updated, "sourceid": "2"}
+        return MockStreamedHTTPResponse([header, [{"id": last_updated}]])
+
+    mock_fetcher.versions = mock.Mock()
+    mock_fetcher.versions.is_current.return_value = True
+    mock_fetcher.session.get = mock.Mock(return_value=page("2024-01-01"))
+    assert mock_fetcher.fetch("http://foo.bar") == [{"id": "2024-01-01"}]
+    assert mock_fetcher.fetch("http://foo.bar") == [{"id": "2024-01-01"}]
+    mock_fetcher.session.get.assert_called_once()
+    mock_fetcher.versions.is_current.assert_called_with("2", "2024-01-01")
+    mock_fetcher.versions.is_current.return_value = False
+    mock_fetcher.session.get = mock.Mock(return_value=page("2024-02-01"))
+    assert mock_fetcher.fetch("http://foo.bar") == [{"id": "2024-02-01"}]
+    mock_fetcher.stream = True
+    mock_fetcher.session.get = mock.Mock(return_value=page("2024-03-01"))
+    assert mock_fetcher.fetch("http://foo.bar") == [{"id": "2024-03-01"}]
+
+
+def test_deadline_exceeded(mock_fetcher):
+    def slow_page(**kwargs):
+        time.sleep(0.1)
+        return MockHTTPResponse(value=[{"page": 1, "pages": 3}, [{"id": "a "}]])
+
+    mock_fetcher.session.get = mock.Mock(side_effect=slow_page)
+    with (
+        pytest.raises(fetcher.DeadlineExceeded, match="after fetching 1 of 3 pages"),
+        fetcher.deadline(0.05),
+    ):
+        mock_fetcher.fetch("http://foo.bar")
+    mock_fetcher.session.get.assert_called_once()
+    assert 0 < mock_fetcher.session.get.call_args.kwargs["timeout"] <= 0.05
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_deadline_exceeded_partial(mock_fetcher, stream):
+    first = [{"page": 1, "pages": 2, "lastupdated": "2023-02-01"}, [{"id": "a "}]]
+    mock_fetcher.stream = stream
+    response = MockStreamedHTTPResponse if stream else MockHTTPResponse
+
+    def slow_page(**kwargs):
+        time.sleep(0.1)
+        return response(first)
+
+    mock_fetcher.session.get = mock.Mock(side_effect=slow_page)
+    with fetcher.deadline(0.05), pytest.raises(fetcher.DeadlineExceeded) as e:
+        mock_fetcher.fetch("http://foo.bar")
+    assert (e.value.pages, e.value.total) == (1, 2)
+    assert e.value.partial.last_updated == dt.datetime(2023, 2, 1)
+    assert [i["id"] for i in e.value.partial] == ["a"]
+
+
+def test_timeout_without_deadline_raised(mock_fetcher):
+    mock_fetcher.retry = fetcher.RetryPolicy(tries=1)
+    mock_fetcher.session.get = mock.Mock(side_effect=requests.Timeout())
+    with pytest.raises(requests.Timeout):
+        mock_fetcher.fetch("http://foo.bar")
+    assert mock_fetcher.session.get.call_args.kwargs["timeout"] == fetcher.TIMEOUT
+
+
+def test_nested_deadlines():
+    assert fetcher._deadline.get() is None
+    with fetcher.deadline(10) as outer:
+        assert outer is not None
+        with fetcher.deadline(100, partial=True) as inner:
+            assert inner is not None
+            assert inner.end == outer.end
+            assert inner.partial
+        with fetcher.deadline(None) as current:
+            assert current is outer
+        with fetcher.deadline(1) as inner:
+            assert inner is not None
+            assert inner.end < outer.end
+    assert fetcher._deadline.get() is None
+
+
+class BrokenStreamedHTTPResponse(MockStreamedHTTPResponse):
+    def iter_content(self, chunk_size, decode_unicode):
+        yield self.text[: len(self.text) // 2]
+        raise requests.ConnectionError("connection reset")
+
+
+def pages(n):
+    return [
+        [{"page": i, "pages": n, "lastupdated": "2023-02-01"}, [{"id": str(i)}]]
+        for i in range(1, n + 1)
+    ]
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_failed_page_retried(mock_fetcher, stream):
+    first, second, third = pages(3)
+    mock_fetcher.stream = stream
+    mock_fetcher.retry = fetcher.RetryPolicy(wait=0)
+    response = MockStreamedHTTPResponse if stream else MockHTTPResponse
+    broken = BrokenStreamedHTTPResponse(second) if stream else requests.Timeout()
+    mock_fetcher.session.get = mock.Mock(
+        side_effect=[response(first), broken, response(second), response(third)]
+    )
+    assert mock_fetcher.fetch("http://foo.bar") == [
+        {"id": "1"},
+        {"id": "2"},
+        {"id": "3"},
+    ]
+    got_pages = [
+        i.kwargs["params"].get("page") for i in mock_fetcher.session.get.mock_calls
+    ]
+    assert got_pages == [None, 2, 2, 3]
+
+
+def test_retries_limited(mock_fetcher):
+    mock_fetcher.retry = fetcher.RetryPolicy(tries=2, wait=0)
+    mock_fetcher.session.get = mock.Mock(side_effect=requests.ConnectionError())
+    with pytest.raises(requests.ConnectionError):
+        mock_fetcher.fetch("http://foo.bar")
+    assert mock_fetcher.session.get.call_count == 2
+
+
+@pytest.mark.parametrize(
+    ["error", "expected"],
+    (
+        pytest.param(requests.ConnectTimeout(), True, id="connect timeout"),
+        pytest.param(requests.ConnectionError(), True, id="connection error"),
+        pytest.param(json.JSONDecodeError("bad", "<html>", 0), True, id="decode"),
+        pytest.param(fetcher.APIError("105", "unavailable", ""), True, id="transient"),
+        pytest.param(fetcher.APIError("120", "bad", ""), False, id="api error"),
+        pytest.param(requests.exceptions.InvalidURL(), False, id="invalid url"),
+        pytest.param(KeyError("page"), False, id="other"),
+    ),
+)
+def test_retry_policy_retriable(error, expected):
+    assert fetcher.RetryPolicy().retriable(error) is expected
+
+
+def test_retry_policy_waits():
+    waits = list(fetcher.RetryPolicy(tries=5, wait=1, max_wait=3).waits())
+    assert len(waits) == 4
+    assert all(
+        0 <= wait <= limit for wait, limit in zip(waits, [1, 2, 3, 3], strict=True)
+    )
+
+
+def test_interrupted_fetch_resumed(mock_fetcher):
+    responses = pages(4)
+    mock_fetcher.retry = fetcher.RetryPolicy(tries=1)
+    mock_fetcher.session.get = mock.Mock(
+        side_effect=[MockHTTPResponse(i) for i in responses[:2]] + [requests.Timeout()]
+    )
+    with pytest.raises(requests.Timeout):
+        mock_fetcher.fetch("http://foo.bar", skip_cache=True)
+    key = fetcher.cache_key(
+        "http://foo.bar", {"format": "json", "per_page": fetcher.PER_PAGE}
+    )
+    assert mock_fetcher._load_checkpoint(key) == 2
+    mock_fetcher.session.get = mock.Mock(
+        side_effect=[MockHTTPResponse(i) for i in responses[2:]]
+    )
+    got = mock_fetcher.fetch("http://foo.bar", skip_cache=True)
+    assert got == [{"id": str(i)} for i in range(1, 5)]
+    got_pages = [
+        i.kwargs["params"]["page"] for i in mock_fetcher.session.get.mock_calls
+    ]
+    assert got_pages == [3, 4]
+    assert mock_fetcher._load_checkpoint(key) == 0
+
+
+def _error_response(id_):
+    return MockHTTPResponse([{"message": [{"id": id_, "key": "k", "value": "v"}]}])
+
+
+@pytest.mark.parametrize(
+    ["failure", "error", "saved"],
+    (
+        pytest.param(KeyboardInterrupt(), KeyboardInterrupt, True, id="interrupt"),
+        pytest.param(
+            requests.ConnectionError(), requests.ConnectionError, True, id="connection"
+        ),
+        pytest.param(_error_response("199"), fetcher.APIError, True, id="transient"),
+        pytest.param(_error_response("120"), fetcher.APIError, False, id="api error"),
+        pytest.param(
+            requests.exceptions.InvalidURL(),
+            requests.exceptions.InvalidURL,
+            False,
+            id="invalid url",
+        ),
+    ),
+)
+def test_checkpoint_saved_for_retriable_errors(mock_fetcher, failure, error, saved):
+    mock_fetcher.retry = fetcher.RetryPolicy(tries=1)
+    mock_fetcher.session.get = mock.Mock(
+        side_effect=[MockHTTPResponse(pages(3)[0]), failure]
+    )
+    with pytest.raises(error):
+        mock_fetcher.fetch("http://foo.bar")
+    key = fetcher.cache_key(
+        "http://foo.bar", {"format": "json", "per_page": fetcher.PER_PAGE}
+    )
+    assert mock_fetcher._load_checkpoint(key) == (1 if saved else 0)
+
+
+def test_checkpoints_expire(mock_fetcher):
+    key = fetcher.cache_key("http://foo.bar", {})
+    mock_fetcher._save_checkpoint(key, 3)
+    assert mock_fetcher._load_checkpoint(key) == 3
+    mock_fetcher.cache[fetcher._checkpoint_key(key)] = (3, dt.datetime.now())
+    assert mock_fetcher._load_checkpoint(key) == 0
+    assert mock_fetcher.cache == {}
+    mock_fetcher.checkpoint_ttl = dt.timedelta(0)
+    mock_fetcher._save_checkpoint(key, 3)
+    assert mock_fetcher.cache == {}
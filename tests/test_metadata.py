@@ -0,0 +1,147 @@
+import datetime as dt
+import threading
+from unittest import mock
+
+import pytest
+
+from wbdata import client, metadata
+
+
+def country(iso3, iso2, name, region, income, lending):
+    return {
+        "id": iso3,
+        "iso2Code": iso2,
+        "name": name,
+        "region": {"id": region, "iso2code": region[:2], "value": region},
+        "adminregion": {"id": "", "iso2code": "", "value": ""},
+        "incomeLevel": {"id": income, "iso2code": "X" + income[0], "value": income},
+        "lendingType": {"id": lending, "iso2code": "X" + lending[0], "value": lending},
+    }
+
+
+COUNTRIES = [
+    country("ARG", "AR", "Argentina", "LCN", "UMC", "IBD"),
+    country("GBR", "GB", "United Kingdom", "ECS", "HIC", "LNX"),
+    country("KEN", "KE", "Kenya", "SSF", "LMC", "IDB"),
+    country("USA", "US", "United States", "NAC", "HIC", "LNX"),
+]
+
+
+@pytest.fixture
+def countries():
+    return metadata.Table(COUNTRIES, metadata.INDEXES["countries"])
+
+
+@pytest.mark.parametrize(
+    ["filters", "expected"],
+    [
+        pytest.param({}, ["ARG", "GBR", "KEN", "USA"], id="no filters"),
+        pytest.param({"id": ["usa", "gb"]}, ["GBR", "USA"], id="iso3 and iso2"),
+        pytest.param({"incomeLevel": ["HIC"]}, ["GBR", "USA"], id="income level"),
+        pytest.param({"incomeLevel": ["xh"]}, ["GBR", "USA"], id="iso2 code"),
+        pytest.param(
+            {"incomeLevel": ["HIC", "UMC"], "lendingType": ["LNX"]},
+            ["GBR", "USA"],
+            id="combined",
+        ),
+        pytest.param({"region": ["SSF"]}, ["KEN"], id="aggregate membership"),
+        pytest.param({"id": ["USA", "XYZ"]}, None, id="unknown"),
+    ],
+)
+def test_table_find(countries, filters, expected):
+    found = countries.find(**filters)
+    assert (None if found is None else [i["id"] for i in found]) == expected
+
+
+def test_table_find_returns_copies(countries):
+    countries.find()[0]["name"] = "Changed"
+    assert countries.rows[0]["name"] == "Argentina"
+
+
+def test_metadata_ttl():
+    now = dt.datetime(2024, 1, 1)
+    load = mock.Mock(return_value=COUNTRIES)
+    tables = metadata.Metadata(load, ttl=dt.timedelta(hours=1), timer=lambda: now)
+    assert len(tables.table("countries")) == 4
+    tables.table("countries")
+    load.assert_called_once_with("countries", False)
+    now += dt.timedelta(hours=2)
+    tables.table("countries")
+    tables.table("countries", skip_cache=True)
+    assert load.call_args_list[1:] == [
+        mock.call("countries", False),
+        mock.call("countries", True),
+    ]
+    tables.clear()
+    tables.table("countries")
+    assert load.call_count == 4
+
+
+def test_metadata_clear_waits_for_loads():
+    loading, release = threading.Event(), threading.Event()
+
+    def load(name, skip_cache):
+        loading.set()
+        release.wait(5)
+        return COUNTRIES
+
+    tables = metadata.Metadata(load)
+    loader = threading.Thread(target=tables.table, args=("countries",))
+    loader.start()
+    loading.wait(5)
+    clearer = threading.Thread(target=tables.clear)
+    clearer.start()
+    clearer.join(0.1)
+    assert clearer.is_alive()
+    release.set()
+    loader.join(5)
+    clearer.join(5)
+    assert not tables._tables
+
+
+@pytest.fixture
+def metadata_client():
+    with mock.patch("wbdata.client.fetcher.Fetcher", mock.Mock):
+        metadata_client = client.Client(local_metadata=True)
+    metadata_client.fetcher.fetch = mock.Mock(return_value=COUNTRIES)
+    return metadata_client
+
+
+def test_get_countries_local(metadata_client):
+    got = metadata_client.get_countries(incomelevel="HIC", query="states")
+    assert [i["id"] for i in got] == ["USA"]
+    got = metadata_client.get_countries(["usa", "KE"])
+    assert [i["id"] for i in got] == ["KEN", "USA"]
+    assert len(metadata_client.get_countries()) == 4
+    metadata_client.fetcher.fetch.assert_called_once_with(
+        url=client.COUNTRIES_URL, skip_cache=False
+    )
+
+
+def test_get_countries_falls_back(metadata_client):
+    metadata_client.get_countries(incomelevel="NOPE")
+    metadata_client.fetcher.fetch.assert_called_with(
+        url=client.COUNTRIES_URL, params={"incomeLevel": "NOPE"}, skip_cache=False
+    )
+    metadata_client.get_countries("XYZ")
+    metadata_client.fetcher.fetch.assert_called_with(
+        url=f"{client.COUNTRIES_URL}/XYZ", skip_cache=False
+    )
+
+
+def test_get_sources_local(metadata_client):
+    metadata_client.fetcher.fetch.return_value = [
+        {"id": "2", "name": "World Development Indicators"},
+        {"id": "11", "name": "Africa Development Indicators"},
+    ]
+    assert metadata_client.get_sources(11) == [
+        {"id": "11", "name": "Africa Development Indicators"}
+    ]
+    metadata_client.fetcher.fetch.assert_called_once_with(
+        url=client.SOURCE_URL, skip_cache=False
+    )
+
+
+def test_metadata_disabled():
+    with mock.patch("wbdata.client.fetcher.Fetcher", mock.Mock):
+        assert client.Client().metadata is None
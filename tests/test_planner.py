@@ -0,0 +1,104 @@
+import pytest
+
+from wbdata import fetcher, planner
+
+URL = "https://api.worldbank.org/v2/countries/{}/indicators/NY.GDP.MKTP.CD"
+
+
+def parse(country="all", **params):
+    return planner.Query.parse(URL.format(country), params.items())
+
+
+@pytest.mark.parametrize(
+    ["covering", "query", "expected"],
+    [
+        pytest.param(parse(), parse("USA;gbr"), True, id="all countries"),
+        pytest.param(parse("USA;GBR;KEN"), parse("gbr"), True, id="country subset"),
+        pytest.param(parse("USA"), parse("USA;GBR"), False, id="country superset"),
+        pytest.param(parse("USA"), parse(), False, id="all from some"),
+        pytest.param(parse(), parse(date="2010:2015"), True, id="all dates"),
+        pytest.param(
+            parse(date="2000:2020"), parse(date="2015:2010"), True, id="date subset"
+        ),
+        pytest.param(
+            parse(date="2010:2015"), parse(date="2009:2012"), False, id="date overlap"
+        ),
+        pytest.param(parse(date="2010"), parse(), False, id="dates from some"),
+        pytest.param(
+            parse(date="2010M01:2010M12"),
+            parse(date="2010"),
+            False,
+            id="other frequency",
+        ),
+        pytest.param(
+            parse(date="2010M01:2010M12"),
+            parse(date="2010M03:2010M04"),
+            True,
+            id="months",
+        ),
+        pytest.param(parse(source="2"), parse(source=2), True, id="source"),
+        pytest.param(parse(source="2"), parse(), False, id="other source"),
+    ],
+)
+def test_covers(covering, query, expected):
+    assert covering.covers(query) is expected
+
+
+@pytest.mark.parametrize(
+    ["url", "params"],
+    [
+        pytest.param("https://api.worldbank.org/v2/sources", {}, id="not observations"),
+        pytest.param(URL.format("all"), {"date": "MRV"}, id="unparseable date"),
+    ],
+)
+def test_parse_unsupported(url, params):
+    assert planner.Query.parse(url, params.items()) is None
+
+
+def row(country_id, iso3, date):
+    return {
+        "indicator": {"id": "NY.GDP.MKTP.CD", "value": "GDP (current US$)"},
+        "country": {"id": country_id, "value": iso3},
+        "countryiso3code": iso3,
+        "date": date,
+        "value": 1.0,
+    }
+
+
+RESULT = fetcher.CompactResult(
+    row(country_id, iso3, date)
+    for country_id, iso3 in [("GB", "GBR"), ("KE", "KEN"), ("US", "USA")]
+    for date in ["2012", "2011", "2010"]
+)
+
+
+def test_select():
+    assert parse("usa;GB", date="2011:2012").select(RESULT) == [0, 1, 6, 7]
+    assert parse().select(RESULT) == list(range(9))
+
+
+def test_select_unmatched_country():
+    assert parse("USA;XYZ").select(RESULT) is None
+
+
+def test_select_other_frequency():
+    assert parse(date="2010M01").select(RESULT) is None
+
+
+def test_find_covering():
+    params = {"format": "json", "per_page": 1000}
+    keys = [
+        (URL.format("all"), (("format", "json"), ("page", 2), ("per_page", 1000))),
+        (URL.format("KEN"), (("format", "json"), ("per_page", 1000))),
+        (URL.format("all"), (("format", "json"), ("per_page", 1000))),
+    ]
+    covering = planner.find_covering(keys, URL.format("USA"), params)
+    assert covering is not None
+    covering_url, covering_params, query = covering
+    assert (covering_url, covering_params) == (URL.format("all"), params)
+    assert query == parse("USA", **params)
+    assert planner.find_covering(keys[:2], URL.format("USA"), params) is None
+    incomplete = planner.find_covering(
+        keys, URL.format("USA"), params, complete=lambda url, params: "KEN" in url
+    )
+    assert incomplete is None
@@ -0,0 +1,187 @@
+import datetime as dt
+import pickle
+import re
+from unittest import mock
+
+import pytest
+
+from wbdata import client, search
+
+
+def indicator(indicator_id, name, note="", topics=()):
+    return {
+        "id": indicator_id,
+        "name": name,
+        "unit": "",
+        "source": {"id": "2", "value": "World Development Indicators"},
+        "sourceNote": note,
+        "sourceOrganization": "",
+        "topics": [{"id": str(i), "value": topic} for i, topic in enumerate(topics)],
+    }
+
+
+@pytest.fixture
+def catalog():
+    return [
+        indicator("NY.GDP.MKTP.CD", "GDP (current US$)", "Gross domestic product"),
+        indicator(
+            "NY.GDP.PCAP.CD",
+            "GDP per capita (current US$)",
+            "GDP divided by midyear population",
+            topics=["Economy & Growth"],
+        ),
+        indicator("SP.POP.TOTL", "Population, total", "Counts all residents"),
+        indicator(
+            "SP.POP.GROW",
+            "Population growth (annual %)",
+            topics=["Health", "Economy & Growth"],
+        ),
+    ]
+
+
+@pytest.fixture
+def index(catalog):
+    return search.SearchIndex(catalog)
+
+
+def ids(results):
+    return [i["id"] for i in results]
+
+
+@pytest.mark.parametrize(
+    ["text", "expected"],
+    [
+        ("GDP (current US$)", ["gdp", "current", "us"]),
+        ("NY.GDP.MKTP.CD", ["ny", "gdp", "mktp", "cd"]),
+        ("Economy & Growth_rate", ["economy", "growth", "rate"]),
+        ("Café  2023", ["café", "2023"]),
+    ],
+)
+def test_tokenize(text, expected):
+    assert search.tokenize(text) == expected
+
+
+@pytest.mark.parametrize(
+    ["query", "expected"],
+    [
+        pytest.param(
+            "gdp",
+            ["NY.GDP.PCAP.CD", "NY.GDP.MKTP.CD"],
+            id="more matching fields first",
+        ),
+        pytest.param("GDP capita", ["NY.GDP.PCAP.CD"], id="all keywords match"),
+        pytest.param(
+            "popul*", ["SP.POP.GROW", "SP.POP.TOTL", "NY.GDP.PCAP.CD"], id="prefix"
+        ),
+        pytest.param("growth", ["SP.POP.GROW", "NY.GDP.PCAP.CD"], id="topics"),
+        pytest.param("pop.totl", ["SP.POP.TOTL"], id="id"),
+        pytest.param("gdp zebra", [], id="no match"),
+        pytest.param("  ", [], id="empty"),
+    ],
+)
+def test_search_keywords(index, query, expected):
+    assert ids(index.search(query)) == expected
+
+
+def test_search_limit(index):
+    assert ids(index.search("gdp", limit=1)) == ["NY.GDP.PCAP.CD"]
+
+
+def test_search_pattern(index):
+    assert ids(index.search(re.compile(r"capita|residents"))) == [
+        "NY.GDP.PCAP.CD",
+        "SP.POP.TOTL",
+    ]
+
+
+def test_update(index, catalog):
+    assert index.update(catalog) == 0
+    catalog[0] = indicator("NY.GDP.MKTP.CD", "Gross product", "Zebra")
+    del catalog[2]
+    catalog.append(indicator("EN.ATM.CO2E.KT", "CO2 emissions (kt)"))
+    assert index.update(catalog) == 3
+    assert len(index) == 4
+    assert ids(index.search("zebra")) == ["NY.GDP.MKTP.CD"]
+    assert ids(index.search("residents")) == []
+    assert ids(index.search("emissions")) == ["EN.ATM.CO2E.KT"]
+    assert ids(index.search("gdp")) == ["NY.GDP.PCAP.CD", "NY.GDP.MKTP.CD"]
+
+
+def test_update_renumbers_removed(index, catalog):
+    for i in range(5):
+        catalog[0] = indicator("NY.GDP.MKTP.CD", f"GDP revision{i}")
+        index.update(catalog)
+    assert len(index._ids) == 4
+    assert None not in index._ids
+    assert ids(index.search("revision4")) == ["NY.GDP.MKTP.CD"]
+    assert sorted(ids(index.search("gdp"))) == ["NY.GDP.MKTP.CD", "NY.GDP.PCAP.CD"]
+    assert ids(index.search("residents")) == ["SP.POP.TOTL"]
+
+
+def test_save_and_load(index, tmp_path):
+    path = tmp_path / "index.pickle"
+    index.save(path)
+    loaded = search.SearchIndex.load(path)
+    assert loaded is not None
+    assert loaded.synced == index.synced
+    assert ids(loaded.search("popul*")) == ids(index.search("popul*"))
+    assert loaded.update([indicator("SP.POP.TOTL", "Population")]) == 4
+    assert ids(loaded.search("popul*")) == ["SP.POP.TOTL"]
+
+
+def test_load_unusable(tmp_path):
+    path = tmp_path / "index.pickle"
+    assert search.SearchIndex.load(path) is None
+    path.write_bytes(b"garbage")
+    assert search.SearchIndex.load(path) is None
+    old = search.SearchIndex()
+    old.version = search.VERSION - 1
+    path.write_bytes(pickle.dumps(old))
+    assert search.SearchIndex.load(path) is None
+
+
+def test_index_path():
+    assert search.index_path("/foo/cache") == search.index_path(
+        "/foo/cache.db"
+    ).with_name("cache-search-index.pickle")
+
+
+@pytest.fixture
+def search_client(tmp_path, catalog):
+    with mock.patch("wbdata.client.fetcher.Fetcher", mock.Mock):
+        search_client = client.Client(cache_path=tmp_path / "cache")
+    search_client.fetcher.fetch = mock.Mock(return_value=catalog)
+    return search_client
+
+
+def test_search_indicators(search_client, tmp_path):
+    got = search_client.search_indicators("gdp capita")
+    assert isinstance(got, client.SearchResult)
+    assert ids(got) == ["NY.GDP.PCAP.CD"]
+    assert (tmp_path / "cache-search-index.pickle").exists()
+    search_client.search_indicators("popul*")
+    search_client.fetcher.fetch.assert_called_once_with(
+        url=client.INDICATOR_URL, skip_cache=False
+    )
+
+
+def test_search_indicators_resync(search_client, catalog):
+    search_client.search_indicators("gdp")
+    catalog.append(indicator("EN.ATM.CO2E.KT", "CO2 emissions (kt)"))
+    assert ids(search_client.search_indicators("emissions")) == []
+    assert ids(search_client.search_indicators("emissions", skip_cache=True)) == [
+        "EN.ATM.CO2E.KT"
+    ]
+    search_client._search_index.synced -= dt.timedelta(days=30)
+    catalog.pop()
+    assert ids(search_client.search_indicators("emissions")) == []
+    assert search_client.fetcher.fetch.call_count == 3
+
+
+def test_search_indicators_loads_saved_index(search_client, tmp_path, catalog):
+    search_client.search_indicators("gdp")
+    with mock.patch("wbdata.client.fetcher.Fetcher", mock.Mock):
+        other = client.Client(cache_path=tmp_path / "cache")
+    other.fetcher.fetch = mock.Mock()
+    assert ids(other.search_indicators("capita")) == ["NY.GDP.PCAP.CD"]
+    other.fetcher.fetch.assert_not_called()
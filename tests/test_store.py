@@ -0,0 +1,343 @@
+import datetime as dt
+import io
+import zipfile
+from unittest import mock
+
+import pytest
+
+from wbdata import client, fetcher, store
+
+DATA = """\
+"Country Name","Country Code","Indicator Name","Indicator Code","2020","2021","2022",
+"World","WLD","Population, total","SP.POP.TOTL","7800","7880","7950",
+"World","WLD","GDP (current US$)","NY.GDP.MKTP.CD","85","97","",
+"Kenya","KEN","Population, total","SP.POP.TOTL","51.9","53","54",
+"United States","USA","Population, total","SP.POP.TOTL","331.5","332","333.3",
+"United States","USA","GDP (current US$)","NY.GDP.MKTP.CD","21","23.3","25.4",
+"""
+
+COUNTRIES = """\
+"Country Code","Short Name","2-alpha code",
+"KEN","Kenya","KE",
+"USA","United States","US",
+"WLD","World","1W",
+"""
+
+SINGLE = """\
+"Data Source","World Development Indicators",
+
+"Last Updated Date","2024-06-28",
+
+"Country Name","Country Code","Indicator Name","Indicator Code","2021","2022",
+"Kenya","KEN","Urban population","SP.URB.TOTL","14.6","15.2",
+"""
+
+
+@pytest.fixture
+def archive():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        zf.writestr("WDICSV.csv", DATA)
+        zf.writestr("WDICountry.csv", COUNTRIES)
+        zf.writestr("WDISeries.csv", '"Series Code","Topic"\n"SP.POP.TOTL","Health"\n')
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.fixture
+def data_store(tmp_path, archive):
+    data_store = store.DataStore(tmp_path / "store")
+    data_store.ingest(archive, source=2, last_updated=dt.date(2024, 7, 1))
+    return data_store
+
+
+def test_ingest(data_store):
+    dataset = data_store.datasets["source_2"]
+    assert dataset.source == "2"
+    assert dataset.last_updated == "2024-07-01"
+    assert dataset.dates == ["2022", "2021", "2020"]
+    assert dataset.countries == [
+        ("1W", "World", "WLD"),
+        ("KE", "Kenya", "KEN"),
+        ("US", "United States", "USA"),
+    ]
+    assert dataset.indicators == {
+        "SP.POP.TOTL": "Population, total",
+        "NY.GDP.MKTP.CD": "GDP (current US$)",
+    }
+
+
+def test_query(data_store):
+    got = data_store.query("NY.GDP.MKTP.CD", country="US;wld", date="2021:2022")
+    assert got == [
+        {
+            "indicator": {"id": "NY.GDP.MKTP.CD", "value": "GDP (current US$)"},
+            "country": {"id": "1W", "value": "World"},
+            "countryiso3code": "WLD",
+            "date": "2022",
+            "value": None,
+            "unit": "",
+            "obs_status": "",
+            "decimal": 0,
+        },
+        {
+            "indicator": {"id": "NY.GDP.MKTP.CD", "value": "GDP (current US$)"},
+            "country": {"id": "1W", "value": "World"},
+            "countryiso3code": "WLD",
+            "date": "2021",
+            "value": 97.0,
+            "unit": "",
+            "obs_status": "",
+            "decimal": 0,
+        },
+        {
+            "indicator": {"id": "NY.GDP.MKTP.CD", "value": "GDP (current US$)"},
+            "country": {"id": "US", "value": "United States"},
+            "countryiso3code": "USA",
+            "date": "2022",
+            "value": 25.4,
+            "unit": "",
+            "obs_status": "",
+            "decimal": 0,
+        },
+        {
+            "indicator": {"id": "NY.GDP.MKTP.CD", "value": "GDP (current US$)"},
+            "country": {"id": "US", "value": "United States"},
+            "countryiso3code": "USA",
+            "date": "2021",
+            "value": 23.3,
+            "unit": "",
+            "obs_status": "",
+            "decimal": 0,
+        },
+    ]
+    assert got.last_updated == dt.datetime(2024, 7, 1)
+
+
+def test_query_missing_country_rows(data_store):
+    got = data_store.query("NY.GDP.MKTP.CD", country="KEN", date="2022")
+    assert [(i["countryiso3code"], i["value"]) for i in got] == [("KEN", None)]
+
+
+def test_query_compact(data_store):
+    got = data_store.query("SP.POP.TOTL", compact=True)
+    assert isinstance(got, fetcher.CompactResult)
+    assert got.to_result() == data_store.query("SP.POP.TOTL")
+    assert len(got) == 9
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        pytest.param({"indicator": "NOPE"}, id="unknown indicator"),
+        pytest.param({"country": "USA;XYZ"}, id="unknown country"),
+        pytest.param({"date": "2023:2024"}, id="years not held"),
+        pytest.param({"date": "2021:2023"}, id="years partly held"),
+        pytest.param({"date": "2019:2020"}, id="years partly held before"),
+        pytest.param({"date": "2021M01"}, id="not years"),
+        pytest.param({"source": 11}, id="other source"),
+    ],
+)
+def test_query_unanswerable(data_store, kwargs):
+    assert data_store.query(**{"indicator": "SP.POP.TOTL", **kwargs}) is None
+
+
+def test_reopen(data_store):
+    reopened = store.DataStore(data_store.path)
+    assert reopened.datasets == data_store.datasets
+    assert reopened.query("SP.POP.TOTL", source="2") == data_store.query("SP.POP.TOTL")
+
+
+def test_ingest_single_indicator_csv(tmp_path):
+    path = tmp_path / "API_SP.URB.TOTL_DS2_en_csv_v2.csv"
+    path.write_text(SINGLE)
+    data_store = store.DataStore(tmp_path / "store")
+    dataset = data_store.ingest(path)
+    assert dataset.last_updated == "2024-06-28"
+    assert dataset.source is None
+    got = data_store.query("SP.URB.TOTL", country="KEN")
+    assert got is not None
+    assert [(i["country"]["id"], i["date"], i["value"]) for i in got] == [
+        ("KEN", "2022", 15.2),
+        ("KEN", "2021", 14.6),
+    ]
+    assert data_store.query("SP.URB.TOTL", source=2) is None
+
+
+def test_ingest_replaces_dataset(data_store):
+    data_store.ingest(io.BytesIO(SINGLE.encode()), source=2)
+    assert data_store.query("SP.POP.TOTL") is None
+    assert data_store.query("SP.URB.TOTL", source=2) is not None
+
+
+def test_ingest_without_data(tmp_path):
+    with pytest.raises(ValueError):
+        store.DataStore(tmp_path).ingest(io.BytesIO(COUNTRIES.encode()))
+
+
+@pytest.fixture
+def store_client(data_store):
+    with mock.patch("wbdata.client.fetcher.Fetcher", mock.Mock):
+        store_client = client.Client(store=data_store.path)
+    store_client.fetcher.fetch = mock.Mock(return_value=fetcher.Result())
+    return store_client
+
+
+def test_get_data_from_store(store_client):
+    got = store_client.get_data("SP.POP.TOTL", country=["KE"], date="2022")
+    assert [(i["country"]["value"], i["value"]) for i in got] == [("Kenya", 54.0)]
+    store_client.fetcher.fetch.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        pytest.param({"indicator": "NOPE"}, id="unknown indicator"),
+        pytest.param({"freq": "M"}, id="monthly"),
+        pytest.param({"skip_cache": True}, id="skip cache"),
+        pytest.param({"source": [2, 11]}, id="several sources"),
+    ],
+)
+def test_get_data_falls_back(store_client, kwargs):
+    store_client.get_data(**{"indicator": "SP.POP.TOTL", **kwargs})
+    store_client.fetcher.fetch.assert_called_once()
+
+
+def test_get_series_from_store(store_client):
+    got = store_client.get_series("SP.POP.TOTL", country="USA", date=("2021", "2022"))
+    assert got.to_dict() == {"2022": 333.3, "2021": 332.0}
+    assert got.last_updated == dt.datetime(2024, 7, 1)
+    store_client.fetcher.fetch.assert_not_called()
+
+
+def observation(country_id, iso3, date, value):
+    return {
+        "indicator": {"id": "SP.POP.TOTL", "value": "Population, total"},
+        "country": {"id": country_id, "value": f"Country {iso3}"},
+        "countryiso3code": iso3,
+        "date": date,
+        "value": value,
+        "unit": "",
+        "obs_status": "",
+        "decimal": 0,
+    }
+
+
+ALL_ROWS = [
+    observation(country_id, iso3, date, value)
+    for country_id, iso3 in [("1W", "WLD"), ("KE", "KEN"), ("US", "USA")]
+    for date, value in [("2022", 3), ("2021", 2), ("2020", None)]
+]
+
+
+@pytest.fixture
+def sqlite_store():
+    sqlite_store = store.SQLiteStore(":memory:")
+    yield sqlite_store
+    sqlite_store.close()
+
+
+def test_sqlite_store_covers_subsets(sqlite_store):
+    assert sqlite_store.missing("SP.POP.TOTL", "US;KEN") == ["KEN", "US"]
+    assert sqlite_store.query("SP.POP.TOTL", "US") is None
+    sqlite_store.upsert(
+        "SP.POP.TOTL",
+        fetcher.Result(ALL_ROWS, last_updated=dt.datetime(2024, 7, 1)),
+        country="all",
+        date="2020:2022",
+    )
+    assert sqlite_store.query("SP.POP.TOTL", date="2020:2022") == ALL_ROWS
+    got = sqlite_store.query("SP.POP.TOTL", "usa;ke", date="2021")
+    assert got == [ALL_ROWS[4], ALL_ROWS[7]]
+    assert got.last_updated == dt.datetime(2024, 7, 1)
+    assert sqlite_store.missing("SP.POP.TOTL", "USA", "2019:2021") == ["USA"]
+    assert sqlite_store.missing("SP.POP.TOTL", "USA") == ["USA"]
+    assert sqlite_store.missing("SP.POP.TOTL", "USA", "2021", source=2) == ["USA"]
+    assert sqlite_store.missing("SP.POP.TOTL", "USA", "2021M01") is None
+
+
+def test_sqlite_store_partial_coverage(sqlite_store):
+    sqlite_store.upsert("SP.POP.TOTL", fetcher.Result(ALL_ROWS[3:6]), country="KEN")
+    assert sqlite_store.missing("SP.POP.TOTL", ["KE", "KEN", "US"]) == ["US"]
+    sqlite_store.upsert("SP.POP.TOTL", fetcher.Result(ALL_ROWS[6:]), country="US")
+    got = sqlite_store.query("SP.POP.TOTL", ["KE", "US"], compact=True)
+    assert isinstance(got, fetcher.CompactResult)
+    assert got.to_result() == ALL_ROWS[3:]
+
+
+def test_sqlite_store_indicator_case(sqlite_store):
+    sqlite_store.upsert("sp.pop.totl", fetcher.Result(ALL_ROWS[6:]), country="US")
+    assert sqlite_store.missing("SP.POP.TOTL", "US") == []
+    assert sqlite_store.query("SP.POP.TOTL", "US") == ALL_ROWS[6:]
+    sqlite_store.upsert("SP.POP.TOTL", fetcher.Result(ALL_ROWS[3:6]), country="KE")
+    assert sqlite_store.missing(" Sp.Pop.Totl", "KE;US") == []
+
+
+def test_sqlite_store_upsert_replaces_values(sqlite_store):
+    sqlite_store.upsert("SP.POP.TOTL", fetcher.Result(ALL_ROWS[6:]), country="US")
+    revised = {**ALL_ROWS[6], "value": 4}
+    sqlite_store.upsert("SP.POP.TOTL", fetcher.Result([revised]), "US", "2022")
+    assert sqlite_store.query("SP.POP.TOTL", "US") == [revised, *ALL_ROWS[7:]]
+
+
+def test_sqlite_store_max_age(sqlite_store):
+    now = dt.datetime(2024, 1, 1)
+    sqlite_store.max_age = dt.timedelta(days=1)
+    sqlite_store.timer = lambda: now
+    sqlite_store.upsert("SP.POP.TOTL", fetcher.Result(ALL_ROWS[6:]), country="US")
+    assert sqlite_store.missing("SP.POP.TOTL", "US") == []
+    now += dt.timedelta(days=2)
+    assert sqlite_store.missing("SP.POP.TOTL", "US") == ["US"]
+
+
+def test_sqlite_store_persists(tmp_path):
+    path = tmp_path / "store.sqlite"
+    sqlite_store = store.SQLiteStore(path)
+    sqlite_store.upsert("SP.POP.TOTL", fetcher.Result(ALL_ROWS), country="all")
+    sqlite_store.close()
+    with mock.patch("wbdata.client.fetcher.Fetcher", mock.Mock):
+        sqlite_client = client.Client(store=path)
+    assert isinstance(sqlite_client.store, store.SQLiteStore)
+    assert sqlite_client.store.query("SP.POP.TOTL", "KE") == ALL_ROWS[3:6]
+
+
+@pytest.fixture
+def sqlite_client(sqlite_store):
+    with mock.patch("wbdata.client.fetcher.Fetcher", mock.Mock):
+        sqlite_client = client.Client(store=sqlite_store)
+    return sqlite_client
+
+
+def test_get_data_fetches_missing_countries(sqlite_client):
+    sqlite_client.fetcher.fetch = mock.Mock(return_value=fetcher.Result(ALL_ROWS[3:6]))
+    assert sqlite_client.get_data("SP.POP.TOTL", "KEN") == ALL_ROWS[3:6]
+    sqlite_client.fetcher.fetch.assert_called_once_with(
+        url=f"{client.COUNTRIES_URL}/KEN/indicators/SP.POP.TOTL",
+        params={},
+        skip_cache=False,
+    )
+    sqlite_client.fetcher.fetch = mock.Mock(return_value=fetcher.Result(ALL_ROWS[6:]))
+    got = sqlite_client.get_data("SP.POP.TOTL", ["KE", "USA"], date=("2021", "2022"))
+    assert got == [ALL_ROWS[3], ALL_ROWS[4], ALL_ROWS[6], ALL_ROWS[7]]
+    sqlite_client.fetcher.fetch.assert_called_once_with(
+        url=f"{client.COUNTRIES_URL}/USA/indicators/SP.POP.TOTL",
+        params={"date": "2021:2022"},
+        skip_cache=False,
+    )
+    sqlite_client.fetcher.fetch.reset_mock()
+    sqlite_client.get_data("SP.POP.TOTL", "US", date="2022")
+    sqlite_client.fetcher.fetch.assert_not_called()
+
+
+def test_get_data_skip_cache_refetches(sqlite_client):
+    sqlite_client.fetcher.fetch = mock.Mock(return_value=fetcher.Result(ALL_ROWS))
+    sqlite_client.get_data("SP.POP.TOTL")
+    sqlite_client.get_data("SP.POP.TOTL", skip_cache=True)
+    assert sqlite_client.fetcher.fetch.call_args_list == [
+        mock.call(
+            url=f"{client.COUNTRIES_URL}/all/indicators/SP.POP.TOTL",
+            params={},
+            skip_cache=skip_cache,
+        )
+        for skip_cache in (False, True)
+    ]
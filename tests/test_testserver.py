@@ -0,0 +1,179 @@
+import dataclasses
+import threading
+
+import pytest
+import requests
+
+from wbdata import client, fetcher, testserver
+
+
+@pytest.fixture(scope="module")
+def server():
+    with testserver.StandInServer(
+        dataset=testserver.Dataset(n_countries=10, n_indicators=6, first_year=2000),
+        max_per_page=25,
+    ) as stand_in:
+        yield stand_in
+
+
+@pytest.fixture
+def stand_in_client(server, tmp_path):
+    return client.Client(base_url=server.base_url, cache_path=tmp_path / "cache")
+
+
+def test_base_url(stand_in_client, server):
+    assert stand_in_client._url(client.COUNTRIES_URL) == f"{server.base_url}/countries"
+    assert stand_in_client._url("https://foo.bar") == "https://foo.bar"
+
+
+def test_paged_data(stand_in_client, server):
+    indicator = server.dataset.indicators[0]["id"]
+    got = stand_in_client.get_data(indicator)
+    n_countries = len(server.dataset.countries)
+    assert len(got) == n_countries * 24
+    assert got[0]["date"] == "2023"
+    assert got.last_updated is not None
+    assert sum(1 for path, _ in server.requests if indicator in path) > 1
+
+
+@pytest.mark.parametrize(
+    ["date", "freq", "expected"],
+    (
+        pytest.param("2010", "Y", ["2010"], id="year"),
+        pytest.param(("2010", "2012"), "Y", ["2012", "2011", "2010"], id="years"),
+        pytest.param(
+            ("2010M11", "2011M01"), "M", ["2011M01", "2010M12", "2010M11"], id="months"
+        ),
+        pytest.param(("2010Q4", "2011Q1"), "Q", ["2011Q1", "2010Q4"], id="quarters"),
+    ),
+)
+def test_dates(stand_in_client, server, date, freq, expected):
+    country = server.dataset.countries[0]["id"]
+    got = stand_in_client.get_data(
+        server.dataset.indicators[0]["id"], country=country, date=date, freq=freq
+    )
+    assert [row["date"] for row in got] == expected
+
+
+def test_metadata(stand_in_client, server):
+    assert len(stand_in_client.get_countries()) == len(server.dataset.countries)
+    high_income = stand_in_client.get_countries(incomelevel="HIC")
+    assert high_income
+    assert all(row["incomeLevel"]["id"] == "HIC" for row in high_income)
+    assert [i["id"] for i in stand_in_client.get_sources()] == ["2", "11", "15"]
+    assert len(stand_in_client.get_indicators(source=2)) == 2
+    assert len(stand_in_client.get_incomelevels()) == 7
+    assert len(stand_in_client.get_lendingtypes()) == 4
+    assert stand_in_client.get_topics("3")[0]["id"] == "3"
+
+
+def test_named_indicators(tmp_path):
+    dataset = testserver.Dataset(
+        n_countries=3,
+        n_indicators=4,
+        named_indicators=(("DPANUSSPB", "Exchange rate", "15"),),
+    )
+    with testserver.StandInServer(dataset=dataset) as stand_in:
+        stand_in_client = client.Client(
+            base_url=stand_in.base_url, cache_path=tmp_path / "cache"
+        )
+        indicator = stand_in_client.get_indicators("DPANUSSPB")[0]
+        assert indicator["name"] == "Exchange rate"
+        assert indicator["source"]["id"] == "15"
+        assert len(stand_in_client.get_indicators()) == 4
+        assert stand_in_client.get_data("DPANUSSPB", source=15, country="all")
+
+
+def test_api_error(stand_in_client):
+    with pytest.raises(RuntimeError, match=r"Got error 175"):
+        stand_in_client.get_data("NOT.AN.INDICATOR")
+
+
+def test_api_error_cached(stand_in_client, server):
+    requests_before = len(server.requests)
+    for _ in range(2):
+        with pytest.raises(fetcher.APIError, match=r"Got error 175"):
+            stand_in_client.get_data("NOT.AN.INDICATOR")
+    assert len(server.requests) == requests_before + 1
+
+
+def test_http_error_not_cached(stand_in_client, server):
+    stand_in_client.fetcher.retry = fetcher.RetryPolicy(tries=1)
+    server.fail_next(502)
+    with pytest.raises(ValueError):
+        stand_in_client.get_sources()
+    assert stand_in_client.get_sources()
+
+
+@pytest.mark.parametrize("status", (429, 500, 503))
+def test_injected_errors(server, status):
+    server.fail_next(status)
+    response = requests.get(f"{server.base_url}/sources", params={"format": "json"})
+    assert response.status_code == status
+    response = requests.get(f"{server.base_url}/sources", params={"format": "json"})
+    assert response.status_code == 200
+
+
+def test_injected_timeout(server):
+    server.stall = 2
+    server.fail_next("timeout")
+    with pytest.raises(requests.Timeout):
+        requests.get(f"{server.base_url}/sources", timeout=0.2)
+
+
+def test_serve_forever():
+    stand_in = testserver.StandInServer()
+    thread = threading.Thread(target=stand_in.serve_forever)
+    thread.start()
+    try:
+        response = requests.get(f"{stand_in.base_url}/sources?format=json", timeout=5)
+        assert response.status_code == 200
+    finally:
+        stand_in.stop()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    with pytest.raises(requests.ConnectionError):
+        requests.get(f"{stand_in.base_url}/sources?format=json", timeout=5)
+
+
+def test_unknown_endpoint(server):
+    response = requests.get(f"{server.base_url}/nothing")
+    assert response.status_code == 404
+
+
+def test_source_versions(server, tmp_path):
+    versioned = client.Client(
+        base_url=server.base_url,
+        cache_path=tmp_path / "cache",
+        source_versions=True,
+        source_check_minutes=0,
+    )
+    indicator = server.dataset.indicators[0]["id"]
+    first = versioned.get_data(indicator, country="all", date="2020")
+    requests_before = len(server.requests)
+    assert versioned.get_data(indicator, country="all", date="2020") == first
+    assert [path for path, _ in server.requests[requests_before:]] == ["/v2/sources"]
+    server.dataset = dataclasses.replace(server.dataset, last_updated="2099-01-01")
+    requests_before = len(server.requests)
+    versioned.get_data(indicator, country="all", date="2020")
+    paths = [path for path, _ in server.requests[requests_before:]]
+    assert paths[0] == "/v2/sources"
+    assert any(indicator in path for path in paths)
+
+
+def test_deadline_exceeded(stand_in_client, server):
+    indicator = server.dataset.indicators[1]["id"]
+    server.stall = 1
+    server.fail_next("timeout")
+    with pytest.raises(fetcher.DeadlineExceeded) as e:
+        stand_in_client.get_data(indicator, timeout=0.2)
+    assert e.value.pages == 0
+    assert e.value.partial == []
+
+
+def test_failed_page_retried(stand_in_client, server):
+    stand_in_client.fetcher.retry = fetcher.RetryPolicy(wait=0)
+    indicator = server.dataset.indicators[2]["id"]
+    server.fail_next(502)
+    got = stand_in_client.get_data(indicator)
+    assert len(got) == len(server.dataset.countries) * 24
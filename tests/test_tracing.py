@@ -0,0 +1,78 @@
+import json
+from unittest import mock
+
+import pytest
+
+from wbdata import fetcher, tracing
+
+
+class MockHTTPResponse:
+    def __init__(self, value):
+        self.text = json.dumps(value)
+
+
+@pytest.fixture
+def spans() -> list[tuple[str, bool]]:
+    return []
+
+
+@pytest.fixture
+def tracer(spans) -> tracing.Tracer:
+    return tracing.Tracer([lambda span: spans.append((span.name, span.end is None))])
+
+
+def test_span_start_and_end(tracer, spans):
+    with tracer.span("foo", bar="baz") as span:
+        span.attributes["bat"] = 1
+    assert spans == [("foo", True), ("foo", False)]
+    assert span.attributes == {"bar": "baz", "bat": 1}
+    assert span.duration is not None and span.duration >= 0
+
+
+def test_span_parent(tracer):
+    with tracer.span("outer") as outer, tracer.span("inner") as inner:
+        pass
+    assert inner.parent is outer
+    assert outer.parent is None
+
+
+def test_span_error(tracer):
+    with pytest.raises(ValueError), tracer.span("foo") as span:
+        raise ValueError("oops")
+    assert isinstance(span.error, ValueError)
+    assert span.end is not None
+
+
+def test_failing_hook_ignored():
+    hook = mock.Mock(side_effect=RuntimeError("bad hook"))
+    with tracing.Tracer([hook]).span("foo"):
+        pass
+    assert hook.call_count == 2
+
+
+def test_no_hooks():
+    with tracing.Tracer().span("foo", bar="baz") as span:
+        pass
+    assert span.attributes == {"bar": "baz"}
+
+
+def test_fetch_spans(tracer, spans):
+    mock_fetcher = fetcher.Fetcher(cache={}, session=mock.Mock(), tracer=tracer)
+    mock_fetcher.session.get = mock.Mock(
+        side_effect=[
+            MockHTTPResponse([{"page": "1", "pages": "2"}, [{"id": "a "}]]),
+            MockHTTPResponse([{"page": "2", "pages": "2"}, [{"id": "b "}]]),
+        ]
+    )
+    mock_fetcher.fetch("http://foo.bar")
+    finished = [name for name, started in spans if not started]
+    assert finished == [
+        "cache_lookup",
+        "http_request",
+        "json_decode",
+        "cache_lookup",
+        "http_request",
+        "json_decode",
+        "postprocess",
+        "fetch",
+    ]
@@ -0,0 +1,88 @@
+import datetime as dt
+from unittest import mock
+
+import pytest
+
+from wbdata import versions
+
+BASE = "https://api.worldbank.org/v2"
+
+
+@pytest.mark.parametrize(
+    ["key", "default", "expected"],
+    [
+        pytest.param(
+            (f"{BASE}/countries/all/indicators/FOO", (("source", 11),)),
+            True,
+            "11",
+            id="source param",
+        ),
+        pytest.param(
+            (f"{BASE}/sources/15/indicators", (("format", "json"),)),
+            True,
+            "15",
+            id="source url",
+        ),
+        pytest.param(
+            (f"{BASE}/countries/all/indicators/FOO", ()),
+            True,
+            "2",
+            id="observations default",
+        ),
+        pytest.param(
+            (f"{BASE}/countries/all/indicators/FOO", ()),
+            False,
+            None,
+            id="observations no default",
+        ),
+        pytest.param((f"{BASE}/sources", ()), True, None, id="list of sources"),
+        pytest.param((f"{BASE}/countries", ()), True, None, id="countries"),
+        pytest.param("key", True, None, id="other key"),
+    ],
+)
+def test_key_source(key, default, expected):
+    assert versions.key_source(key, default=default) == expected
+
+
+@pytest.fixture
+def clock():
+    return mock.Mock(return_value=dt.datetime(2024, 1, 1))
+
+
+def test_source_versions_reloaded_after_interval(clock):
+    load = mock.Mock(return_value=[{"id": "2", "lastupdated": "2024-01-01"}])
+    source_versions = versions.SourceVersions(
+        load=load, interval=dt.timedelta(hours=1), timer=clock
+    )
+    assert source_versions.is_current("2", "2024-01-01")
+    assert not source_versions.is_current("2", "2023-12-01")
+    load.assert_called_once()
+    load.return_value = [{"id": "2", "lastupdated": "2024-02-01"}]
+    clock.return_value += dt.timedelta(minutes=30)
+    assert source_versions.is_current("2", "2024-01-01")
+    clock.return_value += dt.timedelta(minutes=31)
+    assert not source_versions.is_current("2", "2024-01-01")
+    assert load.call_count == 2
+
+
+@pytest.mark.parametrize(
+    ["source", "last_updated"],
+    [
+        pytest.param(None, "2023-01-01", id="no source"),
+        pytest.param("2", None, id="no date"),
+        pytest.param("99", "2023-01-01", id="unknown source"),
+    ],
+)
+def test_source_versions_unknown_is_current(clock, source, last_updated):
+    source_versions = versions.SourceVersions(
+        load=lambda: [{"id": "2", "lastupdated": "2024-01-01"}], timer=clock
+    )
+    assert source_versions.is_current(source, last_updated)
+
+
+def test_source_versions_load_failure(clock):
+    load = mock.Mock(side_effect=ConnectionError)
+    source_versions = versions.SourceVersions(load=load, timer=clock)
+    assert source_versions.is_current("2", "2023-01-01")
+    assert source_versions.is_current("2", "2023-01-01")
+    load.assert_called_once()
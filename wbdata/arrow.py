@@ -0,0 +1,154 @@
+"""
+wbdata.arrow: Apache Arrow tables and Parquet files from observation data
+
+These functions require [pyarrow](https://arrow.apache.org/docs/python/),
+which can be installed with the `arrow` extra.
+"""
+
+import datetime as dt
+from collections.abc import Iterable
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+try:
+    import pyarrow as pa  # type: ignore[import-untyped]
+    import pyarrow.compute as pc  # type: ignore[import-untyped]
+    import pyarrow.parquet as pq  # type: ignore[import-untyped]
+except ImportError:
+    pa = None  # type: ignore[assignment]
+
+if TYPE_CHECKING:
+    import pyarrow
+
+from . import dates, fetcher
+
+#: Table columns, and the `CompactResult` column each is built from
+COLUMNS = {
+    "indicator": "indicator.id",
+    "indicator_name": "indicator.value",
+    "country": "country.id",
+    "country_name": "country.value",
+    "countryiso3code": "countryiso3code",
+    "date": "date",
+    "value": "value",
+    "unit": "unit",
+    "obs_status": "obs_status",
+    "decimal": "decimal",
+}
+
+#: Columns that are dictionary-encoded
+DICTIONARY_COLUMNS = frozenset(
+    {
+        "indicator",
+        "indicator_name",
+        "country",
+        "country_name",
+        "countryiso3code",
+        "unit",
+        "obs_status",
+    }
+)
+
+
+def _codes(codes: Any, length: int) -> "pyarrow.Array":
+    """View an `array("I")` of dictionary codes as an Arrow array"""
+    assert pa is not None  # checked by to_table
+    return pa.Array.from_buffers(pa.uint32(), length, [None, pa.py_buffer(codes)])
+
+
+def _values(result: fetcher.CompactResult) -> "pyarrow.Array":
+    assert pa is not None  # checked by to_table
+    values = pa.Array.from_buffers(
+        pa.float64(), len(result), [None, pa.py_buffer(result.values)]
+    )
+    # pyarrow.compute's functions are generated, so type checkers can't see them
+    null = pa.scalar(None, pa.float64())
+    return pc.if_else(pc.is_nan(values), null, values)  # ty: ignore[unresolved-attribute]
+
+
+def _dates(result: fetcher.CompactResult) -> "pyarrow.Array":
+    """
+    Parse each distinct date once into a date32 array, falling back to strings
+    if any date can't be parsed
+    """
+    assert pa is not None  # checked by to_table
+    distinct, codes = result.encoded("date")
+    parsed = dates.parse_date_values(distinct)
+    if all(isinstance(i, dt.datetime) for i in parsed):
+        dictionary = pa.array([i.date() for i in parsed], type=pa.date32())
+    else:
+        dictionary = pa.array([str(i) for i in distinct], type=pa.string())
+    return dictionary.take(_codes(codes, len(result)))
+
+
+def _column(result: fetcher.CompactResult, name: str) -> "pyarrow.Array":
+    assert pa is not None  # checked by to_table
+    source = COLUMNS[name]
+    if source == "value":
+        return _values(result)
+    if source == "date":
+        return _dates(result)
+    distinct, codes = result.encoded(source)
+    if name in DICTIONARY_COLUMNS:
+        return pa.DictionaryArray.from_arrays(
+            _codes(codes, len(result)).cast(pa.int32()),
+            pa.array(distinct, type=pa.string()),
+        )
+    return pa.array(distinct, type=pa.int64()).take(_codes(codes, len(result)))
+
+
+def to_table(
+    result: fetcher.CompactResult, columns: Iterable[str] | None = None
+) -> "pyarrow.Table":
+    """
+    Convert observations to an Arrow table
+
+    Country and indicator codes and names, units and statuses are
+    dictionary-encoded; dates are parsed to `date32` unless they can't be, in
+    which case they are left as strings; and values are `float64` with nulls
+    for missing values. The `last_updated` date, if known, is stored in the
+    schema metadata.
+
+    Parameters:
+        result: the observations
+        columns: the columns to include, from `COLUMNS`. Defaults to all.
+
+    Returns:
+        a `pyarrow.Table`
+    """
+    if pa is None:
+        raise RuntimeError("to_table requires pyarrow")
+    names = list(columns or COLUMNS)
+    metadata = {}
+    if result.last_updated is not None:
+        metadata["last_updated"] = result.last_updated.date().isoformat()
+    return pa.table({name: _column(result, name) for name in names}, metadata=metadata)
+
+
+def write_partition(
+    result: fetcher.CompactResult,
+    path: str | Path,
+    indicator: str,
+    **kwargs: Any,
+) -> Path:
+    """
+    Write observations for one indicator to a Hive-style partition.
+
+    The file is written to `path/indicator=<indicator>/part-0.parquet`, and the
+    `indicator` column is left out of the file since it is encoded in the path.
+
+    Parameters:
+        result: the observations
+        path: the root directory of the dataset
+        indicator: the indicator the observations are for
+        **kwargs: passed through to `pyarrow.parquet.write_table`
+
+    Returns:
+        the path of the file written
+    """
+    table = to_table(result, columns=[i for i in COLUMNS if i != "indicator"])
+    partition = Path(path) / f"indicator={indicator}"
+    partition.mkdir(parents=True, exist_ok=True)
+    filename = partition / "part-0.parquet"
+    pq.write_table(table, filename, **kwargs)
+    return filename
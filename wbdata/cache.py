@@ -1,18 +1,62 @@
 """
 Caching functionality
 
+The cache can be shared by several processes, such as the workers of a web
+server or a multiprocessing pool, including processes forked from one that
+had already used it. Each process keeps the entries it has used in memory.
+The file on disk is only read or written under an exclusive lock on a
+`.lock` file next to it, and each process reopens it if another process has
+changed it since. A process that misses an entry in memory looks for it on
+disk, so it finds entries other processes have added.
+
+A `WriteBehindCache` can wrap the cache so that fetches don't wait for
+entries to be written to disk: writes are buffered and written in batches
+by a background thread.
+
+The caches can also be shared by threads. Each locks its in-memory entries
+only while they are read or changed, so threads don't wait for each other's
+disk reads and writes, which the file lock orders.
 """
 
+import atexit
+import contextlib
+import dataclasses
 import datetime as dt
+import dbm
+import hashlib
+import itertools
 import logging
+import math
 import os
+import pickle
+import shelve
+import sys
+import threading
+import weakref
+from collections.abc import (
+    Callable,
+    Generator,
+    Hashable,
+    Iterator,
+    Mapping,
+    MutableMapping,
+    Sequence,
+)
 from pathlib import Path
+from typing import Any
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
 
 import appdirs
 import cachetools
 import shelved_cache  # type: ignore[import-untyped]
 
+from . import planner
 from .version import __version__
+from .versions import key_source
 
 log = logging.getLogger(__name__)
 
@@ -35,12 +79,642 @@ except ValueError:
     logging.warning("Couldn't parse WBDATA_CACHE_MAX_SIZE value, defaulting to 100")
     MAX_SIZE = 100
 
+try:
+    SHARDS = int(os.getenv("WBDATA_CACHE_SHARDS", "1"))
+except ValueError:
+    logging.warning("Couldn't parse WBDATA_CACHE_SHARDS value, defaulting to 1")
+    SHARDS = 1
+
+
+@contextlib.contextmanager
+def _file_lock(path: str) -> Generator[None, None, None]:
+    """Hold an exclusive lock on a file, creating it if necessary"""
+    with open(path, "a+b") as lock_file:
+        if sys.platform == "win32":
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if sys.platform == "win32":
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+#: The errors raised when a shelf's files are corrupt: `dbm.error` if their
+#: format is unknown, and the errors `dbm.dumb` raises parsing its index.
+#: `dbm.error` also includes `OSError`, which is left to propagate.
+_CORRUPT_SHELF_ERRORS = (dbm.error[0], pickle.UnpicklingError, SyntaxError, ValueError)
+
+
+def _open_shelf(filename: str) -> shelve.Shelf:
+    """Open a shelf, replacing it if it is corrupt"""
+    try:
+        return shelve.open(filename, protocol=pickle.HIGHEST_PROTOCOL, flag="c")
+    except _CORRUPT_SHELF_ERRORS as e:
+        log.warning(f"Couldn't read cache {filename} ({e!r}), replacing it")
+        return shelve.open(filename, protocol=pickle.HIGHEST_PROTOCOL, flag="n")
+
+
+def _sync_shelf(shelf: shelve.Shelf) -> None:
+    """
+    Write a shelf's changes to disk. A `dbm.dumb` database rewrites its
+    whole index each time it is synced or closed, even if nothing changed
+    since, which would drop the entries other processes have added since,
+    so it is marked unchanged once synced.
+    """
+    shelf.sync()
+    database = getattr(shelf, "dict", None)
+    if hasattr(database, "_modified"):
+        database._modified = False
+
+
+def _matches(url: str, prefix: str) -> bool:
+    """Whether a url is at or under a prefix, ignoring case"""
+    prefix = prefix.rstrip("/").lower()
+    rest = url.lower().removeprefix(prefix)
+    return rest != url.lower() and rest[:1] in ("", "/", "?")
+
+
+@dataclasses.dataclass
+class TTLPolicy:
+    """
+    TTLs for cached responses that depend on the query they answer, so that
+    stable catalogs such as the lists of countries or sources can be kept
+    longer than data that changes often, or data from some sources can be
+    kept longer than the rest.
+
+    A response's TTL is the TTL of its source, if it answers an observation
+    query for a source in `sources`, given by a `source` parameter or
+    `versions.DEFAULT_SOURCE` without one; otherwise `versioned`, if it is
+    set and it answers an observation query; otherwise, for other queries,
+    the TTL of the longest prefix in `endpoints` its url starts with;
+    otherwise `default`. Source rules only apply to observations: metadata
+    about a source, such as its list of indicators, has no `lastupdated`
+    date to check, so it gets the TTL of its endpoint or `default`.
+    Endpoint rules don't apply to observations, so a rule for the list of
+    countries doesn't keep observations for some countries as long.
+
+    Parameters:
+        default: the TTL of other responses. If `None`, `get_cache` uses its
+            `ttl_days`.
+        endpoints: TTLs by url prefix, such as `client.COUNTRIES_URL`
+        sources: TTLs by source id
+        versioned: the TTL of observations, for a client that checks them
+            against their source's version (see
+            `versions.SourceVersions`), so they can be kept until the
+            source is updated
+    """
+
+    default: dt.timedelta | None = None
+    endpoints: Mapping[str, dt.timedelta] = dataclasses.field(default_factory=dict)
+    sources: Mapping[str | int, dt.timedelta] = dataclasses.field(default_factory=dict)
+    versioned: dt.timedelta | None = None
+
+    def __call__(self, key: Hashable) -> dt.timedelta:
+        """Get the TTL of a cache key"""
+        assert self.default is not None, "TTLPolicy needs a default TTL"
+        url = key[0] if isinstance(key, tuple) and key else None
+        observations = isinstance(url, str) and planner.OBSERVATIONS_PATTERN.match(url)
+        sources = {str(i).upper(): ttl for i, ttl in self.sources.items()}
+        source = key_source(key) if observations else None
+        if source is not None and source.upper() in sources:
+            return sources[source.upper()]
+        if observations:
+            return self.versioned if self.versioned is not None else self.default
+        if isinstance(url, str):
+            matches = [i for i in self.endpoints if _matches(url, i)]
+            if matches:
+                return self.endpoints[max(matches, key=len)]
+        return self.default
+
+
+#: Live shared caches, so their locks can be reset in forked processes
+_SHARED: "weakref.WeakValueDictionary[int, SharedCache]" = weakref.WeakValueDictionary()
+
+
+def _reset_shared_locks() -> None:
+    """
+    Replace the lock of each shared cache, since a thread that held one in
+    the parent process doesn't exist in the child
+    """
+    for shared in list(_SHARED.values()):
+        shared._lock = threading.RLock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_shared_locks)
+
+
+class SharedCache(shelved_cache.PersistentCache):
+    """
+    A `shelved_cache.PersistentCache` that can be shared between processes.
+
+    Unlike its base class, it only reads or writes the shelf under an
+    exclusive file lock, and syncs it before releasing the lock. The shelf
+    is kept open between reads and writes, but it is reopened if another
+    process has changed it since, or if it was opened before a `fork()`, so
+    no process writes back a stale copy of the index. Entries are stored under
+    a stable hash of their key, rather than `hash()`, which differs between
+    processes, along with the time they were stored, so entries don't outlive
+    their TTL when the cache is reloaded. Entries from older versions, which
+    have no time, are stamped with the time they are migrated.
+
+    The keys of the stored entries are kept in memory, along with the size
+    and modification time of the shelf's files when they were last read, so
+    a key that isn't in memory is only looked up in the shelf if it is
+    stored there, or if another process has changed the shelf since.
+
+    Iterating over the cache gives the keys of the entries in memory.
+
+    The cache is `thread_safe`: the in-memory cache is only locked while it
+    is read or changed, and the shelf is read and written outside that lock,
+    so a thread that misses an entry in memory doesn't hold up threads that
+    find theirs.
+
+    Parameters:
+        wrapped_cache_cls: the class of the in-memory cache
+        filename: path to the shelf
+        ttl: the TTL of the in-memory cache, also applied to stored entries,
+            or a function that takes a key and returns its TTL, such as a
+            `TTLPolicy`, in which case `wrapped_cache_cls` must take a `ttu`
+            argument, like `cachetools.TLRUCache`
+        timer: the timer of the in-memory cache
+        *args: passed through to `wrapped_cache_cls`
+        **kwargs: passed through to `wrapped_cache_cls`
+    """
+
+    thread_safe = True
+
+    def __init__(
+        self,
+        wrapped_cache_cls: type[cachetools.Cache],
+        filename: str,
+        *args: Any,
+        ttl: dt.timedelta | Callable[[Hashable], dt.timedelta],
+        timer=dt.datetime.now,
+        **kwargs: Any,
+    ):
+        self._loaded = False
+        if callable(ttl):
+            kwargs["ttu"] = lambda key, value, now: now + ttl(key)
+        else:
+            kwargs["ttl"] = ttl
+        super().__init__(wrapped_cache_cls, filename, *args, timer=timer, **kwargs)
+        self.ttl = ttl
+        self.timer = timer
+        self.lock_path = f"{filename}.lock"
+        # Guards the in-memory cache. The keys in the shelf and the stamp of
+        # its files are only changed under the file lock.
+        self._lock = threading.RLock()
+        self._stored: set[str] = set()
+        self._stamp: tuple | None = None
+        # The open shelf and the process that opened it, only used under the
+        # file lock
+        self._open: shelve.Shelf | None = None
+        self._opened_by: int | None = None
+        self._suffixes: tuple[str, ...] = ("", ".dir", ".dat", ".db")
+        _SHARED[id(self)] = self
+
+    @staticmethod
+    def hash_key(key: Hashable) -> str:
+        return hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+
+    def _files_stamp(self) -> tuple:
+        """
+        The sizes and modification times of the shelf's files, of the
+        suffixes it had when it was last opened
+        """
+        stamp = []
+        for suffix in self._suffixes:
+            with contextlib.suppress(OSError):
+                stat = os.stat(f"{self.filename}{suffix}")
+                stamp.append((suffix, stat.st_size, stat.st_mtime_ns))
+        return tuple(stamp)
+
+    @contextlib.contextmanager
+    def _shelf(self) -> Generator[shelve.Shelf, None, None]:
+        """
+        Get the shelf under the file lock, and sync it afterwards. If another
+        process has changed it since it was last used here, or it was opened
+        by the parent of this process, it is reopened and the keys stored in
+        it are read again.
+        """
+        with _file_lock(self.lock_path):
+            if self._open is not None and (
+                self._opened_by != os.getpid() or self._stamp != self._files_stamp()
+            ):
+                self._open.close()
+                self._open = None
+            if self._open is None:
+                self._suffixes = ("", ".dir", ".dat", ".db")
+                Path(self.filename).parent.mkdir(parents=True, exist_ok=True)
+                self._open = _open_shelf(self.filename)
+                self._opened_by = os.getpid()
+                self._stored = set(self._open.keys())
+            try:
+                yield self._open
+            finally:
+                _sync_shelf(self._open)
+                self._stamp = self._files_stamp()
+                self._suffixes = tuple(suffix for suffix, *_ in self._stamp)
+
+    def _may_be_stored(self, hkey: str) -> bool:
+        """Whether an entry may be in the shelf, without opening it if not"""
+        if self._stamp != self._files_stamp():
+            with self._shelf():
+                pass
+        return hkey in self._stored
+
+    def _is_live(self, entry: tuple) -> bool:
+        # Entries with no time are stamped when the cache is loaded, so this
+        # is one another process has just written with an older version
+        if len(entry) < 3:
+            return True
+        ttl = self.ttl(entry[0]) if callable(self.ttl) else self.ttl
+        return self.timer() - entry[2] < ttl
+
+    def initialize_if_not_initialized(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if not self._loaded:
+                self._load()
+                self._loaded = True
+
+    def _load(self) -> None:
+        """Load the live entries of the shelf into the in-memory cache"""
+        loaded = []
+        now = self.timer()
+        with self._shelf() as shelf:
+            for hkey in list(shelf.keys()):
+                try:
+                    entry = shelf[hkey]
+                    # Entries written by PersistentCache have no time
+                    migrated = len(entry) < 3
+                    if migrated:
+                        entry = (*entry[:2], now)
+                    live = self._is_live(entry)
+                except Exception:
+                    migrated = live = False
+                stable = live and self.hash_key(entry[0]) == hkey
+                if not stable:
+                    del shelf[hkey]
+                    self._stored.discard(hkey)
+                if live:
+                    if migrated or not stable:
+                        shelf[self.hash_key(entry[0])] = entry
+                        self._stored.add(self.hash_key(entry[0]))
+                    loaded.append(entry)
+        for key, value, *_ in loaded:
+            self.wrapped[key] = value
+        log.debug(f"Loaded {len(loaded)} cache entries from {self.filename}")
+
+    def delete_callback(self, key: Hashable) -> None:
+        hkey = self.hash_key(key)
+        if not self._may_be_stored(hkey):
+            return
+        with self._shelf() as shelf:
+            shelf.pop(hkey, None)
+            self._stored.discard(hkey)
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        self.initialize_if_not_initialized()
+        hkey = self.hash_key(key)
+        with self._shelf() as shelf:
+            shelf[hkey] = (key, value, self.timer())
+            self._stored.add(hkey)
+        with self._lock:
+            self.wrapped[key] = value
+
+    def update(self, other: Any = (), /, **kwargs: Any) -> None:
+        """Store several entries, opening the shelf once"""
+        items = dict(other, **kwargs)
+        self.initialize_if_not_initialized()
+        stored = self.timer()
+        with self._shelf() as shelf:
+            for key, value in items.items():
+                hkey = self.hash_key(key)
+                shelf[hkey] = (key, value, stored)
+                self._stored.add(hkey)
+        with self._lock:
+            for key, value in items.items():
+                self.wrapped[key] = value
+
+    def __getitem__(self, item: Hashable) -> Any:
+        self.initialize_if_not_initialized()
+        with self._lock:
+            try:
+                return self.wrapped[item]
+            except KeyError:
+                pass
+        hkey = self.hash_key(item)
+        if not self._may_be_stored(hkey):
+            raise KeyError(item)
+        with self._shelf() as shelf:
+            entry = shelf.get(hkey)
+            if entry is not None and not self._is_live(entry):
+                del shelf[hkey]
+                self._stored.discard(hkey)
+                entry = None
+        if entry is None or entry[0] != item:
+            raise KeyError(item)
+        with self._lock:
+            self.wrapped[item] = entry[1]
+        return entry[1]
+
+    def __contains__(self, item: object) -> bool:
+        try:
+            self[item]
+        except KeyError:
+            return False
+        return True
+
+    def __delitem__(self, v: Hashable) -> None:
+        self.initialize_if_not_initialized()
+        with self._lock:
+            del self.wrapped[v]
+
+    def __len__(self) -> int:
+        self.initialize_if_not_initialized()
+        with self._lock:
+            return len(self.wrapped)
+
+    def __iter__(self) -> Iterator:
+        self.initialize_if_not_initialized()
+        with self._lock:
+            return iter(list(self.wrapped))
+
+    def expire(self) -> None:
+        """Drop expired entries from the in-memory cache"""
+        self.initialize_if_not_initialized()
+        with self._lock:
+            if isinstance(self.wrapped, (cachetools.TTLCache, cachetools.TLRUCache)):
+                self.wrapped.expire()
+
+    def close(self) -> None:
+        """Close the shelf, if it is open. It is reopened when next used."""
+        if self._open is None:
+            return
+        with _file_lock(self.lock_path):
+            if self._open is not None and self._opened_by == os.getpid():
+                self._open.close()
+            self._open = None
+
+
+class ShardedCache(MutableMapping):
+    """
+    A cache split into shards, each a `SharedCache` in its own file with
+    its own lock and eviction, which together act as one mapping.
+
+    Each key is assigned to a shard by its stable hash, so every process
+    assigns it to the same shard. Writes to different shards don't wait for
+    each other, and each write only rewrites its shard's file.
+
+    Like its shards, it is `thread_safe`.
+
+    Parameters:
+        shards: the shards
+    """
+
+    thread_safe = True
+
+    def __init__(self, shards: Sequence[SharedCache]):
+        self.shards = list(shards)
+
+    def shard(self, key: Hashable) -> SharedCache:
+        """Get the shard that holds a key"""
+        digest = SharedCache.hash_key(key)
+        return self.shards[int(digest[:8], 16) % len(self.shards)]
+
+    def __getitem__(self, key: Hashable) -> Any:
+        return self.shard(key)[key]
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        self.shard(key)[key] = value
+
+    def __delitem__(self, key: Hashable) -> None:
+        del self.shard(key)[key]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.shard(key)
+
+    def __len__(self) -> int:
+        return sum(len(i) for i in self.shards)
+
+    def __iter__(self) -> Iterator:
+        return itertools.chain.from_iterable(self.shards)
+
+    def update(self, other: Any = (), /, **kwargs: Any) -> None:
+        """Store several entries, writing each shard once"""
+        batches: dict[int, dict[Hashable, Any]] = {}
+        for key, value in dict(other, **kwargs).items():
+            batches.setdefault(id(self.shard(key)), {})[key] = value
+        for shard in self.shards:
+            if id(shard) in batches:
+                shard.update(batches[id(shard)])
+
+    def expire(self) -> None:
+        """Drop expired entries from every shard"""
+        for shard in self.shards:
+            shard.expire()
+
+    def close(self) -> None:
+        for shard in self.shards:
+            shard.close()
+
+
+_MISSING = object()
+
+#: Live write-behind caches, so they can be flushed at exit and reset in
+#: forked processes
+_WRITE_BEHIND: "weakref.WeakValueDictionary[int, WriteBehindCache]" = (
+    weakref.WeakValueDictionary()
+)
+
+
+class WriteBehindCache(MutableMapping):
+    """
+    A cache that buffers writes to another cache and writes them in batches
+    from a background thread, so that storing an entry doesn't wait for a
+    persistent cache to write it to disk.
+
+    Buffered entries are read from the buffer, so they are available at
+    once. The buffer is flushed when it holds `flush_size` entries, at
+    least every `flush_interval` seconds while it isn't empty, on `flush`
+    and `close`, and at interpreter exit. Entries that fail to be written
+    stay in the buffer and are tried again with the next batch.
+
+    If the process forks, the child keeps its copy of the buffer and starts
+    its own thread when it next writes.
+
+    The cache is `thread_safe`. Reads of a wrapped cache that is itself
+    `thread_safe` don't wait for batches being written.
+
+    Parameters:
+        cache: the cache to write to. Batches are written with its `update`
+            method, which a `SharedCache` implements by opening its shelf
+            once per batch.
+        flush_interval: the longest time in seconds an entry is buffered
+        flush_size: the number of buffered entries that starts a flush
+    """
+
+    thread_safe = True
+
+    def __init__(
+        self,
+        cache: MutableMapping,
+        flush_interval: float = 1.0,
+        flush_size: int = 100,
+    ):
+        self.cache = cache
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self._reset()
+        _WRITE_BEHIND[id(self)] = self
+
+    def _reset(self) -> None:
+        self._pending: dict[Hashable, Any] = {}
+        # Guards the buffer and wakes the writer
+        self._condition = threading.Condition()
+        # Guards the wrapped cache's writes, and its reads unless it is
+        # thread-safe
+        self._lock = threading.RLock()
+        self._thread: threading.Thread | None = None
+        self._closed = False
+
+    def _start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name="wbdata-cache-writer", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._closed or len(self._pending) >= self.flush_size,
+                    timeout=self.flush_interval,
+                )
+                closed = self._closed
+            self.flush()
+            if closed:
+                return
+
+    def _read_lock(self) -> contextlib.AbstractContextManager:
+        """The lock to read the wrapped cache under"""
+        if getattr(self.cache, "thread_safe", False):
+            return contextlib.nullcontext()
+        return self._lock
+
+    def flush(self) -> None:
+        """Write the buffered entries to the wrapped cache"""
+        with self._lock:
+            with self._condition:
+                batch = dict(self._pending)
+            if not batch:
+                return
+            try:
+                self.cache.update(batch)
+            except Exception:
+                log.exception(f"Couldn't write {len(batch)} cache entries")
+                return
+        with self._condition:
+            for key, value in batch.items():
+                # Keep entries that were replaced while the batch was written
+                if self._pending.get(key) is value:
+                    del self._pending[key]
+
+    def close(self) -> None:
+        """Flush the buffer and stop the background thread"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self.flush()
+        close = getattr(self.cache, "close", None)
+        if close is not None:
+            close()
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        with self._condition:
+            if self._closed:
+                raise ValueError("Can't write to a closed cache")
+            self._pending[key] = value
+            if len(self._pending) >= self.flush_size:
+                self._condition.notify_all()
+            self._start()
+
+    def __getitem__(self, key: Hashable) -> Any:
+        with self._condition:
+            try:
+                return self._pending[key]
+            except KeyError:
+                pass
+        with self._read_lock():
+            return self.cache[key]
+
+    def __contains__(self, key: object) -> bool:
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __delitem__(self, key: Hashable) -> None:
+        with self._condition:
+            pending = self._pending.pop(key, _MISSING)
+        with self._lock:
+            try:
+                del self.cache[key]
+            except KeyError:
+                if pending is _MISSING:
+                    raise
+
+    def __len__(self) -> int:
+        return len(set(self))
+
+    def __iter__(self) -> Iterator:
+        with self._condition:
+            keys = list(self._pending)
+        pending = set(keys)
+        with self._read_lock():
+            stored = [i for i in self.cache if i not in pending]
+        return iter(keys + stored)
+
+
+def _flush_write_behind() -> None:
+    for write_behind in list(_WRITE_BEHIND.values()):
+        write_behind.close()
+
+
+def _reset_write_behind() -> None:
+    for write_behind in list(_WRITE_BEHIND.values()):
+        pending = write_behind._pending
+        write_behind._reset()
+        write_behind._pending = pending
+
+
+atexit.register(_flush_write_behind)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_write_behind)
+
 
 def get_cache(
     path: str | Path | None = None,
     ttl_days: int | None = None,
     max_size: int | None = None,
-) -> shelved_cache.PersistentCache:
+    shards: int | None = None,
+    shard_dirs: Sequence[str | Path] | None = None,
+    ttl_policy: TTLPolicy | None = None,
+) -> SharedCache | ShardedCache:
     """
     Create a persistent cache.
 
@@ -51,11 +725,22 @@ def get_cache(
           application cache)
     * `WBDATA_CACHE_TTL_DAYS`: number of days to cache results (default: 7)
     * `WBDATA_CACHE_MAX_SIZE`: maximum number of items to cache (default: 100)
+    * `WBDATA_CACHE_SHARDS`: number of files to split the cache into
+          (default: 1)
 
 
-    The cache returned is a `shelved_cache.PersistentCache` that wraps a
-    `cachetools.TTLCache` object with the desired parameters. The cache
-    is cleaned up on load.
+    The cache returned is a `SharedCache`, a `shelved_cache.PersistentCache`
+    that can be shared between processes, wrapping a `cachetools.TTLCache`
+    object with the desired parameters. The cache is cleaned up on load.
+
+    With more than one shard, the cache returned is a `ShardedCache` of
+    `SharedCache` shards, shard `i` being stored at `{path}.{i}`, or at
+    `{directory}/{name}.{i}` where `name` is the last part of `path`, when
+    shards are spread over `shard_dirs`. The maximum size is divided between
+    the shards.
+
+    With a `TTLPolicy`, each entry's TTL is chosen by the policy, and the
+    in-memory cache is a `cachetools.TLRUCache`.
 
     Parameters:
         path: path to the cache. If `None`, value of `WBDATA_CACHE_PATH`
@@ -63,18 +748,43 @@ def get_cache(
             `WBDATA_CACHE_TTL_DAYS`
         max_size: maximum number of items to cache. If `None`, value of
             `WBDATA_CACHE_MAX_SIZE`.
+        shards: number of shards. If `None`, value of `WBDATA_CACHE_SHARDS`.
+        shard_dirs: directories to spread the shards over, in turn. If
+            `None`, every shard is next to `path`.
+        ttl_policy: a policy choosing the TTL of each entry. Its default TTL
+            is `ttl_days` unless it sets one.
 
     """
     path = path or CACHE_PATH
-    Path(path).parent.mkdir(parents=True, exist_ok=True)
     ttl_days = ttl_days or TTL_DAYS
     max_size = max_size or MAX_SIZE
-    cache = shelved_cache.PersistentCache(
-        cachetools.TTLCache,
-        filename=str(path),
-        maxsize=max_size,
-        ttl=dt.timedelta(days=ttl_days),
-        timer=dt.datetime.now,
-    )
+    shards = shards or SHARDS
+    if shards == 1 and not shard_dirs:
+        filenames = [Path(path)]
+    elif shard_dirs:
+        filenames = [
+            Path(shard_dirs[i % len(shard_dirs)]) / f"{Path(path).name}.{i}"
+            for i in range(shards)
+        ]
+    else:
+        filenames = [Path(f"{path}.{i}") for i in range(shards)]
+    ttl: dt.timedelta | TTLPolicy = dt.timedelta(days=ttl_days)
+    if ttl_policy is not None:
+        if ttl_policy.default is None:
+            ttl_policy = dataclasses.replace(ttl_policy, default=ttl)
+        ttl = ttl_policy
+    caches = []
+    for filename in filenames:
+        filename.parent.mkdir(parents=True, exist_ok=True)
+        caches.append(
+            SharedCache(
+                cachetools.TTLCache if ttl_policy is None else cachetools.TLRUCache,
+                filename=str(filename),
+                maxsize=math.ceil(max_size / len(filenames)),
+                ttl=ttl,
+                timer=dt.datetime.now,
+            )
+        )
+    cache = caches[0] if len(caches) == 1 else ShardedCache(caches)
     cache.expire()
     return cache
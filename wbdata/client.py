@@ -5,10 +5,14 @@ The client class defines the wbdata client class and associated support classes.
 import contextlib
 import dataclasses
 import datetime as dt
+import functools
+import inspect
+import os
 import re
-from collections.abc import Generator, Iterable, Sequence
+import threading
+from collections.abc import Generator, Iterable, MutableMapping, Sequence
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any, Literal, overload
 
 import decorator
 import requests
@@ -19,10 +23,20 @@ try:
 except ImportError:
     pd = None  # type: ignore[assignment]
 
+try:
+    import polars as pl
+except ImportError:
+    pl = None  # type: ignore[assignment]
 
-from . import cache, dates, fetcher
+if TYPE_CHECKING:
+    import polars
+    import pyarrow
 
-BASE_URL = "https://api.worldbank.org/v2"
+from . import arrow, cache, dates, fetcher, metadata, search, tracing, versions
+from .codec import get_codec
+from .store import DataStore, SQLiteStore
+
+BASE_URL = os.getenv("WBDATA_BASE_URL", "https://api.worldbank.org/v2").rstrip("/")
 COUNTRIES_URL = f"{BASE_URL}/countries"
 ILEVEL_URL = f"{BASE_URL}/incomeLevels"
 INDICATOR_URL = f"{BASE_URL}/indicators"
@@ -30,6 +44,9 @@ LTYPE_URL = f"{BASE_URL}/lendingTypes"
 SOURCE_URL = f"{BASE_URL}/sources"
 TOPIC_URL = f"{BASE_URL}/topics"
 
+#: Suffixes of `store` paths that open a `SQLiteStore`
+SQLITE_SUFFIXES = (".sqlite", ".sqlite3", ".db")
+
 
 class SearchResult(list):
     """
@@ -111,11 +128,31 @@ else:
     Series = Any  # type: ignore[misc, assignment]
     DataFrame = Any  # type: ignore[misc, assignment]
 
+BACKENDS = {"pandas": lambda: pd, "polars": lambda: pl}
+
 
 @decorator.decorator
-def needs_pandas(f, *args, **kwargs):
-    if pd is None:
-        raise RuntimeError(f"{f.__name__} requires pandas")
+def needs_backend(f, *args, **kwargs):
+    """
+    Check that the library for the function's `backend` argument is installed
+    """
+    backend = inspect.signature(f).bind(*args, **kwargs).arguments.get("backend")
+    backend = backend or "pandas"
+    try:
+        module = BACKENDS[backend]()
+    except KeyError:
+        raise ValueError(
+            f"Unknown backend {backend!r}, expected one of: {', '.join(BACKENDS)}"
+        ) from None
+    if module is None:
+        raise RuntimeError(f"{f.__name__} requires {backend}")
+    return f(*args, **kwargs)
+
+
+@decorator.decorator
+def needs_pyarrow(f, *args, **kwargs):
+    if arrow.pa is None:
+        raise RuntimeError(f"{f.__name__} requires pyarrow")
     return f(*args, **kwargs)
 
 
@@ -138,6 +175,66 @@ def _cast_float(value: str) -> float | None:
     return None
 
 
+def _cast_float_array(values: list[Any]) -> Any:
+    """
+    Return values coerced to a float array, with NaN for values that can't be
+    coerced. This is a vectorized version of mapping `_cast_float` over values.
+    """
+    if pd is None:
+        raise RuntimeError("_cast_float_array requires pandas")
+    array = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce")
+    if not array.notna().any():
+        # Mapping _cast_float gives an object array of None in this case
+        return pd.array([None] * len(values), dtype=object)
+    return array.to_numpy(dtype="float64")
+
+
+def _compact_to_polars(
+    raw_data: fetcher.CompactResult, name: str, parse_dates: bool
+) -> "polars.DataFrame":
+    """
+    Build a Polars DataFrame with `country`, `date` and `name` columns from
+    observations, expanding the dictionary-encoded columns directly
+    """
+    assert pl is not None  # checked by needs_backend
+    countries, country_codes = raw_data.encoded("country.value")
+    row_dates, date_codes = raw_data.encoded("date")
+    date_dtype = None
+    if parse_dates:
+        parsed = dates.parse_date_values(row_dates)
+        if all(isinstance(i, dt.datetime) for i in parsed):
+            row_dates, date_dtype = [i.date() for i in parsed], pl.Date
+    return pl.DataFrame(
+        [
+            pl.Series("country", countries, dtype=pl.String).gather(
+                pl.Series(country_codes, dtype=pl.UInt32)
+            ),
+            pl.Series("date", row_dates, dtype=date_dtype).gather(
+                pl.Series(date_codes, dtype=pl.UInt32)
+            ),
+            pl.Series(name, raw_data.values, dtype=pl.Float64).fill_nan(None),
+        ]
+    )
+
+
+def _polars_levels(
+    frames: Iterable["polars.DataFrame"], keep_levels: bool
+) -> list[str]:
+    """
+    Return the level columns to keep, following the `keep_levels` rules of
+    `Client.get_series`
+    """
+    assert pl is not None  # checked by needs_backend
+    frames = list(frames)
+    if keep_levels:
+        return ["country", "date"]
+    if pl.concat([i["country"] for i in frames]).n_unique() == 1:
+        return ["date"]
+    if pl.concat([i["date"] for i in frames]).n_unique() == 1:
+        return ["country"]
+    return ["country", "date"]
+
+
 def _filter_by_pattern(
     rows: Iterable[dict[str, Any]], pattern=str | re.Pattern
 ) -> Generator[dict[str, Any], None, None]:
@@ -157,28 +254,175 @@ class Client:
     want to specify a cache programmatically rather than through environment
     variables, or want to specify a requests Session.
 
+    A client can be shared between threads, such as the workers of a thread
+    pool. Its cache, search index, metadata tables and `store.SQLiteStore`
+    are locked while they are read or updated, and requests are made
+    concurrently through a pooled session (see `fetcher.make_session`).
+    Ingesting into a `store.DataStore` while other threads query it isn't
+    supported.
+
     Parameters:
         cache_path: path to the cache file
         cache_ttl_days: number of days to retain cached results
         cache_max_size: number of items to retain in the cache
-        session: requests Session object to use to make requests
+        session: requests Session object to use to make requests. If
+            `None`, one is made by `fetcher.make_session`.
+        base_url: root url of the API, in place of `BASE_URL`. This is mostly
+            useful for pointing a client at a `wbdata.testserver` stand-in.
+        hooks: callables to receive `tracing.Span` objects describing each
+            step of a query. More can be added later with
+            `client.tracer.add_hook`.
+        stream: if True, download and decode responses incrementally, which
+            reduces peak memory use for large queries. It costs time:
+            responses that aren't cached take about twice as long to
+            decode, since rows are decoded one at a time with the standard
+            library's `json` instead of a page at a time with `codec`. The
+            text of each page is still held in memory until it is cached.
+        codec: the name of the JSON codec used to decode responses: `auto`,
+            `json`, `orjson` or `msgspec`. If `None`, use the
+            `WBDATA_JSON_CODEC` environment variable, defaulting to `auto`,
+            which picks the fastest installed codec.
+        local_metadata: if True, load countries, income levels, lending types,
+            sources and topics into in-memory tables on first use, and answer
+            id lookups and country filters from them. Queries the tables
+            can't answer, such as for unknown ids, go to the API as usual.
+        metadata_ttl_days: number of days to keep the in-memory metadata
+            tables before reloading them
+        store: a local store of observations, or its path. Yearly queries
+            are answered from a `store.DataStore`, which holds observations
+            ingested from bulk downloads, for the indicators it holds, unless
+            `skip_cache` is True. With a `store.SQLiteStore`, yearly queries
+            are stored as they are fetched, and answered from the store when
+            it covers them; only the missing countries are fetched, and
+            `skip_cache` fetches the whole query again. A path ending in
+            `.sqlite`, `.sqlite3` or `.db` opens a `SQLiteStore`, and any
+            other path a `DataStore`.
+        write_behind: if True, buffer writes to the cache and write them in
+            batches from a background thread (see `cache.WriteBehindCache`),
+            so that fetches don't wait for the disk. Buffered writes are
+            flushed by `close` and at interpreter exit.
+        flush_interval: with `write_behind`, the longest time in seconds a
+            write is buffered
+        flush_size: with `write_behind`, the number of buffered writes that
+            starts a flush
+        cache_shards: number of files to split the cache into (see
+            `cache.get_cache`). If `None`, value of `WBDATA_CACHE_SHARDS`.
+        cache_shard_dirs: directories to spread the cache's shards over
+        cache_ttl_policy: a `cache.TTLPolicy` choosing how long to keep
+            responses by endpoint and source, such as keeping the lists of
+            countries and sources for longer than observations, with
+            endpoints given by the module's url constants, like
+            `COUNTRIES_URL`. Its default TTL is `cache_ttl_days` unless it
+            sets one. Endpoints are rebased onto `base_url`.
+        source_versions: if True, keep cached data for as long as its source
+            hasn't been updated, rather than for `cache_ttl_days`: cached
+            pages are only used while their `lastupdated` date matches their
+            source's date in the list of sources, which is fetched again at
+            most every `source_check_minutes` (see `versions.SourceVersions`).
+            Pages of observations are kept for `versions.VERSIONED_TTL`,
+            unless `cache_ttl_policy` sets its `versioned` TTL. Other pages,
+            which have no `lastupdated` date, expire as usual.
+        source_check_minutes: with `source_versions`, how often to check the
+            sources' dates
     """
 
     cache_path: str | Path | None = None
     cache_ttl_days: int | None = None
     cache_max_size: int | None = None
     session: requests.Session | None = None
+    base_url: str | None = None
+    hooks: Sequence[tracing.Hook] | None = None
+    stream: bool = False
+    codec: str | None = None
+    local_metadata: bool = False
+    metadata_ttl_days: float = 1
+    store: DataStore | SQLiteStore | str | Path | None = None
+    write_behind: bool = False
+    flush_interval: float = 1.0
+    flush_size: int = 100
+    cache_shards: int | None = None
+    cache_shard_dirs: Sequence[str | Path] | None = None
+    cache_ttl_policy: cache.TTLPolicy | None = None
+    source_versions: bool = False
+    source_check_minutes: float = 60
 
     def __post_init__(self):
-        self.fetcher = fetcher.Fetcher(
-            cache=cache.get_cache(
-                path=self.cache_path,
-                ttl_days=self.cache_ttl_days,
-                max_size=self.cache_max_size,
+        self.tracer = tracing.Tracer(self.hooks)
+        ttl_policy = self.cache_ttl_policy
+        if self.source_versions:
+            ttl_policy = ttl_policy or cache.TTLPolicy()
+            if ttl_policy.versioned is None:
+                ttl_policy = dataclasses.replace(
+                    ttl_policy, versioned=versions.VERSIONED_TTL
+                )
+        if ttl_policy is not None:
+            ttl_policy = dataclasses.replace(
+                ttl_policy,
+                endpoints={self._url(k): v for k, v in ttl_policy.endpoints.items()},
             )
+        response_cache: MutableMapping = cache.get_cache(
+            path=self.cache_path,
+            ttl_days=self.cache_ttl_days,
+            max_size=self.cache_max_size,
+            shards=self.cache_shards,
+            shard_dirs=self.cache_shard_dirs,
+            ttl_policy=ttl_policy,
+        )
+        if self.write_behind:
+            response_cache = cache.WriteBehindCache(
+                response_cache,
+                flush_interval=self.flush_interval,
+                flush_size=self.flush_size,
+            )
+        self.fetcher = fetcher.Fetcher(
+            cache=response_cache,
+            tracer=self.tracer,
+            stream=self.stream,
+            codec=get_codec(self.codec),
+            session=(
+                self.session if self.session is not None else fetcher.make_session()
+            ),
         )
+        if self.source_versions:
+            self.fetcher.versions = versions.SourceVersions(
+                load=self._load_source_versions,
+                interval=dt.timedelta(minutes=self.source_check_minutes),
+            )
+        self._search_lock = threading.Lock()
         self.has_pandas = pd is None
+        self._search_index: search.SearchIndex | None = None
+        self.metadata = (
+            metadata.Metadata(
+                load=self._load_metadata,
+                ttl=dt.timedelta(days=self.metadata_ttl_days),
+            )
+            if self.local_metadata
+            else None
+        )
+        if isinstance(self.store, (str, Path)):
+            self.store = (
+                SQLiteStore(self.store)
+                if Path(self.store).suffix in SQLITE_SUFFIXES
+                else DataStore(self.store)
+            )
 
+    def close(self) -> None:
+        """Flush and close the cache, and close the session's connections"""
+        close = getattr(self.fetcher.cache, "close", None)
+        if close is not None:
+            close()
+        self.fetcher.session.close()
+
+    def _load_source_versions(self) -> fetcher.Result:
+        return self.fetcher.fetch(url=self._url(SOURCE_URL), skip_cache=True)
+
+    def _url(self, url: str) -> str:
+        """Rebase one of the module-level endpoint urls onto `base_url`"""
+        if self.base_url and url.startswith(BASE_URL):
+            return self.base_url.rstrip("/") + url[len(BASE_URL) :]
+        return url
+
+    @overload
     def get_data(
         self,
         indicator: str,
@@ -191,7 +435,64 @@ class Client:
         source: int | str | Sequence[int | str] | None = None,
         parse_dates: bool = False,
         skip_cache: bool = False,
-    ) -> fetcher.Result:
+        compact: Literal[False] = False,
+        timeout: float | None = None,
+        partial: bool = False,
+    ) -> fetcher.Result: ...
+
+    @overload
+    def get_data(
+        self,
+        indicator: str,
+        country: str | Sequence[str] = "all",
+        date: str
+        | dt.datetime
+        | tuple[str | dt.datetime, str | dt.datetime]
+        | None = None,
+        freq: str = "Y",
+        source: int | str | Sequence[int | str] | None = None,
+        parse_dates: bool = False,
+        skip_cache: bool = False,
+        *,
+        compact: Literal[True],
+        timeout: float | None = None,
+        partial: bool = False,
+    ) -> fetcher.CompactResult: ...
+
+    @overload
+    def get_data(
+        self,
+        indicator: str,
+        country: str | Sequence[str] = "all",
+        date: str
+        | dt.datetime
+        | tuple[str | dt.datetime, str | dt.datetime]
+        | None = None,
+        freq: str = "Y",
+        source: int | str | Sequence[int | str] | None = None,
+        parse_dates: bool = False,
+        skip_cache: bool = False,
+        compact: bool = False,
+        timeout: float | None = None,
+        partial: bool = False,
+    ) -> fetcher.Result | fetcher.CompactResult: ...
+
+    def get_data(
+        self,
+        indicator: str,
+        country: str | Sequence[str] = "all",
+        date: str
+        | dt.datetime
+        | tuple[str | dt.datetime, str | dt.datetime]
+        | None = None,
+        freq: str = "Y",
+        source: int | str | Sequence[int | str] | None = None,
+        parse_dates: bool = False,
+        skip_cache: bool = False,
+        compact: bool = False,
+        timeout: float | None = None,
+        partial: bool = False,
+    ) -> fetcher.Result | fetcher.CompactResult:
         """
         Retrieve indicators for given countries and years
 
@@ -208,11 +509,19 @@ class Client:
             parse_dates: if True, convert date field to a datetime.datetime
                 object.
             skip_cache: bypass the cache when downloading
+            compact: if True, return a `fetcher.CompactResult`, which stores
+                the observations in columns and uses much less memory for
+                large queries
+            timeout: the number of seconds the call may take, over all the
+                pages it fetches. If it runs out, `fetcher.DeadlineExceeded`
+                is raised, with the rows of the pages fetched.
+            partial: if True with `timeout`, return the rows of the pages
+                fetched by the deadline instead of raising
 
         Returns:
             A list of dictionaries of observations
         """
-        url = COUNTRIES_URL
+        url = self._url(COUNTRIES_URL)
         try:
             c_part = _parse_value_or_iterable(country)
         except TypeError as e:
@@ -223,12 +532,133 @@ class Client:
             params["date"] = dates.format_dates(date, freq)
         if source:
             params["source"] = source
-        data = self.fetcher.fetch(url=url, params=params, skip_cache=skip_cache)
+        with fetcher.deadline(timeout, partial=partial) as budget:
+            try:
+                data = self._query_store(
+                    indicator=indicator,
+                    country=c_part,
+                    params=params,
+                    freq=freq,
+                    skip_cache=skip_cache,
+                    compact=compact,
+                )
+                if data is None:
+                    data = self.fetcher.fetch(
+                        url=url, params=params, skip_cache=skip_cache, compact=compact
+                    )
+            except fetcher.DeadlineExceeded as e:
+                if budget is None or not budget.partial:
+                    raise
+                data = e.partial
         if parse_dates:
-            dates.parse_row_dates(data)
+            if isinstance(data, fetcher.CompactResult):
+                data.parse_dates()
+            else:
+                dates.parse_row_dates(data)
         return data
 
-    def _id_only_query(self, url: str, id_: Any, skip_cache: bool) -> SearchResult:
+    def _query_store(
+        self,
+        indicator: str,
+        country: str,
+        params: dict[str, Any],
+        freq: str,
+        skip_cache: bool,
+        compact: bool,
+    ) -> fetcher.Result | fetcher.CompactResult | None:
+        """
+        Answer an observation query from the local store, if there is one and
+        it can answer it. A `SQLiteStore` first fetches and stores the
+        countries it doesn't yet hold, or the whole query if `skip_cache` is
+        True.
+        """
+        source = params.get("source")
+        date = params.get("date")
+        # Paths are opened as stores by __post_init__
+        store = self.store
+        if (
+            not isinstance(store, (DataStore, SQLiteStore))
+            or (skip_cache and isinstance(store, DataStore))
+            or freq.upper() != "Y"
+            or not isinstance(source, (int, str, type(None)))
+        ):
+            return None
+        with self.tracer.span("store_query", indicator=indicator) as span:
+            if isinstance(store, SQLiteStore):
+                missing = store.missing(indicator, country, date, source)
+                if missing is None:
+                    return None
+                fetch_country = country if skip_cache else ";".join(missing)
+                span.attributes["fetched"] = fetch_country
+                if fetch_country:
+                    url = "/".join(
+                        (
+                            self._url(COUNTRIES_URL),
+                            fetch_country,
+                            "indicators",
+                            indicator,
+                        )
+                    )
+                    store.upsert(
+                        indicator,
+                        self.fetcher.fetch(
+                            url=url, params=params, skip_cache=skip_cache
+                        ),
+                        country=fetch_country,
+                        date=date,
+                        source=source,
+                    )
+            data = store.query(
+                indicator=indicator,
+                country=country,
+                date=date,
+                source=source,
+                compact=compact,
+            )
+            span.attributes.update(
+                hit=data is not None, rows=0 if data is None else len(data)
+            )
+        return data
+
+    def _load_metadata(self, table: str, skip_cache: bool) -> fetcher.Result:
+        """Download all the rows for one of the `metadata.INDEXES` tables"""
+        url = {
+            "countries": COUNTRIES_URL,
+            "incomelevels": ILEVEL_URL,
+            "lendingtypes": LTYPE_URL,
+            "sources": SOURCE_URL,
+            "topics": TOPIC_URL,
+        }[table]
+        return self.fetcher.fetch(url=self._url(url), skip_cache=skip_cache)
+
+    def _find_metadata(
+        self, table: str, skip_cache: bool, **filters: Any
+    ) -> list[dict[str, Any]] | None:
+        """
+        Answer a metadata query from the in-memory tables, if they are enabled
+        and can answer it
+
+        Parameters:
+            table: the name of the table
+            skip_cache: reload the table first
+            **filters: for each index of the table, an id or sequence of ids,
+                or None
+
+        Returns:
+            the matching rows, or `None` if the query should go to the API
+        """
+        if self.metadata is None:
+            return None
+        filters = {
+            index: _parse_value_or_iterable(value).split(";")
+            for index, value in filters.items()
+            if value
+        }
+        return self.metadata.table(table, skip_cache=skip_cache).find(**filters)
+
+    def _id_only_query(
+        self, url: str, id_: Any, skip_cache: bool, table: str | None = None
+    ) -> SearchResult:
         """
         Utility to retrieve information when ids are the only arguments
 
@@ -236,10 +666,15 @@ class Client:
             url: the base url to use for the query
             id_: an id or sequence of ids
             skip_cache: bypass cache when downloading
+            table: the in-memory metadata table that can answer the query
 
         Returns:
             list of dictionary objects describing results
         """
+        if table:
+            found = self._find_metadata(table, skip_cache=skip_cache, id=id_)
+            if found is not None:
+                return SearchResult(found)
         if id_:
             url = "/".join((url, _parse_value_or_iterable(id_)))
         return SearchResult(self.fetcher.fetch(url=url, skip_cache=skip_cache))
@@ -259,7 +694,12 @@ class Client:
         Returns:
             list of dictionary objects describing selected sources
         """
-        return self._id_only_query(url=SOURCE_URL, id_=source_id, skip_cache=skip_cache)
+        return self._id_only_query(
+            url=self._url(SOURCE_URL),
+            id_=source_id,
+            skip_cache=skip_cache,
+            table="sources",
+        )
 
     def get_incomelevels(
         self,
@@ -278,7 +718,9 @@ class Client:
             list of dictionary objects describing selected
                 income level aggregates
         """
-        return self._id_only_query(ILEVEL_URL, level_id, skip_cache=skip_cache)
+        return self._id_only_query(
+            self._url(ILEVEL_URL), level_id, skip_cache=skip_cache, table="incomelevels"
+        )
 
     def get_topics(
         self,
@@ -296,7 +738,9 @@ class Client:
             list of dictionary objects describing selected topic
                 aggregates
         """
-        return self._id_only_query(TOPIC_URL, topic_id, skip_cache=skip_cache)
+        return self._id_only_query(
+            self._url(TOPIC_URL), topic_id, skip_cache=skip_cache, table="topics"
+        )
 
     def get_lendingtypes(
         self,
@@ -314,7 +758,9 @@ class Client:
         Returns:
             list of dictionary objects describing selected lending type aggregates
         """
-        return self._id_only_query(LTYPE_URL, type_id, skip_cache=skip_cache)
+        return self._id_only_query(
+            self._url(LTYPE_URL), type_id, skip_cache=skip_cache, table="lendingtypes"
+        )
 
     def get_countries(
         self,
@@ -350,14 +796,27 @@ class Client:
         if country_id:
             if incomelevel or lendingtype or query:
                 raise ValueError("Can't specify country_id and aggregates")
-            return self._id_only_query(COUNTRIES_URL, country_id, skip_cache=skip_cache)
+            return self._id_only_query(
+                self._url(COUNTRIES_URL),
+                country_id,
+                skip_cache=skip_cache,
+                table="countries",
+            )
+        found = self._find_metadata(
+            "countries",
+            skip_cache=skip_cache,
+            incomeLevel=incomelevel,
+            lendingType=lendingtype,
+        )
+        if found is not None:
+            return SearchResult(_filter_by_pattern(found, query) if query else found)
         params = {}
         if incomelevel:
             params["incomeLevel"] = _parse_value_or_iterable(incomelevel)
         if lendingtype:
             params["lendingType"] = _parse_value_or_iterable(lendingtype)
         results = self.fetcher.fetch(
-            url=COUNTRIES_URL, params=params, skip_cache=skip_cache
+            url=self._url(COUNTRIES_URL), params=params, skip_cache=skip_cache
         )
         if query:
             results = _filter_by_pattern(results, query)
@@ -384,6 +843,9 @@ class Client:
         is case insensitive. Specifying both `query` and `indicators` will raise
         a ValueError.
 
+        For ranked full-text search that does not download and scan the whole
+        catalog each time, see `search_indicators`.
+
         Parameters:
             indicator: an indicator code or sequence thereof
             query: a regular expression on which to filter results
@@ -401,19 +863,200 @@ class Client:
                 "Cannot specify more than one of indicator, source, and topic"
             )
         if indicator:
-            url = "/".join((INDICATOR_URL, _parse_value_or_iterable(indicator)))
+            url = "/".join(
+                (self._url(INDICATOR_URL), _parse_value_or_iterable(indicator))
+            )
         elif source:
-            url = "/".join((SOURCE_URL, _parse_value_or_iterable(source), "indicators"))
+            url = "/".join(
+                (self._url(SOURCE_URL), _parse_value_or_iterable(source), "indicators")
+            )
         elif topic:
-            url = "/".join((TOPIC_URL, _parse_value_or_iterable(topic), "indicators"))
+            url = "/".join(
+                (self._url(TOPIC_URL), _parse_value_or_iterable(topic), "indicators")
+            )
         else:
-            url = INDICATOR_URL
+            url = self._url(INDICATOR_URL)
         results = self.fetcher.fetch(url=url, skip_cache=skip_cache)
         if query:
             results = _filter_by_pattern(results, query)
         return SearchResult(results)
 
-    @needs_pandas
+    def _get_search_index(self, skip_cache: bool = False) -> search.SearchIndex:
+        """
+        Load the indicator search index, syncing it with the catalog if it is
+        missing, older than the cache TTL, or `skip_cache` is True
+        """
+        with self._search_lock:
+            return self._sync_search_index(skip_cache)
+
+    def _sync_search_index(self, skip_cache: bool) -> search.SearchIndex:
+        path = search.index_path(self.cache_path or cache.CACHE_PATH)
+        if self._search_index is None:
+            self._search_index = search.SearchIndex.load(path)
+        index = self._search_index
+        ttl = dt.timedelta(days=self.cache_ttl_days or cache.TTL_DAYS)
+        if (
+            index is None
+            or index.synced is None
+            or skip_cache
+            or dt.datetime.now() - index.synced > ttl
+        ):
+            rows = self.fetcher.fetch(
+                url=self._url(INDICATOR_URL), skip_cache=skip_cache
+            )
+            index = index or search.SearchIndex()
+            with self.tracer.span("search_index_update", rows=len(rows)) as span:
+                span.attributes["changes"] = index.update(rows)
+            index.save(path)
+            self._search_index = index
+        return index
+
+    def search_indicators(
+        self,
+        query: str | re.Pattern,
+        limit: int | None = None,
+        skip_cache: bool = False,
+    ) -> SearchResult:
+        """
+        Search the indicator catalog using a local full-text index.
+
+        Unlike `get_indicators`, this searches the topics and source notes of
+        indicators as well as their names, and ranks the results. The index is
+        stored next to the cache and is brought up to date with the catalog
+        when it is older than the cache TTL; only indicators that have changed
+        are re-indexed. See the `search` module for details.
+
+        Parameters:
+            query: keywords, all of which must match, with a trailing `*` for
+                prefix matches, e.g. `"gdp capita*"`; or a compiled regular
+                expression
+            limit: the maximum number of results to return
+            skip_cache: re-download the catalog and update the index first
+
+        Returns:
+            list of dictionary objects representing indicators, best match
+                first
+        """
+        return SearchResult(
+            self._get_search_index(skip_cache=skip_cache).search(query, limit=limit)
+        )
+
+    @needs_pyarrow
+    def get_table(
+        self,
+        indicator: str,
+        country: str | Sequence[str] = "all",
+        date: str
+        | dt.datetime
+        | tuple[str | dt.datetime, str | dt.datetime]
+        | None = None,
+        freq: str = "Y",
+        source: int | str | Sequence[int | str] | None = None,
+        skip_cache: bool = False,
+    ) -> "pyarrow.Table":
+        """
+        Retrieve data for a single indicator as an Apache Arrow table.
+
+        The table is built directly from the fetched observations without
+        going through pandas. See `arrow.to_table` for the columns and their
+        types. If pyarrow is not installed, a RuntimeError will be raised.
+
+        Parameters:
+            indicator: the desired indicator code
+            country: a country code, sequence of country codes, or "all" (default)
+            date: the desired date as a string, datetime object or a 2-tuple
+                with start and end dates
+            freq: the desired periodicity of the data, one of 'Y' (yearly), 'M'
+                (monthly), or 'Q' (quarterly). The indicator may or may not
+                support the specified frequency.
+            source: the specific source to retrieve data from (defaults on API
+                to 2, World Development Indicators)
+            skip_cache: bypass the cache when downloading
+
+        Returns:
+            A `pyarrow.Table` with one row per observation, and the
+                `last_updated` date in the schema metadata
+        """
+        raw_data = self.get_data(
+            indicator=indicator,
+            country=country,
+            date=date,
+            freq=freq,
+            source=source,
+            skip_cache=skip_cache,
+            compact=True,
+        )
+        with self.tracer.span("to_arrow", indicator=indicator, rows=len(raw_data)):
+            return arrow.to_table(raw_data)
+
+    @needs_pyarrow
+    def export_parquet(
+        self,
+        indicators: str | Iterable[str],
+        path: str | Path,
+        country: str | Sequence[str] = "all",
+        date: str
+        | dt.datetime
+        | tuple[str | dt.datetime, str | dt.datetime]
+        | None = None,
+        freq: str = "Y",
+        source: int | str | Sequence[int | str] | None = None,
+        skip_cache: bool = False,
+        **kwargs: Any,
+    ) -> list[Path]:
+        """
+        Download indicators to a Parquet dataset partitioned by indicator.
+
+        Indicators are fetched and written one at a time, so only one
+        indicator's observations are held in memory at once. Each is written
+        to `path/indicator=<indicator>/part-0.parquet`, replacing any existing
+        file, and the dataset can be read back with
+        `pyarrow.parquet.read_table(path)`. If pyarrow is not installed, a
+        RuntimeError will be raised.
+
+        Parameters:
+            indicators: an indicator code or iterable of indicator codes
+            path: the root directory of the dataset
+            country: a country code, sequence of country codes, or "all" (default)
+            date: the desired date as a string, datetime object or a 2-tuple
+                with start and end dates
+            freq: the desired periodicity of the data, one of 'Y' (yearly), 'M'
+                (monthly), or 'Q' (quarterly). The indicator may or may not
+                support the specified frequency.
+            source: the specific source to retrieve data from (defaults on API
+                to 2, World Development Indicators)
+            skip_cache: bypass the cache when downloading
+            **kwargs: passed through to `pyarrow.parquet.write_table`
+
+        Returns:
+            The paths of the files written
+        """
+        if isinstance(indicators, str):
+            indicators = [indicators]
+        written = []
+        for indicator in indicators:
+            raw_data = self.get_data(
+                indicator=indicator,
+                country=country,
+                date=date,
+                freq=freq,
+                source=source,
+                skip_cache=skip_cache,
+                compact=True,
+            )
+            with self.tracer.span("to_arrow", indicator=indicator, rows=len(raw_data)):
+                written.append(
+                    arrow.write_partition(
+                        raw_data,
+                        path=path,
+                        indicator=indicator,
+                        **kwargs,
+                    )
+                )
+            del raw_data  # Release before fetching the next indicator
+        return written
+
+    @needs_backend
     def get_series(
         self,
         indicator: str,
@@ -425,14 +1068,25 @@ class Client:
         freq: str = "Y",
         source: int | str | Sequence[int | str] | None = None,
         parse_dates: bool = False,
+        periods: bool = False,
         name: str = "value",
         keep_levels: bool = False,
         skip_cache: bool = False,
-    ) -> Series:
+        backend: str = "pandas",
+        timeout: float | None = None,
+        partial: bool = False,
+    ) -> "Series | polars.DataFrame":
         """
         Retrieve data for a single indicator as a pandas Series.
 
-        If pandas is not installed, a RuntimeError will be raised.
+        With `backend="polars"`, a `polars.DataFrame` is returned instead,
+        built directly from the fetched observations. Polars has no index, so
+        the index levels described below are returned as `country` and `date`
+        columns, followed by the values in a column called `name`. Its
+        `last_updated` attribute is set as for the pandas Series.
+
+        If the library for the backend is not installed, a RuntimeError will
+        be raised.
 
         Parameters:
             indicator: the desired indicator code
@@ -444,13 +1098,23 @@ class Client:
                 support the specified frequency.
             source: the specific source to retrieve data from (defaults on API
                 to 2, World Development Indicators)
-            parse_dates: if True, convert date field to a datetime.datetime
-                object.
+            parse_dates: if True, convert the date index to a
+                `pandas.DatetimeIndex`, or the date column to `polars.Date`.
+            periods: if True along with `parse_dates`, convert dates to
+                yearly, monthly or quarterly `pandas.Period` values instead.
+                Not supported by the polars backend.
             skip_cache: bypass the cache when downloading
             name: the desired name for the pandas Series
             keep_levels: if True don't reduce the number of index
                 levels returned if only getting one date or country
             skip_cache: bypass the cache when downloading
+            backend: the library to build the result with, "pandas" (the
+                default) or "polars"
+            timeout: the number of seconds the call may take, over all the
+                pages it fetches. If it runs out, `fetcher.DeadlineExceeded`
+                is raised.
+            partial: if True with `timeout`, build the result from the rows
+                of the pages fetched by the deadline instead of raising
 
         Returns:
             Series with the requested data. The index of the series depends on
@@ -462,29 +1126,58 @@ class Client:
                 will be dropped. If `keep_levels` is `False` and both levels
                 only have one value, the country level is dropped.
         """
-        raw_data = self.get_data(
-            indicator=indicator,
-            country=country,
-            date=date,
-            freq=freq,
-            source=source,
-            parse_dates=parse_dates,
-            skip_cache=skip_cache,
-        )
-        df = pd.DataFrame(
-            [[i["country"]["value"], i["date"], i["value"]] for i in raw_data],
-            columns=["country", "date", name],
-        )
-        df[name] = df[name].map(_cast_float)
-        if not keep_levels and len(df["country"].unique()) == 1:
-            df = df.set_index("date")
-        elif not keep_levels and len(df["date"].unique()) == 1:
-            df = df.set_index("country")
-        else:
-            df = df.set_index(["country", "date"])
-        return Series(df[name], last_updated=raw_data.last_updated)
+        if backend == "polars":
+            if periods:
+                raise ValueError("periods is not supported by the polars backend")
+            with fetcher.deadline(timeout, partial=partial):
+                raw_data = self.get_data(
+                    indicator=indicator,
+                    country=country,
+                    date=date,
+                    freq=freq,
+                    source=source,
+                    skip_cache=skip_cache,
+                    compact=True,
+                )
+            with self.tracer.span("to_polars", indicator=indicator, rows=len(raw_data)):
+                frame = _compact_to_polars(
+                    raw_data,
+                    name=name,
+                    parse_dates=parse_dates,
+                )
+                frame = frame.select(*_polars_levels([frame], keep_levels), name)
+            frame.last_updated = raw_data.last_updated  # ty: ignore[unresolved-attribute]
+            return frame
+        with fetcher.deadline(timeout, partial=partial):
+            raw_data = self.get_data(
+                indicator=indicator,
+                country=country,
+                date=date,
+                freq=freq,
+                source=source,
+                skip_cache=skip_cache,
+            )
+        with self.tracer.span("to_pandas", indicator=indicator, rows=len(raw_data)):
+            countries = [row["country"]["value"] for row in raw_data]
+            row_dates: Any = [row["date"] for row in raw_data]
+            values = _cast_float_array([row["value"] for row in raw_data])
+            single_date = len(set(row_dates)) == 1
+            if parse_dates:
+                row_dates = dates.parse_date_index(row_dates, periods=periods)
+            assert pd is not None  # checked by needs_backend
+            if not keep_levels and len(set(countries)) == 1:
+                index = pd.Index(row_dates, name="date")
+            elif not keep_levels and single_date:
+                index = pd.Index(countries, name="country")
+            else:
+                index = pd.MultiIndex.from_arrays(
+                    [countries, row_dates], names=["country", "date"]
+                )
+            return Series(
+                values, index=index, name=name, last_updated=raw_data.last_updated
+            )
 
-    @needs_pandas
+    @needs_backend
     def get_dataframe(
         self,
         indicators: dict[str, str],
@@ -496,13 +1189,26 @@ class Client:
         freq: str = "Y",
         source: int | str | Sequence[int | str] | None = None,
         parse_dates: bool = False,
+        periods: bool = False,
         keep_levels: bool = False,
         skip_cache: bool = False,
-    ) -> DataFrame:
+        backend: str = "pandas",
+        lazy: bool = False,
+        timeout: float | None = None,
+        partial: bool = False,
+    ) -> "DataFrame | polars.DataFrame | polars.LazyFrame":
         """
         Download a set of indicators and  merge them into a pandas DataFrame.
 
-        If pandas is not installed, a RuntimeError will be raised.
+        With `backend="polars"`, the indicators are joined into a
+        `polars.DataFrame` on `country` and `date` columns, which take the
+        place of the index levels described below. If `lazy` is True, a
+        `polars.LazyFrame` of the join is returned, so it can be combined with
+        further queries before being collected. Either way, the
+        `last_updated` attribute is set as for the pandas DataFrame.
+
+        If the library for the backend is not installed, a RuntimeError will
+        be raised.
 
         Parameters:
             indicators: An dictionary where the keys are desired indicators and the
@@ -515,12 +1221,22 @@ class Client:
                 support the specified frequency.
             source: the specific source to retrieve data from (defaults on API
                 to 2, World Development Indicators)
-            parse_dates: if True, convert date field to a datetime.datetime
-                object.
+            parse_dates: if True, convert the date index to a
+                `pandas.DatetimeIndex`.
+            periods: if True along with `parse_dates`, convert dates to
+                yearly, monthly or quarterly `pandas.Period` values instead.
             skip_cache: bypass the cache when downloading
             keep_levels: if True don't reduce the number of index
                 levels returned if only getting one date or country
             skip_cache: bypass the cache when downloading
+            backend: the library to build the result with, "pandas" (the
+                default) or "polars"
+            lazy: if True with the polars backend, return a `polars.LazyFrame`
+            timeout: the number of seconds the call may take, over all the
+                pages it fetches. If it runs out, `fetcher.DeadlineExceeded`
+                is raised.
+            partial: if True with `timeout`, build the result from the rows
+                of the pages fetched by the deadline instead of raising
 
         Returns:
             DataFrame with one column per indicator. The index of the DataFrame
@@ -533,21 +1249,54 @@ class Client:
                 levels only have one value, the country level is dropped.
 
         """
-        df = DataFrame(
-            serieses={
-                name: self.get_series(
-                    indicator=indicator,
-                    country=country,
-                    date=date,
-                    freq=freq,
-                    source=source,
-                    parse_dates=parse_dates,
-                    keep_levels=True,
-                    skip_cache=skip_cache,
-                )
-                for indicator, name in indicators.items()
+        if backend == "polars":
+            with fetcher.deadline(timeout, partial=partial):
+                frames = {
+                    name: self.get_series(
+                        indicator=indicator,
+                        country=country,
+                        date=date,
+                        freq=freq,
+                        source=source,
+                        parse_dates=parse_dates,
+                        periods=periods,
+                        name=name,
+                        keep_levels=True,
+                        skip_cache=skip_cache,
+                        backend=backend,
+                    )
+                    for indicator, name in indicators.items()
+                }
+            levels = _polars_levels(frames.values(), keep_levels)
+            joined = functools.reduce(
+                lambda left, right: left.join(
+                    right, on=["country", "date"], how="full", coalesce=True
+                ),
+                (frame.lazy() for frame in frames.values()),
+            ).select(*levels, *frames)
+            result = joined if lazy else joined.collect()
+            result.last_updated = {  # type: ignore[union-attr]
+                name: frame.last_updated  # type: ignore[attr-defined]
+                for name, frame in frames.items()
             }
-        )
+            return result
+        with fetcher.deadline(timeout, partial=partial):
+            df = DataFrame(
+                serieses={
+                    name: self.get_series(
+                        indicator=indicator,
+                        country=country,
+                        date=date,
+                        freq=freq,
+                        source=source,
+                        parse_dates=parse_dates,
+                        periods=periods,
+                        keep_levels=True,
+                        skip_cache=skip_cache,
+                    )
+                    for indicator, name in indicators.items()
+                }
+            )
         if not keep_levels and len(set(df.index.get_level_values(0))) == 1:
             df.index = df.index.droplevel(0)
         elif not keep_levels and len(set(df.index.get_level_values(1))) == 1:
@@ -0,0 +1,158 @@
+"""
+wbdata.codec: JSON decoding of API responses
+
+Decoding response pages is the main cost of reading from a warm cache. The
+standard library `json` module is always available; if
+[orjson](https://github.com/ijl/orjson) or
+[msgspec](https://jcristharif.com/msgspec/) is installed it can be used
+instead. By default orjson is used if it is installed, then msgspec, which
+is fastest for observation pages but slower than orjson for pages of other
+shapes, such as the indicator catalog. The choice can be overridden with the
+`WBDATA_JSON_CODEC` environment variable or the `codec` argument to `Client`.
+Valid names are `auto`, `json`, `orjson` and `msgspec`.
+"""
+
+import json
+import os
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None  # type: ignore[assignment]
+
+CODEC = os.getenv("WBDATA_JSON_CODEC", "auto")
+
+Page = tuple[dict[str, Any], list[dict[str, Any]] | None]
+
+
+class Codec:
+    """
+    Decodes JSON using the standard library.
+
+    Subclasses override `loads` and, where they can do better than decoding
+    generically, `decode_page`.
+    """
+
+    name = "json"
+
+    def loads(self, body: str) -> Any:
+        """Decode a JSON document"""
+        return json.loads(body)
+
+    def decode_page(self, body: str) -> Page:
+        """
+        Decode a page of an API response
+
+        Parameters:
+            body: the text of the response
+
+        Returns:
+            the header and rows of the page. Error responses, which have no
+                rows, are returned as a tuple containing only the header.
+        """
+        return tuple(self.loads(body))  # type: ignore[return-value]
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}()"
+
+
+class OrjsonCodec(Codec):
+    """Decodes JSON using orjson"""
+
+    name = "orjson"
+
+    def __init__(self):
+        if orjson is None:
+            raise RuntimeError("The orjson codec requires orjson")
+
+    def loads(self, body: str) -> Any:
+        assert orjson is not None  # checked in __init__
+        return orjson.loads(body)
+
+
+if msgspec:
+
+    class _Header(msgspec.Struct):
+        page: int | str
+        pages: int | str
+        lastupdated: str | None = None
+        sourceid: str | int | None = None
+
+
+class MsgspecCodec(Codec):
+    """
+    Decodes JSON using msgspec.
+
+    Pages are decoded directly into their expected shape, with the header
+    validated as it is read and its unused fields skipped. Anything that does
+    not have that shape, such as an error response, is decoded generically.
+    """
+
+    name = "msgspec"
+
+    def __init__(self):
+        if msgspec is None:
+            raise RuntimeError("The msgspec codec requires msgspec")
+        self._decoder = msgspec.json.Decoder()
+        self._page_decoder = msgspec.json.Decoder(
+            tuple[_Header, list[dict[str, Any]] | None]
+        )
+
+    def loads(self, body: str) -> Any:
+        return self._decoder.decode(body)
+
+    def decode_page(self, body: str) -> Page:
+        assert msgspec is not None  # checked in __init__
+        try:
+            header, rows = self._page_decoder.decode(body)
+        except msgspec.ValidationError:
+            return super().decode_page(body)
+        return (
+            {
+                "page": header.page,
+                "pages": header.pages,
+                "lastupdated": header.lastupdated,
+                "sourceid": header.sourceid,
+            },
+            rows,
+        )
+
+
+CODECS: dict[str, type[Codec]] = {
+    "json": Codec,
+    "orjson": OrjsonCodec,
+    "msgspec": MsgspecCodec,
+}
+
+
+def get_codec(name: str | None = None) -> Codec:
+    """
+    Get a codec by name
+
+    Parameters:
+        name: the name of the codec. If `None`, use the `WBDATA_JSON_CODEC`
+            environment variable. If `"auto"`, use orjson or msgspec if
+            installed, and the standard library otherwise.
+
+    Returns:
+        the codec
+    """
+    name = (name or CODEC).lower()
+    if name == "auto":
+        if orjson is not None:
+            return OrjsonCodec()
+        if msgspec is not None:
+            return MsgspecCodec()
+        return Codec()
+    try:
+        return CODECS[name]()
+    except KeyError:
+        raise ValueError(
+            f"Unknown codec {name!r}, expected one of: auto, {', '.join(CODECS)}"
+        ) from None
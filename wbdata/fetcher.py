@@ -3,19 +3,83 @@ wbdata.fetcher: retrieve and cache queries
 """
 
 import contextlib
+import contextvars
 import dataclasses
 import datetime as dt
+import functools
 import json
 import logging
+import math
+import os
 import pprint
-from collections.abc import MutableMapping
-from typing import Any, NamedTuple
+import threading
+import time
+import urllib.parse
+import weakref
+from array import array
+from collections.abc import (
+    Callable,
+    Generator,
+    Hashable,
+    Iterable,
+    Iterator,
+    MutableMapping,
+)
+from typing import Any, Literal, NamedTuple, TypeVar, cast, overload
 
 import backoff
+import cachetools
 import requests
+import requests.adapters
+
+from . import dates, planner, tracing
+from .codec import Codec, get_codec
+from .versions import SourceVersions, key_source
 
 PER_PAGE = 1000
 TRIES = 3
+STREAM_CHUNK_SIZE = 64 * 1024
+POOL_SIZE = 16
+#: The number of cached pages whose compact columns a fetcher keeps
+COMPACT_PAGES = 64
+
+try:
+    ERROR_TTL = dt.timedelta(
+        minutes=float(os.getenv("WBDATA_CACHE_ERROR_TTL_MINUTES", "60"))
+    )
+except ValueError:
+    logging.warning(
+        "Couldn't parse WBDATA_CACHE_ERROR_TTL_MINUTES value, defaulting to 60"
+    )
+    ERROR_TTL = dt.timedelta(minutes=60)
+
+try:
+    TIMEOUT = float(os.getenv("WBDATA_TIMEOUT_SECONDS", "60"))
+except ValueError:
+    logging.warning("Couldn't parse WBDATA_TIMEOUT_SECONDS value, defaulting to 60")
+    TIMEOUT = 60.0
+
+try:
+    CHECKPOINT_TTL = dt.timedelta(
+        hours=float(os.getenv("WBDATA_CHECKPOINT_TTL_HOURS", "24"))
+    )
+except ValueError:
+    logging.warning(
+        "Couldn't parse WBDATA_CHECKPOINT_TTL_HOURS value, defaulting to 24"
+    )
+    CHECKPOINT_TTL = dt.timedelta(hours=24)
+
+#: Ids of API errors that may not recur, such as the service being
+#: unavailable, which are never cached
+TRANSIENT_ERRORS = frozenset({"105", "199"})
+
+#: Parameter added to the key of a page to get the key its error is cached
+#: under
+ERROR_PARAM = "wbdata:error"
+
+#: Parameter added to the key of a query to get the key the checkpoint of an
+#: interrupted download of it is stored under
+CHECKPOINT_PARAM = "wbdata:checkpoint"
 
 
 def _strip_id(row: dict[str, Any]) -> None:
@@ -23,30 +87,181 @@ def _strip_id(row: dict[str, Any]) -> None:
         row["id"] = row["id"].strip()  # type: ignore[union-attr]
 
 
-Response = tuple[dict[str, Any], list[dict[str, Any]]]
+#: A decoded page: its header, and its rows, which are null in empty pages
+Response = tuple[dict[str, Any], list[dict[str, Any]] | None]
+
+T = TypeVar("T")
+
+
+class APIError(RuntimeError):
+    """
+    An error message returned by the API in place of data, such as for an
+    unknown indicator.
+
+    Parameters:
+        id: the id of the error
+        key: the short description of the error
+        value: the message of the error
+    """
+
+    def __init__(self, id: str, key: str, value: str):
+        super().__init__(f"Got error {id} ({key}): {value}")
+        self.id = id
+        self.key = key
+        self.value = value
+
+    @property
+    def transient(self) -> bool:
+        """Whether the error may not recur, so retrying the request may work"""
+        return str(self.id) in TRANSIENT_ERRORS
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    A fetch ran out of time before fetching all of its pages.
+
+    Parameters:
+        pages: the number of pages fetched
+        total: the number of pages of the query, if known
+        partial: the rows of the pages fetched, as a `Result`, or a
+            `CompactResult` for compact fetches
+    """
+
+    def __init__(
+        self,
+        pages: int,
+        total: int | None,
+        partial: "Result | CompactResult",
+    ):
+        super().__init__(
+            f"Deadline exceeded after fetching {pages} of "
+            f"{'an unknown number of' if total is None else total} pages"
+        )
+        self.pages = pages
+        self.total = total
+        self.partial = partial
+
+
+@dataclasses.dataclass(frozen=True)
+class Deadline:
+    """
+    A time by which fetches must finish.
+
+    Parameters:
+        end: the time, as given by `time.monotonic`
+        partial: whether callers that can should return the rows fetched by
+            the deadline rather than raise `DeadlineExceeded`
+    """
+
+    end: float
+    partial: bool = False
+
+    def remaining(self) -> float:
+        """The number of seconds left"""
+        return self.end - time.monotonic()
+
+
+_deadline: contextvars.ContextVar[Deadline | None] = contextvars.ContextVar(
+    "wbdata_deadline", default=None
+)
+
+
+@contextlib.contextmanager
+def deadline(
+    seconds: float | None, partial: bool = False
+) -> Generator[Deadline | None, None, None]:
+    """
+    Limit the time that fetches made in a block can take together.
+
+    No page is requested once the deadline has passed, and requests time out
+    when it does, with `DeadlineExceeded` raised by the fetch. A deadline
+    inside another can only shorten it.
+
+    Parameters:
+        seconds: the time limit. If `None`, keep the current deadline, if any.
+        partial: whether callers that can should return partial results
+
+    Returns:
+        the deadline in force in the block, or `None` if there is none
+    """
+    current = _deadline.get()
+    if seconds is None:
+        yield current
+        return
+    end = time.monotonic() + seconds
+    if current is not None:
+        end = min(end, current.end)
+    token = _deadline.set(Deadline(end=end, partial=partial))
+    try:
+        yield _deadline.get()
+    finally:
+        _deadline.reset(token)
+
+
+@dataclasses.dataclass(frozen=True)
+class RetryPolicy:
+    """
+    How a page that fails to download is retried.
+
+    Only the page that failed is requested again: the rows of the pages
+    before it are kept. Timeouts, connection errors, responses that can't be
+    decoded, such as error pages from a proxy, and transient `APIError`s are
+    retried. No retry is made if it would have to wait past the deadline.
+
+    Parameters:
+        tries: the number of times to try each page
+        wait: the number of seconds to wait before the first retry, doubled
+            for each one after it. Waits are jittered.
+        max_wait: the longest wait between tries
+    """
+
+    tries: int = TRIES
+    wait: float = 1.0
+    max_wait: float = 30.0
+
+    def retriable(self, error: BaseException) -> bool:
+        """Whether a page that failed with an error should be tried again"""
+        if isinstance(error, APIError):
+            return error.transient
+        if isinstance(error, requests.Timeout | requests.ConnectionError):
+            return True
+        return isinstance(error, ValueError) and not isinstance(
+            error, requests.RequestException
+        )
+
+    def waits(self) -> Iterator[float]:
+        """The wait before each retry"""
+        expo = backoff.expo(factor=self.wait, max_value=self.max_wait)
+        next(expo)
+        for _ in range(self.tries - 1):
+            yield backoff.full_jitter(next(expo))
 
 
 class ParsedResponse(NamedTuple):
-    rows: list[dict[str, Any]]
+    rows: "list[dict[str, Any]] | CompactResult"
     page: int
     pages: int
     last_updated: str | None
+    source: str | None = None
 
     @classmethod
     def from_response(cls, response: Response) -> "ParsedResponse":
         try:
             return ParsedResponse(
-                rows=response[1],
+                rows=response[1] or [],
                 page=int(response[0]["page"]),
                 pages=int(response[0]["pages"]),
                 last_updated=response[0].get("lastupdated"),
+                source=(
+                    None
+                    if response[0].get("sourceid") is None
+                    else str(response[0]["sourceid"])
+                ),
             )
         except (IndexError, KeyError) as e:
             try:
                 message = response[0]["message"][0]
-                raise RuntimeError(
-                    f"Got error {message['id']} ({message['key']}): {message['value']}"
-                ) from e
+                raise APIError(message["id"], message["key"], message["value"]) from e
             except (IndexError, KeyError) as e:
                 raise RuntimeError(
                     f"Got unexpected response:\n{pprint.pformat(response)}"
@@ -56,6 +271,210 @@ class ParsedResponse(NamedTuple):
 CacheKey = tuple[str, tuple[tuple[str, Any], ...]]
 
 
+#: Path segments that are followed by ;-separated lists of case-insensitive
+#: codes, such as the countries in `countries/USA;GBR/indicators/...`
+CODE_SEGMENTS = frozenset(
+    {
+        "countries",
+        "country",
+        "incomelevels",
+        "indicators",
+        "indicator",
+        "lendingtypes",
+        "regions",
+        "sources",
+        "source",
+        "topics",
+        "topic",
+    }
+)
+
+#: Parameters whose values are case-insensitive codes
+CODE_PARAMS = frozenset({"incomelevel", "lendingtype", "region", "source"})
+
+
+def _canonical_codes(codes: str) -> str:
+    """Sort, deduplicate and uppercase a ;-separated list of codes"""
+    codes = ";".join(sorted({i.strip().upper() for i in codes.split(";")}))
+    return "all" if codes == "ALL" else codes
+
+
+def _canonical_url(url: str) -> str:
+    parts = urllib.parse.urlsplit(url)
+    segments = parts.path.split("/")
+    for i in range(1, len(segments)):
+        if segments[i - 1].lower() in CODE_SEGMENTS and segments[i]:
+            segments[i] = _canonical_codes(segments[i])
+    return urllib.parse.urlunsplit(parts._replace(path="/".join(segments)))
+
+
+def _canonical_value(name: str, value: Any) -> Any:
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(sorted({_canonical_value(name, i) for i in value}, key=str))
+    if name == "date":
+        return str(value).strip().upper()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        value = value.strip()
+        if value.isdigit():
+            return int(value)
+        if name.lower() in CODE_PARAMS:
+            return _canonical_codes(value)
+    return value
+
+
+def _error_key(key: CacheKey) -> CacheKey:
+    return (key[0], (*key[1], (ERROR_PARAM, True)))
+
+
+def _checkpoint_key(key: CacheKey) -> CacheKey:
+    return (key[0], (*key[1], (CHECKPOINT_PARAM, True)))
+
+
+def cache_key(url: str, params: dict[str, Any]) -> CacheKey:
+    """
+    Get the key a page is cached under.
+
+    Equivalent queries get the same key: lists of codes in the url, such as
+    countries, are sorted, deduplicated and uppercased, as are code
+    parameters such as `source` and `incomeLevel`; numeric strings become
+    integers, so `source="2"` and `source=2` match; and dates are
+    uppercased.
+
+    Parameters:
+        url: the url of the page
+        params: the GET parameters of the page
+
+    Returns:
+        the cache key
+    """
+    return (
+        _canonical_url(url),
+        tuple(
+            sorted(
+                (name, _canonical_value(name, value))
+                for name, value in params.items()
+                if value is not None
+            )
+        ),
+    )
+
+
+class _StreamDecoder:
+    """
+    Incrementally decode a `[header, [row, ...]]` response from text chunks.
+
+    Only one row at a time needs to be held in decoded form. If `keep_text` is
+    True, the raw text is kept so it can be cached once decoding is complete.
+    """
+
+    _whitespace = " \t\n\r"
+
+    def __init__(self, chunks: Iterable[str], keep_text: bool = False):
+        self._chunks = iter(chunks)
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._parts: list[str] | None = [] if keep_text else None
+        self.size = 0
+
+    @property
+    def text(self) -> str:
+        """The raw text decoded so far"""
+        return "".join(self._parts or ())
+
+    def _fill(self) -> bool:
+        chunk = next(self._chunks, None)
+        while chunk == "":
+            chunk = next(self._chunks, None)
+        if chunk is None:
+            return False
+        self.size += len(chunk)
+        if self._parts is not None:
+            self._parts.append(chunk)
+        self._buffer = self._buffer[self._pos :] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self) -> str | None:
+        """Skip whitespace and return the next character, or None at the end"""
+        while True:
+            while (
+                self._pos < len(self._buffer)
+                and self._buffer[self._pos] in self._whitespace
+            ):
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return None
+
+    def _expect(self, char: str) -> None:
+        found = self._peek()
+        if found != char:
+            raise json.JSONDecodeError(
+                f"Expecting {char!r}, found {found!r}", self._buffer, self._pos
+            )
+        self._pos += 1
+
+    def _value(self) -> Any:
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # Numbers and literals at the end of the buffer may be truncated
+            if (
+                end == len(self._buffer)
+                and not isinstance(value, (dict, list))
+                and self._fill()
+            ):
+                continue
+            self._pos = end
+            return value
+
+    def _rows(self) -> Iterator[dict[str, Any]]:
+        if self._peek() == "]":
+            self._pos += 1
+        else:
+            while True:
+                yield self._value()
+                if self._peek() == ",":
+                    self._pos += 1
+                    continue
+                self._expect("]")
+                break
+        self._expect("]")
+        while self._fill():  # Consume any trailing whitespace
+            pass
+
+    def decode(self) -> tuple[Response, Iterator[dict[str, Any]]]:
+        """
+        Decode the header.
+
+        Returns:
+            the response with the header and an empty list of rows, which can
+                be passed to `ParsedResponse.from_response`, and an iterator
+                over the rows
+        """
+        self._expect("[")
+        header = self._value()
+        if self._peek() == "]":  # Error responses have no rows
+            self._pos += 1
+            return (header, []), iter(())
+        self._expect(",")
+        if self._peek() == "n":  # Empty responses can have null for rows
+            self._value()
+            self._expect("]")
+            return (header, []), iter(())
+        self._expect("[")
+        return (header, []), self._rows()
+
+
 class Result(list[dict[str, Any]]):
     """
     List with a `last_updated` attribute. The `last_updated` attribute is either
@@ -67,25 +486,468 @@ class Result(list[dict[str, Any]]):
         self.last_updated = last_updated
 
 
+class _Dictionary:
+    """A dictionary-encoded column: distinct values plus one code per row"""
+
+    __slots__ = ("values", "codes", "_lookup")
+
+    def __init__(self):
+        self.values: list[Any] = []
+        self.codes = array("I")
+        self._lookup: dict[Hashable, int] = {}
+
+    def _code(self, value: Hashable) -> int:
+        code = self._lookup.get(value)
+        if code is None:
+            code = self._lookup[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def append(self, value: Hashable) -> None:
+        code = self._lookup.get(value)
+        if code is None:
+            code = self._code(value)
+        self.codes.append(code)
+
+    def extend(self, other: "_Dictionary") -> None:
+        """Append the rows of another column, recoding its values"""
+        codes = array("I", map(self._code, other.values))
+        if codes == array("I", range(len(codes))):
+            self.codes.extend(other.codes)
+        else:
+            self.codes.extend(map(codes.__getitem__, other.codes))
+
+    def __getitem__(self, index: int) -> Any:
+        return self.values[self.codes[index]]
+
+    def decode(self) -> list[Any]:
+        values = self.values
+        return [values[code] for code in self.codes]
+
+
+class Observation:
+    """
+    A read-only view of one row of a `CompactResult`.
+
+    Fields are available as attributes, or by key as in the original API rows,
+    so `observation["country"]["value"]` works as it does for a `Result` row.
+    """
+
+    __slots__ = ("_result", "_index")
+
+    KEYS = (
+        "indicator",
+        "country",
+        "countryiso3code",
+        "date",
+        "value",
+        "unit",
+        "obs_status",
+        "decimal",
+    )
+
+    def __init__(self, result: "CompactResult", index: int):
+        self._result = result
+        self._index = index
+
+    @property
+    def indicator_id(self) -> str:
+        return self._result._indicators[self._index][0]
+
+    @property
+    def indicator_name(self) -> str:
+        return self._result._indicators[self._index][1]
+
+    @property
+    def country_id(self) -> str:
+        return self._result._countries[self._index][0]
+
+    @property
+    def country_name(self) -> str:
+        return self._result._countries[self._index][1]
+
+    @property
+    def countryiso3code(self) -> str:
+        return self._result._countries[self._index][2]
+
+    @property
+    def date(self) -> Any:
+        return self._result._dates[self._index]
+
+    @property
+    def value(self) -> float | None:
+        value = self._result._values[self._index]
+        return None if math.isnan(value) else value
+
+    @property
+    def unit(self) -> str:
+        return self._result._extras[self._index][0]
+
+    @property
+    def obs_status(self) -> str:
+        return self._result._extras[self._index][1]
+
+    @property
+    def decimal(self) -> int:
+        return self._result._extras[self._index][2]
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "indicator":
+            return {"id": self.indicator_id, "value": self.indicator_name}
+        if key == "country":
+            return {"id": self.country_id, "value": self.country_name}
+        if key in self.KEYS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self) -> tuple[str, ...]:
+        return self.KEYS
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the observation as a row in the API format"""
+        return {key: self[key] for key in self.KEYS}
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Observation):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"Observation({self.to_dict()!r})"
+
+
+class CompactResult:
+    """
+    A memory-efficient, column-oriented alternative to `Result` for
+    observation data.
+
+    Values are stored as a float array, with NaN for missing values. Dates,
+    countries, indicators and the remaining fields are dictionary-encoded,
+    so each distinct name or code is stored once. Iterating or indexing
+    yields `Observation` views, created on demand.
+
+    Like `Result`, the `last_updated` attribute is either a datetime.datetime
+    object or None.
+
+    Parameters:
+        rows: observation rows in the API format, or another `CompactResult`
+        last_updated: when the data was last updated
+    """
+
+    def __init__(
+        self,
+        rows: "Iterable[dict[str, Any]] | CompactResult" = (),
+        last_updated: dt.datetime | None = None,
+    ):
+        self.last_updated = last_updated
+        self._values = array("d")
+        self._dates = _Dictionary()
+        self._countries = _Dictionary()
+        self._indicators = _Dictionary()
+        self._extras = _Dictionary()
+        self.extend(rows)
+
+    def append(self, row: dict[str, Any]) -> None:
+        """Add an observation row in the API format"""
+        value = row["value"]
+        try:
+            self._values.append(math.nan if value is None else float(value))
+        except (TypeError, ValueError):
+            self._values.append(math.nan)
+        self._dates.append(row["date"])
+        country = row["country"]
+        self._countries.append(
+            (country["id"], country["value"], row.get("countryiso3code", ""))
+        )
+        indicator = row["indicator"]
+        self._indicators.append((indicator["id"], indicator["value"]))
+        self._extras.append(
+            (row.get("unit", ""), row.get("obs_status", ""), row.get("decimal", 0))
+        )
+
+    def extend(self, rows: "Iterable[dict[str, Any]] | CompactResult") -> None:
+        """
+        Add observation rows in the API format, or the observations of another
+        `CompactResult`
+        """
+        if isinstance(rows, CompactResult):
+            self._values.extend(rows._values)
+            self._dates.extend(rows._dates)
+            self._countries.extend(rows._countries)
+            self._indicators.extend(rows._indicators)
+            self._extras.extend(rows._extras)
+            return
+        for row in rows:
+            self.append(row)
+
+    def _truncate(self, length: int) -> None:
+        """Drop the observations after the first `length`"""
+        del self._values[length:]
+        for column in (self._dates, self._countries, self._indicators, self._extras):
+            del column.codes[length:]
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    @overload
+    def __getitem__(self, index: int) -> Observation: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[Observation]: ...
+
+    def __getitem__(self, index: int | slice) -> Observation | list[Observation]:
+        if isinstance(index, slice):
+            return [Observation(self, i) for i in range(len(self))[index]]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("CompactResult index out of range")
+        return Observation(self, index)
+
+    def __iter__(self) -> Iterator[Observation]:
+        return (Observation(self, i) for i in range(len(self)))
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (CompactResult, list)):
+            return len(self) == len(other) and all(
+                a == b for a, b in zip(self, other, strict=True)
+            )
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"CompactResult({len(self)} observations)"
+
+    @property
+    def values(self) -> array:
+        """The observation values, with NaN for missing values"""
+        return self._values
+
+    def encoded(self, name: str) -> tuple[list[Any], array]:
+        """
+        Get one dictionary-encoded column.
+
+        Parameters:
+            name: one of `Observation.KEYS` other than `value`, or
+                `indicator.id`, `indicator.value`, `country.id` or
+                `country.value`
+
+        Returns:
+            the distinct values of the column, and an array with the position
+                in those values of each observation's value. The distinct
+                values are not guaranteed to be unique.
+        """
+        if name == "date":
+            return self._dates.values, self._dates.codes
+        fields = {
+            "indicator.id": (self._indicators, 0),
+            "indicator.value": (self._indicators, 1),
+            "country.id": (self._countries, 0),
+            "country.value": (self._countries, 1),
+            "countryiso3code": (self._countries, 2),
+            "unit": (self._extras, 0),
+            "obs_status": (self._extras, 1),
+            "decimal": (self._extras, 2),
+        }
+        try:
+            column, field = fields[name]
+        except KeyError as e:
+            raise KeyError(name) from e
+        return [i[field] for i in column.values], column.codes
+
+    def column(self, name: str) -> list[Any]:
+        """
+        Decode one column.
+
+        Parameters:
+            name: one of `Observation.KEYS` or `indicator.id`,
+                `indicator.value`, `country.id` or `country.value`
+
+        Returns:
+            a list with the value of the column for each observation
+        """
+        if name == "value":
+            return [None if math.isnan(i) else i for i in self._values]
+        lookup, codes = self.encoded(name)
+        return [lookup[code] for code in codes]
+
+    def parse_dates(self) -> None:
+        """
+        Replace date strings with datetime objects, in-place, following the
+        rules of `dates.parse_row_dates`. Each distinct date is parsed once.
+        """
+        self._dates.values = dates.parse_date_values(self._dates.values)
+        self._dates._lookup = {v: i for i, v in enumerate(self._dates.values)}
+
+    def to_result(self) -> Result:
+        """Expand into a `Result` of rows in the API format"""
+        return Result((i.to_dict() for i in self), last_updated=self.last_updated)
+
+
+def _truncate(rows: list[dict[str, Any]] | CompactResult, length: int) -> None:
+    if isinstance(rows, CompactResult):
+        rows._truncate(length)
+    else:
+        del rows[length:]
+
+
+def _finish(
+    rows: list[dict[str, Any]] | CompactResult,
+    last_updated: str | None,
+    compact: bool,
+) -> Result | CompactResult:
+    """Make the result of a fetch from its rows and last updated date"""
+    date = None if not last_updated else dt.datetime.strptime(last_updated, "%Y-%m-%d")
+    if compact:
+        if not isinstance(rows, CompactResult):
+            rows = CompactResult(rows)
+        rows.last_updated = date
+        return rows
+    return Result(rows, last_updated=date)
+
+
+#: Live fetchers, so their sessions can be reset in forked processes
+_FETCHERS: "weakref.WeakValueDictionary[int, Fetcher]" = weakref.WeakValueDictionary()
+
+
+def _reset_sessions() -> None:
+    """
+    Close the connections each fetcher's session inherited from the parent
+    process, so the child doesn't read or write on sockets the parent is
+    using. Sessions reconnect on their next request and keep their settings.
+    Locks are replaced, since a thread that held one in the parent doesn't
+    exist in the child.
+    """
+    for fetcher in list(_FETCHERS.values()):
+        fetcher.lock = threading.RLock()
+        fetcher.session.close()
+
+
+def make_session() -> requests.Session:
+    """
+    Create a session whose connection pools hold `POOL_SIZE` connections per
+    host, so that up to that many threads can make requests at once without
+    opening and discarding connections.
+    """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_sessions)
+
+
 @dataclasses.dataclass
 class Fetcher:
     """
     An object for making cached HTTP requests.
 
     Parameters:
-        cache: a dictlike container for caching responses
-        session: a requests session to use to make the requests, if `None`,
-            create a new session
-    """
+        cache: a dictlike container for caching responses, and the errors and
+            checkpoints of queries
+        session: a requests session to use to make the requests. The
+            default is made by `make_session`.
+        tracer: a `tracing.Tracer` to report spans to
+        stream: if True, download and decode responses incrementally instead
+            of holding the complete text and decoded page in memory at once.
+            Rows are decoded one at a time with the standard library's
+            `json`, rather than a page at a time with `codec`, so a fetch
+            that isn't cached takes about twice as long. Each page's text is
+            still held until the page is cached, so the saving is the
+            decoded page, which is the larger part.
+        codec: the `codec.Codec` used to decode responses. The default is
+            chosen by `codec.get_codec`.
+        error_ttl: how long to cache an `APIError` for a page, so that
+            requesting the page again raises it without a request. The
+            default is `ERROR_TTL`, set with the
+            `WBDATA_CACHE_ERROR_TTL_MINUTES` environment variable.
+        timeout: the timeout of each request in seconds, for connecting and
+            for each read. The default is `TIMEOUT`, set with the
+            `WBDATA_TIMEOUT_SECONDS` environment variable. Requests made
+            under a `deadline` time out when it passes, if that is sooner.
+        versions: if given, cached pages are only used while they are from
+            the current version of their source, as reported by the page's
+            `sourceid`, or its query's source, and `lastupdated`
+        retry: the `RetryPolicy` for pages that fail to download
+        checkpoint_ttl: how long to keep the checkpoint of a download that
+            failed. The default is `CHECKPOINT_TTL`, set with the
+            `WBDATA_CHECKPOINT_TTL_HOURS` environment variable.
 
-    cache: MutableMapping[CacheKey, str]
-    session: requests.Session = dataclasses.field(default_factory=requests.Session)
+    Only pages that decode to data are cached. Errors the API reports are
+    cached for `error_ttl`, unless they are `APIError.transient`, and
+    responses that can't be decoded, such as error pages from a proxy, and
+    errors making the request aren't cached at all.
 
-    @backoff.on_exception(
-        wait_gen=backoff.expo,
-        exception=requests.ConnectTimeout,
-        max_tries=TRIES,
+    When a download of several pages fails, even after retrying, with an
+    error the `retry` policy deems retriable, such as a timeout, or is
+    interrupted with Ctrl-C, the last page fetched is stored in the cache as
+    a checkpoint of the query. Fetching
+    the query again resumes after it: the pages up to the checkpoint are read
+    from the cache, even with `skip_cache`, and only the rest are requested.
+    The checkpoint is dropped once the query is fetched in full.
+
+    A fetcher can be shared between threads. Reads and writes of the cache
+    are made under `lock`, unless the cache has a true `thread_safe`
+    attribute, like the caches made by `cache.get_cache`, which lock their
+    entries in memory but not their reads and writes on disk. Requests and
+    decoding run concurrently. Threads that miss the same page at once each
+    request it.
+
+    When a process that has a fetcher forks, the connections of the
+    fetcher's session are closed in the child, which makes new ones.
+    """
+
+    cache: MutableMapping[CacheKey, Any]
+    session: requests.Session = dataclasses.field(default_factory=make_session)
+    tracer: tracing.Tracer = dataclasses.field(default_factory=tracing.Tracer)
+    stream: bool = False
+    codec: Codec = dataclasses.field(default_factory=get_codec)
+    error_ttl: dt.timedelta = ERROR_TTL
+    timeout: float | None = TIMEOUT
+    versions: SourceVersions | None = None
+    retry: RetryPolicy = dataclasses.field(default_factory=RetryPolicy)
+    checkpoint_ttl: dt.timedelta = CHECKPOINT_TTL
+    lock: Any = dataclasses.field(
+        default_factory=threading.RLock, init=False, repr=False, compare=False
+    )
+    _compact_pages: cachetools.LRUCache = dataclasses.field(
+        default_factory=lambda: cachetools.LRUCache(COMPACT_PAGES),
+        init=False,
+        repr=False,
+        compare=False,
     )
+
+    def __post_init__(self):
+        _FETCHERS[id(self)] = self
+
+    def _cache_lock(self) -> contextlib.AbstractContextManager:
+        """The lock to use the cache under: `lock`, unless it is thread-safe"""
+        if getattr(self.cache, "thread_safe", False):
+            return contextlib.nullcontext()
+        return self.lock
+
+    def _request_timeout(self) -> float | None:
+        """The timeout of a request: `timeout`, cut to the deadline's time left"""
+        current = _deadline.get()
+        if current is None:
+            return self.timeout
+        remaining = current.remaining()
+        if remaining <= 0:
+            raise requests.Timeout("Deadline exceeded")
+        return remaining if self.timeout is None else min(self.timeout, remaining)
+
     def _get_response_body(
         self,
         url: str,
@@ -100,15 +962,192 @@ class Fetcher:
 
         Returns: a string with the response content
         """
-        # Copy is for mocking. It's kind of depressing but not too expensive
-        body = self.session.get(url=url, params={**params}).text
+        with self.tracer.span("http_request", url=url, params=params) as span:
+            # Copy is for mocking. It's kind of depressing but not too expensive
+            body = self.session.get(
+                url=url, params={**params}, timeout=self._request_timeout()
+            ).text
+            span.attributes["bytes"] = len(body)
+        return body
+
+    def _open_response_stream(
+        self,
+        url: str,
+        params: dict[str, Any],
+    ) -> requests.Response:
+        """
+        Start a streaming request to the World Bank
+
+        Parameters:
+            url: the url to retrieve
+            params: a dictionary of GET parameters
+
+        Returns: the response, with the body not yet downloaded
+        """
+        response = self.session.get(
+            url=url, params={**params}, stream=True, timeout=self._request_timeout()
+        )
+        if response.encoding is None:
+            response.encoding = "utf-8"
+        return response
+
+    def _raise_cached_error(self, key: CacheKey) -> None:
+        """Raise the error cached for a page, if it hasn't expired"""
+        error_key = _error_key(key)
+        with self._cache_lock():
+            cached = self.cache.get(error_key)
+        if cached is None:
+            return
+        error_id, error_key_, value, expires = cached
+        if dt.datetime.now() >= expires:
+            with self._cache_lock(), contextlib.suppress(KeyError):
+                del self.cache[error_key]
+            return
+        raise APIError(error_id, error_key_, value)
+
+    def _cache_error(self, key: CacheKey, error: APIError) -> None:
+        if error.transient or not self.error_ttl:
+            return
+        expires = dt.datetime.now() + self.error_ttl
+        with self._cache_lock():
+            self.cache[_error_key(key)] = (error.id, error.key, error.value, expires)
+
+    def _load_checkpoint(self, key: CacheKey) -> int:
+        """The last page fetched by a failed download of a query, or 0"""
+        checkpoint_key = _checkpoint_key(key)
+        with self._cache_lock():
+            cached = self.cache.get(checkpoint_key)
+        if cached is None:
+            return 0
+        page, expires = cached
+        if dt.datetime.now() >= expires:
+            with self._cache_lock(), contextlib.suppress(KeyError):
+                del self.cache[checkpoint_key]
+            return 0
+        return page
+
+    def _save_checkpoint(self, key: CacheKey, page: int) -> None:
+        if page < 1 or not self.checkpoint_ttl:
+            return
+        expires = dt.datetime.now() + self.checkpoint_ttl
+        with self._cache_lock():
+            self.cache[_checkpoint_key(key)] = (page, expires)
+
+    def _clear_checkpoint(self, key: CacheKey) -> None:
+        with self._cache_lock(), contextlib.suppress(KeyError):
+            del self.cache[_checkpoint_key(key)]
+
+    def _retried(self, attempt: Callable[[], T], url: str, params: dict[str, Any]) -> T:
+        """
+        Get a page with `attempt`, retrying it as `retry` allows
+
+        Parameters:
+            attempt: a function that gets the page
+            url: the url of the page
+            params: the parameters of the page
+
+        Returns:
+            the result of the first attempt that succeeds
+        """
+        waits = self.retry.waits()
+        while True:
+            try:
+                return attempt()
+            except Exception as e:
+                wait = next(waits, None)
+                current = _deadline.get()
+                if (
+                    wait is None
+                    or not self.retry.retriable(e)
+                    or (current is not None and current.remaining() <= wait)
+                ):
+                    raise
+                logging.debug(f"Retrying page after {e!r}")
+                with self.tracer.span(
+                    "retry", url=url, params={**params}, error=repr(e), wait=wait
+                ):
+                    time.sleep(wait)
+
+    def _get_cached_body(
+        self, key: CacheKey, url: str, params: dict[str, Any]
+    ) -> str | None:
+        with self.tracer.span("cache_lookup", url=url, params=params) as span:
+            with self._cache_lock():
+                body = self.cache.get(key)
+            span.attributes["hit"] = body is not None
+            span.attributes["bytes"] = len(body) if body is not None else 0
         return body
 
+    def _get_streamed_response(
+        self,
+        url: str,
+        params: dict[str, Any],
+        skip_cache=False,
+        store=True,
+    ) -> tuple[ParsedResponse, Iterator[dict[str, Any]]]:
+        """
+        Get single page response from World Bank API or from cache, decoding
+        rows as they are consumed
+
+        Parameters:
+            query_url: the base url to be queried
+            params: a dictionary of GET arguments
+            skip_cache: bypass the cache
+            store: if True, keep the text of a downloaded response as it is
+                decoded, and cache it once all of its rows have been consumed
+
+        Returns: parsed version of the API response header with no rows, and
+            an iterator over the rows
+        """
+        key = cache_key(url, params)
+        body = None
+        if not skip_cache:
+            self._raise_cached_error(key)
+            body = self._get_cached_body(key, url, params)
+        if body is not None:
+            decoder = _StreamDecoder([body])
+            response, rows = decoder.decode()
+            parsed = ParsedResponse.from_response(response)
+            if not self._is_current(key, parsed):
+                body = None
+        if body is None:
+            http_response = self._open_response_stream(url, params)
+            # The chunks are str, since the response has an encoding
+            chunks = http_response.iter_content(
+                chunk_size=STREAM_CHUNK_SIZE, decode_unicode=True
+            )
+            decoder = _StreamDecoder(cast(Iterator[str], chunks), keep_text=store)
+            response, rows = decoder.decode()
+            try:
+                parsed = ParsedResponse.from_response(response)
+            except APIError as e:
+                self._cache_error(key, e)
+                raise
+
+        def consume() -> Iterator[dict[str, Any]]:
+            with self.tracer.span(
+                "http_request" if body is None else "json_decode",
+                url=url,
+                params=params,
+                streamed=True,
+            ) as span:
+                n_rows = 0
+                for row in rows:
+                    n_rows += 1
+                    yield row
+                span.attributes.update(bytes=decoder.size, rows=n_rows)
+            if body is None and store:
+                with self._cache_lock():
+                    self.cache[key] = decoder.text
+
+        return parsed, consume()
+
     def _get_response(
         self,
         url: str,
         params: dict[str, Any],
         skip_cache=False,
+        compact=False,
     ) -> ParsedResponse:
         """
         Get single page response from World Bank API or from cache
@@ -117,23 +1156,180 @@ class Fetcher:
             query_url: the base url to be queried
             params: a dictionary of GET arguments
             skip_cache: bypass the cache
+            compact: if True, the rows are a `CompactResult`
 
         Returns: parsed version of the API response
         """
-        key = (url, tuple(sorted(params.items())))
-        if not skip_cache and key in self.cache:
-            body = self.cache[key]
-        else:
-            body = self._get_response_body(url, params)
+        key = cache_key(url, params)
+        if not skip_cache:
+            self._raise_cached_error(key)
+            body = self._get_cached_body(key, url, params)
+            if body is not None:
+                response = self._decode(body, compact)
+                if self._is_current(key, response):
+                    return response
+        body = self._get_response_body(url, params)
+        try:
+            response = self._decode(body, compact)
+        except APIError as e:
+            self._cache_error(key, e)
+            raise
+        with self._cache_lock():
             self.cache[key] = body
-        return ParsedResponse.from_response(tuple(json.loads(body)))
+        return response
+
+    def _decode(self, body: str, compact: bool = False) -> ParsedResponse:
+        """
+        Decode a page. Pages decoded into a `CompactResult` are kept for the
+        `COMPACT_PAGES` bodies decoded last, so cache hits on them aren't
+        decoded again: decoding builds a dictionary per row, which is slow,
+        and pauses other threads for garbage collection while many pages
+        are decoded at once.
+        """
+        if compact:
+            with self.lock:
+                decoded = self._compact_pages.get(body)
+            if decoded is not None:
+                return decoded
+        with self.tracer.span(
+            "json_decode", bytes=len(body), codec=self.codec.name
+        ) as span:
+            response = ParsedResponse.from_response(self.codec.decode_page(body))
+            span.attributes["rows"] = len(response.rows)
+        if compact:
+            response = response._replace(rows=CompactResult(response.rows))
+            with self.lock:
+                self._compact_pages[body] = response
+        return response
+
+    def _is_current(self, key: CacheKey, response: ParsedResponse) -> bool:
+        """Whether a cached page is from the current version of its source"""
+        if self.versions is None:
+            return True
+        source = response.source or key_source(key, default=False)
+        if self.versions.is_current(source, response.last_updated):
+            return True
+        logging.debug(f"Cached page of {key[0]} is from an old version of {source}")
+        return False
+
+    def _is_cached(self, key: CacheKey) -> bool:
+        with self._cache_lock():
+            return key in self.cache
+
+    def _is_fully_cached(self, url: str, params: dict[str, Any]) -> bool:
+        """Whether every page of an observation query is cached"""
+        with self._cache_lock():
+            body = self.cache.get(cache_key(url, params))
+        if body is None:
+            return False
+        try:
+            pages = self._decode(body, compact=True).pages
+        except (RuntimeError, ValueError):
+            return False
+        return all(
+            self._is_cached(cache_key(url, {**params, "page": page}))
+            for page in range(2, pages + 1)
+        )
+
+    def _cached_keys(self) -> list[CacheKey]:
+        """List the keys in the cache"""
+        # A shelved_cache.PersistentCache iterates over hashes of its keys,
+        # but the cache it wraps has the keys themselves
+        with self._cache_lock():
+            return list(getattr(self.cache, "wrapped", self.cache))
+
+    def _fetch_covered(
+        self,
+        url: str,
+        params: dict[str, Any],
+        compact: bool,
+    ) -> "Result | CompactResult | None":
+        """
+        Answer an observation query from a cached query that covers it, as
+        found by `planner.find_covering`
+
+        Returns:
+            the observations, or `None` if no cached query covers the query
+        """
+        found = planner.find_covering(
+            self._cached_keys(), url, params, complete=self._is_fully_cached
+        )
+        if found is None:
+            return None
+        covering_url, covering_params, query = found
+        with self.tracer.span(
+            "plan", url=url, covering_url=covering_url, covering_params=covering_params
+        ) as span:
+            try:
+                # Rows are taken from a plain result unless a compact one is
+                # wanted, so their values keep the types the API gave them
+                covering = self.fetch(
+                    url=covering_url,
+                    params={
+                        name: value
+                        for name, value in covering_params.items()
+                        if name not in ("format", "per_page")
+                    },
+                    compact=compact,
+                )
+            except DeadlineExceeded as e:
+                # Rows of part of the covering query can't be selected
+                # reliably, so none are kept
+                raise DeadlineExceeded(
+                    pages=0, total=None, partial=_finish([], None, compact)
+                ) from e
+            positions = query.select(
+                covering
+                if isinstance(covering, CompactResult)
+                else CompactResult(covering)
+            )
+            span.attributes["rows"] = None if positions is None else len(positions)
+        if positions is None:
+            return None
+        if isinstance(covering, CompactResult):
+            return CompactResult(
+                (covering[i].to_dict() for i in positions),
+                last_updated=covering.last_updated,
+            )
+        return Result(
+            (covering[i] for i in positions), last_updated=covering.last_updated
+        )
+
+    @overload
+    def fetch(
+        self,
+        url: str,
+        params: dict[str, Any] | None = None,
+        skip_cache: bool = False,
+        compact: Literal[False] = False,
+    ) -> Result: ...
+
+    @overload
+    def fetch(
+        self,
+        url: str,
+        params: dict[str, Any] | None = None,
+        skip_cache: bool = False,
+        *,
+        compact: Literal[True],
+    ) -> CompactResult: ...
+
+    @overload
+    def fetch(
+        self,
+        url: str,
+        params: dict[str, Any] | None = None,
+        skip_cache: bool = False,
+        compact: bool = False,
+    ) -> Result | CompactResult: ...
 
     def fetch(
         self,
         url: str,
         params: dict[str, Any] | None = None,
         skip_cache: bool = False,
-    ) -> Result:
+        compact: bool = False,
+    ) -> Result | CompactResult:
         """Fetch data from the World Bank API or from cache.
 
         Given the base url, keep fetching results until there are no more pages.
@@ -142,6 +1338,8 @@ class Fetcher:
             url: the base url to be queried
             params: a dictionary of GET arguments
             skip_cache: bool: use the cache
+            compact: if True, collect observation rows into a `CompactResult`
+                page by page. Only suitable for observation data.
 
         Returns:
             a list of dictionaries containing the response to the query
@@ -149,23 +1347,160 @@ class Fetcher:
         params = {**(params or {})}
         params["format"] = "json"
         params["per_page"] = PER_PAGE
+        key = cache_key(url, params)
+        if not skip_cache and not self._is_cached(key):
+            covered = self._fetch_covered(url, params, compact)
+            if covered is not None:
+                return covered
+        resume = self._load_checkpoint(key)
         page, pages = -1, -2
-        rows: list[dict[str, Any]] = []
-        while pages != page:
-            response = self._get_response(
+        rows: list[dict[str, Any]] | CompactResult = CompactResult() if compact else []
+        last_updated: str | None = None
+        with self.tracer.span("fetch", url=url, params={**params}) as span:
+            if resume:
+                span.attributes["resumed"] = resume
+            while pages != page:
+                finished = len(rows)
+                try:
+                    response = self._retried(
+                        functools.partial(
+                            self._extend_page,
+                            url=url,
+                            params=params,
+                            rows=rows,
+                            length=finished,
+                            # Pages up to the checkpoint were fetched by the
+                            # download being resumed
+                            skip_cache=skip_cache and max(page, 0) >= resume,
+                        ),
+                        url=url,
+                        params=params,
+                    )
+                except BaseException as e:
+                    # Other errors, such as those the API reports, would
+                    # recur when the download is resumed
+                    if isinstance(e, KeyboardInterrupt) or (
+                        isinstance(e, Exception) and self.retry.retriable(e)
+                    ):
+                        self._save_checkpoint(key, max(page, 0))
+                    current = _deadline.get()
+                    if (
+                        not isinstance(e, requests.Timeout | requests.ConnectionError)
+                        or current is None
+                        or current.remaining() > 0
+                    ):
+                        raise
+                    span.attributes.update(pages=max(page, 0), deadline_exceeded=True)
+                    _truncate(rows, finished)
+                    if isinstance(rows, list):
+                        for row in rows:
+                            _strip_id(row)
+                    raise DeadlineExceeded(
+                        pages=max(page, 0),
+                        total=None if pages < 0 else pages,
+                        partial=_finish(rows, last_updated, compact),
+                    ) from e
+                page, pages = response.page, response.pages
+                last_updated = response.last_updated
+                logging.debug(f"Processed page {page} of {pages}")
+                params["page"] = page + 1
+            if resume:
+                self._clear_checkpoint(key)
+            if isinstance(rows, list):
+                with self.tracer.span("postprocess", rows=len(rows)):
+                    for row in rows:
+                        _strip_id(row)
+            span.attributes.update(pages=pages, rows=len(rows))
+        return _finish(rows, last_updated, compact)
+
+    def _extend_page(
+        self,
+        url: str,
+        params: dict[str, Any],
+        rows: list[dict[str, Any]] | CompactResult,
+        length: int,
+        skip_cache: bool,
+    ) -> ParsedResponse:
+        """
+        Get a page and add its rows to the rows of the pages before it
+
+        Parameters:
+            url: the base url to be queried
+            params: a dictionary of GET arguments
+            rows: the rows of the query
+            length: the number of rows of the pages before this one. Rows
+                after them, from an earlier attempt at the page, are dropped.
+            skip_cache: bypass the cache
+
+        Returns: parsed version of the API response
+        """
+        _truncate(rows, length)
+        if self.stream:
+            response, page_rows = self._get_streamed_response(
                 url=url,
                 params=params,
                 skip_cache=skip_cache,
             )
+            rows.extend(page_rows)
+            return response
+        response = self._get_response(
+            url=url,
+            params=params,
+            skip_cache=skip_cache,
+            compact=isinstance(rows, CompactResult),
+        )
+        if isinstance(rows, CompactResult):
             rows.extend(response.rows)
+        else:
+            # Pages are only decoded compactly for compact rows
+            rows.extend(cast(list[dict[str, Any]], response.rows))
+        return response
+
+    def iter_rows(
+        self,
+        url: str,
+        params: dict[str, Any] | None = None,
+        skip_cache: bool = False,
+        store: bool = False,
+    ) -> Iterator[dict[str, Any]]:
+        """Stream rows from the World Bank API or from cache.
+
+        Pages are requested one at a time and decoded incrementally as rows
+        are consumed, so neither a whole page nor the whole result needs to
+        be held in memory. Pages that are cached are read from the cache, but
+        pages that are downloaded are only cached with `store`.
+
+        Parameters:
+            url: the base url to be queried
+            params: a dictionary of GET arguments
+            skip_cache: bool: use the cache
+            store: if True, keep the text of each downloaded page while its
+                rows are decoded, and cache it once they have all been
+                consumed. This holds a page's text in memory, as `fetch`
+                does with `stream`.
+
+        Returns:
+            an iterator over dictionaries containing the response to the query
+        """
+        params = {**(params or {})}
+        params["format"] = "json"
+        params["per_page"] = PER_PAGE
+        page, pages = -1, -2
+        while pages != page:
+            response, rows = self._retried(
+                functools.partial(
+                    self._get_streamed_response,
+                    url=url,
+                    params=params,
+                    skip_cache=skip_cache,
+                    store=store,
+                ),
+                url=url,
+                params=params,
+            )
+            for row in rows:
+                _strip_id(row)
+                yield row
             page, pages = response.page, response.pages
             logging.debug(f"Processed page {page} of {pages}")
             params["page"] = page + 1
-        for row in rows:
-            _strip_id(row)
-        last_updated = (
-            None
-            if not response.last_updated
-            else dt.datetime.strptime(response.last_updated, "%Y-%m-%d")
-        )
-        return Result(rows, last_updated=last_updated)
@@ -0,0 +1,175 @@
+"""
+wbdata.metadata: in-memory tables of countries and other API metadata
+
+The lists of countries, income levels, lending types, sources and topics are
+small and rarely change, so rather than making a request (or reading and
+decoding a cached response) for every lookup, a `Metadata` object loads each
+list once into a `Table` indexed by the ways it is looked up, and answers
+queries from memory until its TTL expires.
+"""
+
+import dataclasses
+import datetime as dt
+import threading
+from collections.abc import Callable, Iterable, Mapping
+from typing import Any
+
+Row = dict[str, Any]
+KeyFunction = Callable[[Row], Iterable[Any]]
+
+
+def _codes(field: str) -> KeyFunction:
+    """Index a nested field, such as a country's region, by id and iso2 code"""
+
+    def get(row: Row) -> Iterable[Any]:
+        value = row.get(field) or {}
+        return (value.get("id"), value.get("iso2code"))
+
+    return get
+
+
+def _normalize(value: Any) -> str:
+    return str(value).strip().upper()
+
+
+#: For each table, the indexes to build and the values to index each row by.
+#: Lookups are case-insensitive.
+INDEXES: dict[str, dict[str, KeyFunction]] = {
+    "countries": {
+        "id": lambda row: (row.get("id"), row.get("iso2Code")),
+        "region": _codes("region"),
+        "adminregion": _codes("adminregion"),
+        "incomeLevel": _codes("incomeLevel"),
+        "lendingType": _codes("lendingType"),
+    },
+    "incomelevels": {"id": lambda row: (row.get("id"), row.get("iso2code"))},
+    "lendingtypes": {"id": lambda row: (row.get("id"), row.get("iso2code"))},
+    "sources": {"id": lambda row: (row.get("id"),)},
+    "topics": {"id": lambda row: (row.get("id"),)},
+}
+
+
+class Table:
+    """
+    Rows of metadata with indexes for looking them up.
+
+    Parameters:
+        rows: the rows, in the order the API returns them
+        indexes: for each index, a function returning the values to index a
+            row by
+    """
+
+    def __init__(self, rows: Iterable[Row], indexes: Mapping[str, KeyFunction]):
+        self.rows = list(rows)
+        self._indexes: dict[str, dict[str, list[int]]] = {}
+        for name, key in indexes.items():
+            index: dict[str, list[int]] = {}
+            for position, row in enumerate(self.rows):
+                for value in {_normalize(i) for i in key(row) if i}:
+                    index.setdefault(value, []).append(position)
+            self._indexes[name] = index
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def positions(self, index: str, values: Iterable[Any]) -> set[int] | None:
+        """
+        Find the positions of rows matching any of the values in an index
+
+        Parameters:
+            index: the name of the index
+            values: the values to look up
+
+        Returns:
+            the positions of the matching rows, or `None` if any of the values
+                is not in the index
+        """
+        lookup = self._indexes[index]
+        positions: set[int] = set()
+        for value in values:
+            try:
+                positions.update(lookup[_normalize(value)])
+            except KeyError:
+                return None
+        return positions
+
+    def find(self, **filters: Iterable[Any]) -> list[Row] | None:
+        """
+        Find rows matching all the filters.
+
+        Parameters:
+            **filters: for each index, the values to look up; a row matches a
+                filter if it matches any of its values
+
+        Returns:
+            copies of the matching rows in table order, or `None` if any filter
+                value is not in its index
+        """
+        selected: set[int] | None = None
+        for index, values in filters.items():
+            positions = self.positions(index, values)
+            if positions is None:
+                return None
+            selected = positions if selected is None else selected & positions
+        if selected is None:
+            return [dict(row) for row in self.rows]
+        return [dict(self.rows[i]) for i in sorted(selected)]
+
+
+@dataclasses.dataclass
+class _Loaded:
+    table: Table
+    loaded: dt.datetime
+
+
+class Metadata:
+    """
+    Metadata tables that are loaded on first use and reloaded after a TTL.
+
+    Tables are loaded and cleared under a lock, so threads that need a table at
+    the same time load it once, and a table being loaded while the tables are
+    cleared isn't kept.
+
+    Parameters:
+        load: a function that takes a table name from `INDEXES` and whether
+            to bypass the cache, and returns the rows for that table
+        ttl: how long to keep a table before reloading it
+        timer: a function returning the current time
+    """
+
+    def __init__(
+        self,
+        load: Callable[[str, bool], Iterable[Row]],
+        ttl: dt.timedelta = dt.timedelta(days=1),
+        timer: Callable[[], dt.datetime] = dt.datetime.now,
+    ):
+        self.load = load
+        self.ttl = ttl
+        self.timer = timer
+        self._tables: dict[str, _Loaded] = {}
+        self._lock = threading.Lock()
+
+    def table(self, name: str, skip_cache: bool = False) -> Table:
+        """
+        Get a table, loading it if it isn't loaded, has expired or
+        `skip_cache` is True
+
+        Parameters:
+            name: the name of the table, one of the keys of `INDEXES`
+            skip_cache: reload the table, bypassing the cache
+
+        Returns:
+            the table
+        """
+        with self._lock:
+            now = self.timer()
+            loaded = self._tables.get(name)
+            if loaded is None or skip_cache or now - loaded.loaded > self.ttl:
+                table = Table(self.load(name, skip_cache), INDEXES[name])
+                loaded = self._tables[name] = _Loaded(table=table, loaded=now)
+            return loaded.table
+
+    def clear(self) -> None:
+        """Drop all loaded tables so they are reloaded on next use"""
+        with self._lock:
+            self._tables.clear()
@@ -0,0 +1,208 @@
+"""
+wbdata.planner: answer observation queries from cached broader queries
+
+An observation query is cached under its exact url and parameters, so
+without planning, asking for a few countries or a narrower date range after
+fetching every country goes back to the API. Before fetching a query whose
+first page isn't cached, the fetcher asks the planner for a cached query
+that covers it: one for the same indicator and source, with every country
+(or a superset of the countries) and no date restriction (or a wider one in
+the same frequency), and with every page cached. If there is one, the
+observations are taken from it and filtered locally.
+
+Rows are returned in the order of the broader query, which is the API's
+order of countries with the latest date first.
+"""
+
+import dataclasses
+import re
+from collections.abc import Callable, Iterable
+from typing import Any
+
+OBSERVATIONS_PATTERN = re.compile(
+    r"^(?P<base>.+)/countries/(?P<country>[^/]+)/indicators/(?P<indicator>[^/]+)$"
+)
+DATE_PATTERN = re.compile(r"^(?P<year>\d{4})(?:(?P<kind>[MQ])(?P<sub>\d{1,2}))?$")
+
+#: Key of a date for ordering: its kind ("Y", "M" or "Q"), year and month or
+#: quarter
+DateKey = tuple[str, int, int]
+
+
+def _date_key(date: Any) -> DateKey | None:
+    match = DATE_PATTERN.match(date) if isinstance(date, str) else None
+    if match is None:
+        return None
+    return (match["kind"] or "Y", int(match["year"]), int(match["sub"] or 0))
+
+
+def _date_bounds(date: Any) -> tuple[DateKey, DateKey] | None:
+    """Parse a date parameter into first and last date keys"""
+    parts = str(date).split(":")
+    if len(parts) > 2:
+        return None
+    keys = [key for i in parts if (key := _date_key(i)) is not None]
+    if len(keys) != len(parts) or keys[0][0] != keys[-1][0]:
+        return None
+    return min(keys), max(keys)
+
+
+@dataclasses.dataclass(frozen=True)
+class Query:
+    """
+    An observation query, parsed from its url and parameters.
+
+    Parameters:
+        base: the url up to the countries part
+        countries: the uppercased country codes, or `None` for all countries
+        indicator: the indicator code
+        dates: the first and last date keys, or `None` for all dates
+        params: the remaining parameters
+    """
+
+    base: str
+    countries: frozenset[str] | None
+    indicator: str
+    dates: tuple[DateKey, DateKey] | None
+    params: frozenset[tuple[str, str]]
+
+    @classmethod
+    def parse(cls, url: str, params: Iterable[tuple[str, Any]]) -> "Query | None":
+        """
+        Parse an observation query
+
+        Parameters:
+            url: the query url
+            params: the query parameters
+
+        Returns:
+            the query, or `None` if it isn't an observation query the planner
+                understands
+        """
+        match = OBSERVATIONS_PATTERN.match(url)
+        if match is None:
+            return None
+        codes = frozenset(i.strip().upper() for i in match["country"].split(";"))
+        other = {}
+        dates = None
+        for name, value in params:
+            if name == "date":
+                dates = _date_bounds(value)
+                if dates is None:
+                    return None
+            else:
+                other[name] = str(value)
+        return cls(
+            base=match["base"],
+            countries=None if "ALL" in codes else codes,
+            indicator=match["indicator"],
+            dates=dates,
+            params=frozenset(other.items()),
+        )
+
+    def covers(self, other: "Query") -> bool:
+        """Whether this query's observations include all of `other`'s"""
+        return (
+            self.base == other.base
+            and self.indicator.upper() == other.indicator.upper()
+            and self.params == other.params
+            and (
+                self.countries is None
+                or (other.countries is not None and other.countries <= self.countries)
+            )
+            and (
+                self.dates is None
+                or (
+                    other.dates is not None
+                    and self.dates[0][0] == other.dates[0][0]
+                    and self.dates[0] <= other.dates[0]
+                    and other.dates[1] <= self.dates[1]
+                )
+            )
+        )
+
+    def select(self, result: Any) -> list[int] | None:
+        """
+        Select this query's observations from the result of a query covering
+        it.
+
+        Countries and dates are dictionary-encoded in a
+        `fetcher.CompactResult`, so each distinct country and date is checked
+        once.
+
+        Parameters:
+            result: the `fetcher.CompactResult` of the covering query
+
+        Returns:
+            the positions of the selected observations, or `None` if they
+                can't be selected reliably, because a date is in another
+                frequency or one of the countries has no observations
+        """
+        country_codes = date_codes = None
+        if self.countries is not None:
+            ids, country_codes = result.encoded("country.id")
+            iso3s, _ = result.encoded("countryiso3code")
+            countries = set()
+            matched: set[str] = set()
+            for code, (country_id, iso3) in enumerate(zip(ids, iso3s, strict=True)):
+                found = {str(country_id).upper(), str(iso3 or "").upper()}
+                if found & self.countries:
+                    countries.add(code)
+                    matched |= found & self.countries
+            if matched != self.countries:
+                return None
+        if self.dates is not None:
+            values, date_codes = result.encoded("date")
+            dates = set()
+            for code, date in enumerate(values):
+                key = _date_key(date)
+                if key is None or key[0] != self.dates[0][0]:
+                    return None
+                if self.dates[0] <= key <= self.dates[1]:
+                    dates.add(code)
+        return [
+            i
+            for i in range(len(result))
+            if (country_codes is None or country_codes[i] in countries)
+            and (date_codes is None or date_codes[i] in dates)
+        ]
+
+
+def find_covering(
+    keys: Iterable[tuple[str, Iterable[tuple[str, Any]]]],
+    url: str,
+    params: dict[str, Any],
+    complete: Callable[[str, dict[str, Any]], bool] | None = None,
+) -> tuple[str, dict[str, Any], Query] | None:
+    """
+    Find a cached query that covers an observation query
+
+    Parameters:
+        keys: the cache keys, as (url, params) pairs
+        url: the url of the query
+        params: the parameters of the query, including `format` and
+            `per_page`, but not `page`
+        complete: a function that takes the url and parameters of a cached
+            query and returns whether all of its pages are cached. Queries
+            for which it returns False are skipped, since answering from
+            them would request their missing pages.
+
+    Returns:
+        the url and parameters of the covering query, and the parsed query
+            to select rows with; or `None` if no cached query covers it
+    """
+    query = Query.parse(url, params.items())
+    if query is None:
+        return None
+    for cached_url, cached_params in keys:
+        cached_params = dict(cached_params)
+        if "page" in cached_params or (cached_url, cached_params) == (url, params):
+            continue
+        cached = Query.parse(cached_url, cached_params.items())
+        if (
+            cached is not None
+            and cached.covers(query)
+            and (complete is None or complete(cached_url, cached_params))
+        ):
+            return cached_url, cached_params, query
+    return None
@@ -0,0 +1,362 @@
+"""
+wbdata.search: a local full-text index of the indicator catalog
+
+The index is an inverted index from tokens to the indicators whose id, name,
+topics or source note contain them. It is built from a copy of the catalog,
+saved next to the cache, and updated incrementally: when the catalog is
+synced again only the indicators that were added, removed or changed are
+re-indexed.
+
+Queries are strings of keywords, all of which must match. A keyword ending
+in `*` matches any token starting with it. Results are ranked by a TF-IDF
+score in which matches in the id and name count for more than matches in the
+topics, which count for more than matches in the source note. Compiled
+regular expressions are matched against the indexed text instead, and
+ranked by the fields they match.
+"""
+
+import bisect
+import collections
+import datetime as dt
+import hashlib
+import json
+import logging
+import math
+import os
+import pickle
+import re
+from array import array
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+log = logging.getLogger(__name__)
+
+#: Version of the saved index format. Saved indexes with a different version
+#: are discarded and rebuilt.
+VERSION = 1
+
+#: The weight given to a token for each field it occurs in
+FIELD_WEIGHTS = {"id": 3.0, "name": 3.0, "topics": 1.5, "sourceNote": 1.0}
+
+#: The fraction of indicator numbers that may be left by removed indicators
+#: before the indicators are renumbered
+MAX_REMOVED_FRACTION = 0.5
+
+TOKEN_PATTERN = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Split text into lowercase alphanumeric tokens"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def _fields(row: dict[str, Any]) -> dict[str, str]:
+    """Extract the indexed text of an indicator"""
+    return {
+        "id": row.get("id") or "",
+        "name": row.get("name") or "",
+        "topics": " ".join(
+            (topic.get("value") or "") for topic in row.get("topics") or ()
+        ),
+        "sourceNote": row.get("sourceNote") or "",
+    }
+
+
+def _counts(row: dict[str, Any]) -> dict[str, float]:
+    """Count the tokens of an indicator, weighted by field"""
+    counts: dict[str, float] = {}
+    for field, text in _fields(row).items():
+        weight = FIELD_WEIGHTS[field]
+        for token, count in collections.Counter(tokenize(text)).items():
+            counts[token] = counts.get(token, 0.0) + weight * count
+    return counts
+
+
+def _fingerprint(row: dict[str, Any]) -> str:
+    return hashlib.blake2b(
+        json.dumps(row, sort_keys=True).encode(), digest_size=16
+    ).hexdigest()
+
+
+def index_path(cache_path: str | Path) -> Path:
+    """
+    Get the path of the search index stored next to a cache
+
+    Parameters:
+        cache_path: the path of the cache
+
+    Returns:
+        the path of the index file
+    """
+    cache_path = Path(cache_path)
+    return cache_path.with_name(f"{cache_path.name}-search-index.pickle")
+
+
+class SearchIndex:
+    """
+    An inverted index over indicator metadata.
+
+    Each indexed indicator is given a number. For each token, the index keeps
+    an array of the numbers of the indicators containing it and a parallel
+    array of the weight of the token in each of them. While the index is
+    being updated these are kept in a dictionary of arrays; when it is saved
+    they are packed into a sorted vocabulary and three flat arrays, which are
+    quick to load and are searched in place until the next update. The
+    numbers of removed indicators aren't reused, so once more than
+    `MAX_REMOVED_FRACTION` of the numbers are unused the indicators are
+    renumbered.
+
+    Parameters:
+        rows: indicators in the format returned by the API
+    """
+
+    def __init__(self, rows: Iterable[dict[str, Any]] = ()):
+        self.version = VERSION
+        self.synced: dt.datetime | None = None
+        self.documents: dict[str, dict[str, Any]] = {}
+        self._numbers: dict[str, int] = {}
+        self._ids: list[str | None] = []
+        self._fingerprints: dict[str, str] = {}
+        self._postings: dict[str, tuple[array, array]] | None = {}
+        self._vocabulary: list[str] = []
+        self._offsets = array("I", [0])
+        self._posting_numbers = array("I")
+        self._posting_weights = array("f")
+        self.update(rows)
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def _pack(self) -> None:
+        """Pack the postings into flat arrays"""
+        if self._postings is None:
+            return
+        self._vocabulary = sorted(self._postings)
+        self._offsets = array("I", [0])
+        self._posting_numbers = array("I")
+        self._posting_weights = array("f")
+        for token in self._vocabulary:
+            numbers, weights = self._postings[token]
+            self._posting_numbers.extend(numbers)
+            self._posting_weights.extend(weights)
+            self._offsets.append(len(self._posting_numbers))
+        self._postings = None
+
+    def _unpack(self) -> dict[str, tuple[array, array]]:
+        """Unpack the postings into a dictionary of arrays so they can change"""
+        if self._postings is None:
+            numbers, weights = self._posting_numbers, self._posting_weights
+            self._postings = {
+                token: (numbers[start:end], weights[start:end])
+                for token, start, end in zip(
+                    self._vocabulary, self._offsets, self._offsets[1:], strict=False
+                )
+            }
+            self._vocabulary = []
+            self._offsets = array("I", [0])
+            self._posting_numbers = array("I")
+            self._posting_weights = array("f")
+        return self._postings
+
+    def _add(self, row: dict[str, Any], fingerprint: str) -> None:
+        postings = self._unpack()
+        indicator_id = row["id"]
+        number = len(self._ids)
+        for token, count in _counts(row).items():
+            token_postings = postings.get(token)
+            if token_postings is None:
+                token_postings = postings[token] = (array("I"), array("f"))
+            token_postings[0].append(number)
+            token_postings[1].append(1 + math.log(count))
+        self.documents[indicator_id] = row
+        self._numbers[indicator_id] = number
+        self._ids.append(indicator_id)
+        self._fingerprints[indicator_id] = fingerprint
+
+    def _remove(self, indicator_id: str) -> None:
+        postings = self._unpack()
+        number = self._numbers.pop(indicator_id)
+        for token in _counts(self.documents[indicator_id]):
+            numbers, weights = postings[token]
+            if len(numbers) == 1:
+                del postings[token]
+                continue
+            position = numbers.index(number)
+            del numbers[position]
+            del weights[position]
+        self._ids[number] = None
+        del self.documents[indicator_id]
+        del self._fingerprints[indicator_id]
+
+    def _renumber(self) -> None:
+        """Number the indicators consecutively, dropping removed numbers"""
+        postings = self._unpack()
+        ids = [i for i in self._ids if i is not None]
+        renumbered = array("I", [0]) * len(self._ids)
+        for number, indicator_id in enumerate(ids):
+            renumbered[self._numbers[indicator_id]] = number
+        # Numbers are renumbered in order, so postings stay sorted
+        for numbers, _ in postings.values():
+            for position, number in enumerate(numbers):
+                numbers[position] = renumbered[number]
+        self._ids[:] = ids
+        self._numbers = {indicator_id: i for i, indicator_id in enumerate(ids)}
+
+    def update(self, rows: Iterable[dict[str, Any]]) -> int:
+        """
+        Bring the index in line with a full copy of the catalog.
+
+        Indicators that are unchanged since the last update are left alone.
+
+        Parameters:
+            rows: every indicator in the catalog
+
+        Returns:
+            the number of indicators added, changed or removed
+        """
+        seen = set()
+        changes = 0
+        for row in rows:
+            indicator_id = row["id"]
+            seen.add(indicator_id)
+            fingerprint = _fingerprint(row)
+            if self._fingerprints.get(indicator_id) == fingerprint:
+                continue
+            if indicator_id in self.documents:
+                self._remove(indicator_id)
+            self._add(row, fingerprint)
+            changes += 1
+        for indicator_id in self.documents.keys() - seen:
+            self._remove(indicator_id)
+            changes += 1
+        if len(self._ids) - len(self) > len(self._ids) * MAX_REMOVED_FRACTION:
+            self._renumber()
+        self._pack()
+        self.synced = dt.datetime.now()
+        return changes
+
+    def _expand(self, keyword: str) -> range:
+        """
+        Get the positions in the vocabulary of the tokens matching a keyword,
+        which may be a prefix
+        """
+        self._pack()
+        if keyword.endswith("*"):
+            prefix = keyword[:-1]
+            end_key = prefix + "\U0010ffff"
+        else:
+            prefix = end_key = keyword
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = bisect.bisect_right(self._vocabulary, end_key)
+        return range(start, end)
+
+    def _search_keywords(self, query: str) -> list[tuple[float, str]]:
+        keywords = [
+            f"{token}*" if keyword.endswith("*") else token
+            for keyword in query.lower().split()
+            for token in tokenize(keyword)
+        ]
+        if not keywords:
+            return []
+        scores: dict[int, float] | None = None
+        for keyword in keywords:
+            matches: dict[int, float] = {}
+            for position in self._expand(keyword):
+                start, end = self._offsets[position], self._offsets[position + 1]
+                idf = math.log(1 + len(self.documents) / (end - start))
+                for number, weight in zip(
+                    self._posting_numbers[start:end],
+                    self._posting_weights[start:end],
+                    strict=True,
+                ):
+                    if weight * idf > matches.get(number, 0.0):
+                        matches[number] = weight * idf
+            if scores is None:
+                scores = matches
+            else:
+                scores = {
+                    number: score + matches[number]
+                    for number, score in scores.items()
+                    if number in matches
+                }
+            if not scores:
+                return []
+        assert scores is not None
+        # Removed indicators have no postings, so no numbers are skipped here
+        return [
+            (score, indicator_id)
+            for number, score in scores.items()
+            if (indicator_id := self._ids[number]) is not None
+        ]
+
+    def _search_pattern(self, pattern: re.Pattern) -> list[tuple[float, str]]:
+        results = []
+        for indicator_id, row in self.documents.items():
+            score = sum(
+                FIELD_WEIGHTS[field]
+                for field, text in _fields(row).items()
+                if pattern.search(text)
+            )
+            if score:
+                results.append((score, indicator_id))
+        return results
+
+    def search(
+        self, query: str | re.Pattern, limit: int | None = None
+    ) -> list[dict[str, Any]]:
+        """
+        Find indicators matching a query.
+
+        Parameters:
+            query: keywords, all of which must match, with a trailing `*` for
+                prefix matches; or a compiled regular expression
+            limit: the maximum number of results to return
+
+        Returns:
+            the matching indicators, best match first
+        """
+        if isinstance(query, re.Pattern):
+            results = self._search_pattern(query)
+        else:
+            results = self._search_keywords(query)
+        results.sort(key=lambda result: (-result[0], result[1]))
+        return [self.documents[indicator_id] for _, indicator_id in results[:limit]]
+
+    def save(self, path: str | Path) -> None:
+        """
+        Save the index, replacing the file atomically
+
+        Parameters:
+            path: the path to save to
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        self._pack()
+        with temp_path.open("wb") as outf:
+            pickle.dump(self, outf, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "SearchIndex | None":
+        """
+        Load a saved index
+
+        Parameters:
+            path: the path of the saved index
+
+        Returns:
+            the index, or `None` if there is no usable index at `path`
+        """
+        try:
+            with Path(path).open("rb") as inf:
+                index = pickle.load(inf)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            log.warning(f"Couldn't load search index at {path}, rebuilding")
+            return None
+        if not isinstance(index, cls) or index.version != VERSION:
+            return None
+        return index
@@ -0,0 +1,743 @@
+"""
+wbdata.store: local stores of observations
+
+Two kinds of store can sit behind `Client(store=...)` and answer yearly
+observation queries locally.
+
+A `DataStore` is loaded from the World Bank's bulk downloads. Each source is
+published as a bulk CSV archive, such as
+https://databank.worldbank.org/data/download/WDI_CSV.zip for World
+Development Indicators, and single indicators can be downloaded in the same
+format from the data catalog. Each ingested archive becomes a dataset with
+its own list of countries and years. Each indicator in it is stored as a
+dense array of doubles, one per country and year, with NaN for missing
+values, so an indicator can be read back in a single call without parsing.
+Queries for indicators it doesn't hold go to the API.
+
+The bulk files don't carry everything the API returns: `unit` and
+`obs_status` are empty and `decimal` is 0 for observations in a `DataStore`.
+Countries are identified by their ISO3 codes, plus their ISO2 codes if the
+archive includes a country table such as `WDICountry.csv`; otherwise the ISO3
+code is used as the id too.
+
+A `SQLiteStore` is filled from the API as queries are made. It keeps
+observations in an indexed SQLite table along with a record of which
+indicator, source, countries and years have been fetched, so later queries
+for the same or a smaller set of countries and years are answered with SQL,
+and queries that are only partly covered fetch just the missing countries.
+"""
+
+import csv
+import dataclasses
+import datetime as dt
+import io
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import zipfile
+from array import array
+from collections.abc import Callable, Iterator, Sequence
+from pathlib import Path
+from typing import IO, Any
+
+from . import fetcher
+
+#: Version of the manifest format
+VERSION = 1
+MANIFEST = "manifest.json"
+
+YEAR_PATTERN = re.compile(r"^\d{4}$")
+DATE_PATTERN = re.compile(r"^(\d{4})(?::(\d{4}))?$")
+
+
+@dataclasses.dataclass
+class Dataset:
+    """
+    The countries, years and indicators of one ingested archive.
+
+    Parameters:
+        name: the directory name of the dataset within the store
+        source: the source id, if known
+        last_updated: the date the data was last updated, if known
+        countries: for each country, its id, name and ISO3 code
+        dates: the years, latest first
+        indicators: indicator names by indicator code
+    """
+
+    name: str
+    source: str | None
+    last_updated: str | None
+    countries: list[tuple[str, str, str]]
+    dates: list[str]
+    indicators: dict[str, str]
+
+    def positions(self, country: str | Sequence[str]) -> list[int] | None:
+        """
+        Get the positions of countries in the dataset
+
+        Parameters:
+            country: "all", or one or more ISO2 or ISO3 codes
+
+        Returns:
+            the positions in dataset order, or `None` if any country isn't in
+                the dataset
+        """
+        if isinstance(country, str):
+            if country.lower() == "all":
+                return list(range(len(self.countries)))
+            country = country.split(";")
+        lookup: dict[str, int] = {}
+        for position, (country_id, _, iso3) in enumerate(self.countries):
+            lookup[country_id.upper()] = lookup[iso3.upper()] = position
+        positions = set()
+        for code in country:
+            try:
+                positions.add(lookup[str(code).strip().upper()])
+            except KeyError:
+                return None
+        return sorted(positions)
+
+
+def _slug(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9.]+", "_", value).strip("_")
+
+
+def _open_tables(archive: str | Path | IO[bytes]) -> Iterator[IO[str]]:
+    """Yield a text stream for each CSV file in a ZIP archive, or a CSV file"""
+    if zipfile.is_zipfile(archive):
+        with zipfile.ZipFile(archive) as zf:
+            for name in zf.namelist():
+                if name.lower().endswith(".csv"):
+                    with zf.open(name) as raw:
+                        yield io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+    elif isinstance(archive, (str, Path)):
+        with open(archive, encoding="utf-8-sig", newline="") as inf:
+            yield inf
+    else:
+        archive.seek(0)
+        yield io.TextIOWrapper(archive, encoding="utf-8-sig", newline="")
+
+
+def _read_header(reader: Iterator[list[str]]) -> tuple[list[str], dict[str, str]]:
+    """
+    Skip any preamble, such as "Last Updated Date" lines in data catalog
+    downloads, and return the header and the preamble values
+    """
+    preamble = {}
+    for line in reader:
+        if line and line[0] in ("Country Name", "Country Code"):
+            return line, preamble
+        if len(line) >= 2 and line[0]:
+            preamble[line[0]] = line[1]
+    return [], preamble
+
+
+class DataStore:
+    """
+    A directory of observations ingested from bulk downloads.
+
+    Parameters:
+        path: the directory of the store, which is created when an archive is
+            first ingested
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.datasets: dict[str, Dataset] = {}
+        self._indicators: dict[tuple[str, str | None], Dataset] = {}
+        manifest = self.path / MANIFEST
+        if manifest.exists():
+            with manifest.open() as inf:
+                contents = json.load(inf)
+            if contents.get("version") == VERSION:
+                for dataset in contents["datasets"]:
+                    fields = dict(dataset)
+                    fields["countries"] = [tuple(i) for i in dataset["countries"]]
+                    self._register(Dataset(**fields))
+
+    def _register(self, dataset: Dataset) -> None:
+        self.datasets[dataset.name] = dataset
+        for indicator in dataset.indicators:
+            self._indicators[(indicator, dataset.source)] = dataset
+            self._indicators[(indicator, None)] = dataset
+
+    def _save_manifest(self) -> None:
+        path = self.path / MANIFEST
+        temp_path = path.with_name(f"{MANIFEST}.{os.getpid()}.tmp")
+        with temp_path.open("w") as outf:
+            json.dump(
+                {
+                    "version": VERSION,
+                    "datasets": [dataclasses.asdict(i) for i in self.datasets.values()],
+                },
+                outf,
+            )
+        os.replace(temp_path, path)
+
+    def ingest(
+        self,
+        archive: str | Path | IO[bytes],
+        source: int | str | None = None,
+        last_updated: str | dt.date | None = None,
+        name: str | None = None,
+    ) -> Dataset:
+        """
+        Load a bulk CSV download into the store.
+
+        The archive can be a ZIP file, as published, or a single CSV file. The
+        data table is the CSV file with "Country Code", "Indicator Code" and
+        year columns; a country table with "Country Code" and "2-alpha code"
+        columns is used for ISO2 codes if present. Other files are ignored.
+        Ingesting an archive under the name of an existing dataset replaces
+        it.
+
+        Parameters:
+            archive: the path of the archive, or a binary file object
+            source: the id of the source the archive is for. If given, the
+                data is only used for queries for that source or with no
+                source.
+            last_updated: the date the data was last updated. Defaults to the
+                "Last Updated Date" in the file, if any.
+            name: the name of the dataset. Defaults to one based on the source
+                or the name of the archive.
+
+        Returns:
+            the ingested dataset
+        """
+        iso2: dict[str, str] = {}
+        data: dict[str, tuple[str, dict[int, array]]] = {}
+        countries: dict[str, tuple[str, int]] = {}
+        years: list[str] = []
+        preamble: dict[str, str] = {}
+        for table in _open_tables(archive):
+            reader = csv.reader(table)
+            header, table_preamble = _read_header(reader)
+            columns = {column: i for i, column in enumerate(header)}
+            if "Indicator Code" not in columns:
+                if "2-alpha code" in columns:
+                    code_column = columns["Country Code"]
+                    iso2_column = columns["2-alpha code"]
+                    for row in reader:
+                        if len(row) > max(code_column, iso2_column):
+                            iso2[row[code_column]] = row[iso2_column]
+                continue
+            preamble.update(table_preamble)
+            year_columns = sorted(
+                (
+                    (column, i)
+                    for column, i in columns.items()
+                    if YEAR_PATTERN.match(column)
+                ),
+                reverse=True,
+            )
+            if years and years != [column for column, _ in year_columns]:
+                raise ValueError("Data tables in archive have different years")
+            years = [column for column, _ in year_columns]
+            name_column = columns["Country Name"]
+            code_column = columns["Country Code"]
+            indicator_column = columns["Indicator Code"]
+            indicator_name_column = columns["Indicator Name"]
+            for row in reader:
+                if len(row) < len(header):
+                    continue
+                code = row[code_column]
+                if code not in countries:
+                    countries[code] = (row[name_column], len(countries))
+                indicator = row[indicator_column]
+                if indicator not in data:
+                    data[indicator] = (row[indicator_name_column], {})
+                data[indicator][1][countries[code][1]] = array(
+                    "d",
+                    (float(row[i]) if row[i] else math.nan for _, i in year_columns),
+                )
+        if not data:
+            raise ValueError("No data table found in archive")
+        if isinstance(last_updated, dt.date):
+            last_updated = last_updated.strftime("%Y-%m-%d")
+        if name is None:
+            name = (
+                f"source-{source}"
+                if source is not None
+                else Path(str(getattr(archive, "name", archive))).stem
+            )
+        dataset = Dataset(
+            name=_slug(name),
+            source=None if source is None else str(source),
+            last_updated=last_updated or preamble.get("Last Updated Date") or None,
+            countries=[
+                (iso2.get(code) or code, country_name, code)
+                for code, (country_name, _) in countries.items()
+            ],
+            dates=years,
+            indicators={code: name for code, (name, _) in data.items()},
+        )
+        directory = self.path / dataset.name
+        directory.mkdir(parents=True, exist_ok=True)
+        for old in directory.glob("*.f64"):
+            old.unlink()
+        missing = array("d", [math.nan]) * len(years)
+        for indicator, (_, rows) in data.items():
+            column = array("d")
+            for position in range(len(countries)):
+                column.extend(rows.get(position, missing))
+            with (directory / f"{_slug(indicator)}.f64").open("wb") as outf:
+                column.tofile(outf)
+        old_dataset = self.datasets.pop(dataset.name, None)
+        if old_dataset is not None:
+            self._indicators = {
+                key: value
+                for key, value in self._indicators.items()
+                if value is not old_dataset
+            }
+        self._register(dataset)
+        self._save_manifest()
+        return dataset
+
+    def find(self, indicator: str, source: int | str | None = None) -> Dataset | None:
+        """
+        Find the dataset holding an indicator
+
+        Parameters:
+            indicator: the indicator code
+            source: the source id, if the indicator must come from a
+                particular source
+
+        Returns:
+            the dataset, or `None` if no dataset holds the indicator
+        """
+        return self._indicators.get(
+            (indicator, None if source is None else str(source))
+        )
+
+    def query(
+        self,
+        indicator: str,
+        country: str | Sequence[str] = "all",
+        date: str | None = None,
+        source: int | str | None = None,
+        compact: bool = False,
+    ) -> fetcher.Result | fetcher.CompactResult | None:
+        """
+        Answer an observation query from the store.
+
+        Rows are returned in the same format and order as the API returns
+        them: by country in the order of the archive, latest year first, with
+        a `None` value where an observation is missing.
+
+        Parameters:
+            indicator: the indicator code
+            country: "all", or a country code or ;-separated string or sequence
+                of them, as for `Client.get_data`
+            date: a year or a range of years in the API format, "YYYY" or
+                "YYYY:YYYY"
+            source: the source id, if any
+            compact: if True, return a `fetcher.CompactResult`
+
+        Returns:
+            the observations, or `None` if the store can't answer the query,
+                such as when it doesn't hold the indicator or one of the
+                countries, or the dates aren't all years it holds
+        """
+        dataset = self.find(indicator, source)
+        if dataset is None:
+            return None
+        positions = dataset.positions(country)
+        if positions is None:
+            return None
+        date_positions = _date_positions(dataset.dates, date)
+        if date_positions is None:
+            return None
+        values = array("d")
+        with (self.path / dataset.name / f"{_slug(indicator)}.f64").open("rb") as inf:
+            values.fromfile(inf, len(dataset.countries) * len(dataset.dates))
+        indicator_field = {"id": indicator, "value": dataset.indicators[indicator]}
+        rows = []
+        for position in positions:
+            country_id, country_name, iso3 = dataset.countries[position]
+            country_field = {"id": country_id, "value": country_name}
+            offset = position * len(dataset.dates)
+            for date_position in date_positions:
+                value = values[offset + date_position]
+                rows.append(
+                    {
+                        "indicator": dict(indicator_field),
+                        "country": dict(country_field),
+                        "countryiso3code": iso3,
+                        "date": dataset.dates[date_position],
+                        "value": None if math.isnan(value) else value,
+                        "unit": "",
+                        "obs_status": "",
+                        "decimal": 0,
+                    }
+                )
+        last_updated = (
+            dt.datetime.strptime(dataset.last_updated, "%Y-%m-%d")
+            if dataset.last_updated
+            else None
+        )
+        if compact:
+            return fetcher.CompactResult(rows, last_updated=last_updated)
+        return fetcher.Result(rows, last_updated=last_updated)
+
+
+def _years(date: str | None) -> tuple[str | None, str | None] | None:
+    """
+    Parse a date query into first and last years, `(None, None)` for all
+    years, or `None` if it isn't a year or range of years
+    """
+    if date is None:
+        return None, None
+    match = DATE_PATTERN.match(date)
+    if match is None:
+        return None
+    start, end = sorted((match[1], match[2] or match[1]))
+    return start, end
+
+
+def _date_positions(years: Sequence[str], date: str | None) -> range | None:
+    """
+    Get the positions of the years in a date query, or `None` if it isn't a
+    year or range of years, or not every year in it is held
+    """
+    bounds = _years(date)
+    if bounds is None:
+        return None
+    start, end = bounds
+    if start is None or end is None:
+        return range(len(years))
+    held = [i for i, year in enumerate(years) if start <= year <= end]
+    if len(held) != int(end) - int(start) + 1:
+        return None
+    return range(held[0], held[-1] + 1)
+
+
+def _indicator_key(indicator: str) -> str:
+    """Normalize an indicator code, which the API matches in any case"""
+    return indicator.strip().upper()
+
+
+def _country_codes(country: str | Sequence[str]) -> list[str]:
+    """Normalize a country query into uppercase codes, or `["all"]`"""
+    if isinstance(country, str):
+        country = country.split(";")
+    codes = sorted({str(i).strip().upper() for i in country})
+    return ["all"] if "ALL" in codes else codes
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS observations (
+    indicator TEXT NOT NULL,
+    source TEXT NOT NULL,
+    country_id TEXT NOT NULL,
+    countryiso3code TEXT NOT NULL,
+    date TEXT NOT NULL,
+    value,
+    unit TEXT,
+    obs_status TEXT,
+    decimal INTEGER,
+    PRIMARY KEY (indicator, source, country_id, date)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS observations_iso3
+    ON observations (indicator, source, countryiso3code, date);
+CREATE TABLE IF NOT EXISTS indicators (
+    indicator TEXT NOT NULL,
+    source TEXT NOT NULL,
+    name TEXT,
+    last_updated TEXT,
+    PRIMARY KEY (indicator, source)
+);
+CREATE TABLE IF NOT EXISTS countries (
+    country_id TEXT PRIMARY KEY,
+    name TEXT,
+    position INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS coverage (
+    indicator TEXT NOT NULL,
+    source TEXT NOT NULL,
+    country TEXT NOT NULL,
+    first_year TEXT,
+    last_year TEXT,
+    fetched TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS coverage_lookup
+    ON coverage (indicator, source, country);
+"""
+
+
+class SQLiteStore:
+    """
+    A SQLite database of observations fetched from the API.
+
+    Parameters:
+        path: the path of the database file, or ":memory:"
+        max_age: how long fetched observations are used before they are
+            fetched again. Defaults to forever.
+        timer: a function returning the current time
+
+    The store can be shared between threads: its connection is only used
+    under `lock`.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_age: dt.timedelta | None = None,
+        timer: Callable[[], dt.datetime] = dt.datetime.now,
+    ):
+        self.path = path
+        self.max_age = max_age
+        self.timer = timer
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        """Close the database connection"""
+        with self.lock:
+            self.connection.close()
+
+    def _is_covered(
+        self,
+        indicator: str,
+        source: str,
+        country: str,
+        start: str | None,
+        end: str | None,
+    ) -> bool:
+        oldest = (
+            "" if self.max_age is None else (self.timer() - self.max_age).isoformat()
+        )
+        for covered_start, covered_end in self.connection.execute(
+            "SELECT first_year, last_year FROM coverage"
+            " WHERE indicator = ? AND source = ? AND country IN (?, 'all')"
+            " AND fetched >= ?",
+            (indicator, source, country, oldest),
+        ):
+            if covered_start is None or (
+                start is not None and covered_start <= start and end <= covered_end
+            ):
+                return True
+        return False
+
+    def missing(
+        self,
+        indicator: str,
+        country: str | Sequence[str] = "all",
+        date: str | None = None,
+        source: int | str | None = None,
+    ) -> list[str] | None:
+        """
+        Find the countries a query needs to fetch before it can be answered
+        from the store.
+
+        Parameters:
+            indicator: the indicator code
+            country: "all", or a country code or ;-separated string or sequence
+                of them, as for `Client.get_data`
+            date: a year or a range of years in the API format, "YYYY" or
+                "YYYY:YYYY"
+            source: the source id, if any
+
+        Returns:
+            the country codes to fetch, `["all"]` if the whole query must be
+                fetched, an empty list if the store covers the query, or
+                `None` if the store can't hold the query because its dates
+                aren't years
+        """
+        years = _years(date)
+        if years is None:
+            return None
+        source_key = "" if source is None else str(source)
+        indicator_key = _indicator_key(indicator)
+        with self.lock:
+            return [
+                code
+                for code in _country_codes(country)
+                if not self._is_covered(indicator_key, source_key, code, *years)
+            ]
+
+    def upsert(
+        self,
+        indicator: str,
+        rows: fetcher.Result,
+        country: str | Sequence[str] = "all",
+        date: str | None = None,
+        source: int | str | None = None,
+    ) -> None:
+        """
+        Add fetched observations to the store, replacing any stored values
+        for the same countries and years, and record that the query is
+        covered.
+
+        Parameters:
+            indicator: the indicator code
+            rows: the rows returned by the API for the query
+            country: the countries the rows were fetched for, as for `query`
+            date: the years the rows were fetched for, as for `query`
+            source: the source id the rows were fetched for, if any
+        """
+        years = _years(date)
+        if years is None:
+            raise ValueError(f"Can't store observations for dates {date!r}")
+        source_key = "" if source is None else str(source)
+        indicator_key = _indicator_key(indicator)
+        codes = _country_codes(country)
+        with self.lock, self.connection:
+            cursor = self.connection.cursor()
+            if codes == ["all"]:
+                # A query for all countries gives the API's order of countries
+                position = 0
+                insert_country = (
+                    "INSERT INTO countries VALUES (?, ?, ?)"
+                    " ON CONFLICT (country_id) DO UPDATE"
+                    " SET name = excluded.name, position = excluded.position"
+                )
+            else:
+                (position,) = cursor.execute(
+                    "SELECT COALESCE(MAX(position) + 1, 0) FROM countries"
+                ).fetchone()
+                insert_country = "INSERT OR IGNORE INTO countries VALUES (?, ?, ?)"
+            covered = set(codes)
+            seen = set()
+            for row in rows:
+                country_field = row["country"]
+                iso3 = row.get("countryiso3code") or ""
+                if country_field["id"] not in seen:
+                    seen.add(country_field["id"])
+                    covered.update(i.upper() for i in (country_field["id"], iso3) if i)
+                    cursor.execute(
+                        insert_country,
+                        (country_field["id"], country_field["value"], position),
+                    )
+                    position += 1
+                cursor.execute(
+                    "INSERT OR REPLACE INTO observations VALUES"
+                    " (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        indicator_key,
+                        source_key,
+                        country_field["id"],
+                        iso3,
+                        row["date"],
+                        row["value"],
+                        row.get("unit", ""),
+                        row.get("obs_status", ""),
+                        row.get("decimal", 0),
+                    ),
+                )
+                cursor.execute(
+                    "INSERT OR IGNORE INTO indicators VALUES (?, ?, ?, NULL)",
+                    (indicator_key, source_key, row["indicator"]["value"]),
+                )
+            if rows.last_updated is not None:
+                cursor.execute(
+                    "INSERT INTO indicators VALUES (?, ?, NULL, ?)"
+                    " ON CONFLICT (indicator, source)"
+                    " DO UPDATE SET last_updated = excluded.last_updated",
+                    (
+                        indicator_key,
+                        source_key,
+                        rows.last_updated.strftime("%Y-%m-%d"),
+                    ),
+                )
+            fetched = self.timer().isoformat()
+            cursor.executemany(
+                "INSERT INTO coverage VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (indicator_key, source_key, code, *years, fetched)
+                    for code in sorted(covered)
+                ),
+            )
+
+    def query(
+        self,
+        indicator: str,
+        country: str | Sequence[str] = "all",
+        date: str | None = None,
+        source: int | str | None = None,
+        compact: bool = False,
+    ) -> fetcher.Result | fetcher.CompactResult | None:
+        """
+        Answer an observation query from the store.
+
+        Rows are returned in the same format as the API returns them, ordered
+        by country, in the order of the last query for all countries, and
+        latest year first.
+
+        Parameters:
+            indicator: the indicator code
+            country: "all", or a country code or ;-separated string or sequence
+                of them, as for `Client.get_data`
+            date: a year or a range of years in the API format, "YYYY" or
+                "YYYY:YYYY"
+            source: the source id, if any
+            compact: if True, return a `fetcher.CompactResult`
+
+        Returns:
+            the observations, or `None` if the store doesn't cover the query
+        """
+        with self.lock:
+            years = _years(date)
+            if years is None or self.missing(indicator, country, date, source) != []:
+                return None
+            start, end = years
+            source_key = "" if source is None else str(source)
+            sql = (
+                "SELECT o.country_id, c.name, o.countryiso3code, o.date, o.value,"
+                " o.unit, o.obs_status, o.decimal"
+                " FROM observations AS o JOIN countries AS c USING (country_id)"
+                " WHERE o.indicator = ? AND o.source = ?"
+            )
+            indicator_key = _indicator_key(indicator)
+            params: list[Any] = [indicator_key, source_key]
+            codes = _country_codes(country)
+            if codes != ["all"]:
+                placeholders = ", ".join("?" * len(codes))
+                sql += (
+                    f" AND (o.country_id IN ({placeholders})"
+                    f" OR o.countryiso3code IN ({placeholders}))"
+                )
+                params += codes * 2
+            if start is not None:
+                sql += " AND o.date BETWEEN ? AND ?"
+                params += [start, end]
+            sql += " ORDER BY c.position, o.date DESC"
+            name, last_updated = self.connection.execute(
+                "SELECT name, last_updated FROM indicators"
+                " WHERE indicator = ? AND source = ?",
+                (indicator_key, source_key),
+            ).fetchone() or (None, None)
+            indicator_field = {"id": indicator, "value": name}
+            rows = (
+                {
+                    "indicator": dict(indicator_field),
+                    "country": {"id": country_id, "value": country_name},
+                    "countryiso3code": iso3,
+                    "date": date_,
+                    "value": value,
+                    "unit": unit,
+                    "obs_status": obs_status,
+                    "decimal": decimal,
+                }
+                for (
+                    country_id,
+                    country_name,
+                    iso3,
+                    date_,
+                    value,
+                    unit,
+                    obs_status,
+                    decimal,
+                ) in self.connection.execute(sql, params)
+            )
+            last_updated = (
+                dt.datetime.strptime(last_updated, "%Y-%m-%d") if last_updated else None
+            )
+            if compact:
+                return fetcher.CompactResult(rows, last_updated=last_updated)
+            return fetcher.Result(rows, last_updated=last_updated)
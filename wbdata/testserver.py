@@ -0,0 +1,615 @@
+"""
+wbdata.testserver: a local stand-in for the World Bank API
+
+The stand-in server serves a deterministic synthetic dataset through the same
+`v2` endpoints that `wbdata.client.Client` uses, with World Bank style paging
+headers and error messages. Latency, HTTP errors and stalled responses can be
+injected to exercise retries, timeouts and pagination.
+
+Point a client at it with `Client(base_url=server.base_url)` or by setting the
+`WBDATA_BASE_URL` environment variable. The server can also be run from the
+command line with `python -m wbdata.testserver`.
+"""
+
+import argparse
+import dataclasses
+import functools
+import http.server
+import json
+import random
+import re
+import string
+import threading
+import time
+import urllib.parse
+import zlib
+from collections import deque
+from collections.abc import Sequence
+from typing import Any, Literal
+
+LAST_UPDATED = "2024-06-28"
+DEFAULT_PER_PAGE = 50
+
+INCOME_LEVELS = [
+    {"id": "HIC", "iso2code": "XD", "value": "High income"},
+    {"id": "LIC", "iso2code": "XM", "value": "Low income"},
+    {"id": "LMC", "iso2code": "XN", "value": "Lower middle income"},
+    {"id": "LMY", "iso2code": "XO", "value": "Low & middle income"},
+    {"id": "MIC", "iso2code": "XP", "value": "Middle income"},
+    {"id": "UMC", "iso2code": "XT", "value": "Upper middle income"},
+    {"id": "INX", "iso2code": "XY", "value": "Not classified"},
+]
+LENDING_TYPES = [
+    {"id": "IBD", "iso2code": "XF", "value": "IBRD"},
+    {"id": "IDB", "iso2code": "XH", "value": "Blend"},
+    {"id": "IDX", "iso2code": "XI", "value": "IDA only"},
+    {"id": "LNX", "iso2code": "XX", "value": "Not classified"},
+]
+REGIONS = [
+    {"id": "EAS", "iso2code": "Z4", "value": "East Asia & Pacific"},
+    {"id": "ECS", "iso2code": "Z7", "value": "Europe & Central Asia"},
+    {"id": "LCN", "iso2code": "ZJ", "value": "Latin America & Caribbean "},
+    {"id": "MEA", "iso2code": "ZQ", "value": "Middle East & North Africa"},
+    {"id": "NAC", "iso2code": "XU", "value": "North America"},
+    {"id": "SAS", "iso2code": "8S", "value": "South Asia"},
+    {"id": "SSF", "iso2code": "ZG", "value": "Sub-Saharan Africa "},
+]
+SOURCES = [
+    {"id": "2", "name": "World Development Indicators", "code": "WDI"},
+    {"id": "11", "name": "Africa Development Indicators", "code": "ADI"},
+    {"id": "15", "name": "Global Economic Monitor", "code": "GEM"},
+]
+TOPICS = [
+    {"id": "1", "value": "Agriculture & Rural Development  "},
+    {"id": "3", "value": "Economy & Growth "},
+    {"id": "4", "value": "Education "},
+    {"id": "8", "value": "Health "},
+    {"id": "19", "value": "Climate Change"},
+]
+
+PATTERN_DATE = re.compile(r"(\d{4})(?:([MQ])(\d{1,2}))?")
+
+
+class APIError(Exception):
+    """An error reported in the body of a response, as the World Bank API does"""
+
+    def __init__(self, id_: str, key: str, value: str):
+        super().__init__(value)
+        self.message = {"id": id_, "key": key, "value": value}
+
+
+def _invalid_value() -> APIError:
+    return APIError("120", "Invalid value", "The provided parameter value is not valid")
+
+
+def random_code(rng: random.Random, length: int, used: set[str]) -> str:
+    """
+    Generate an upper-case code, such as a country code, that isn't in `used`,
+    and add it to `used`.
+
+    Parameters:
+        rng: the random number generator
+        length: the number of letters
+        used: the codes generated so far
+    """
+    while True:
+        code = "".join(rng.choices(string.ascii_uppercase, k=length))
+        if code not in used:
+            used.add(code)
+            return code
+
+
+def random_name(rng: random.Random, words: int) -> str:
+    """Generate a name of capitalized, pronounceable words"""
+    syllables = ["ar", "be", "co", "da", "el", "fi", "ga", "ho", "is", "ju", "ka"]
+    return " ".join(
+        "".join(rng.choices(syllables, k=rng.randint(2, 4))).capitalize()
+        for _ in range(words)
+    )
+
+
+@dataclasses.dataclass(frozen=True)
+class Dataset:
+    """
+    A deterministic synthetic World Bank dataset.
+
+    Observation values are derived from a checksum of the indicator, country
+    and date, so datasets of any size can be served without being stored.
+
+    Parameters:
+        n_countries: number of economies, in addition to regional and income
+            level aggregates
+        n_indicators: number of indicators
+        first_year: first year with observations
+        last_year: last year with observations
+        missing_rate: approximate share of observations with null values
+        last_updated: the `lastupdated` value reported for every source
+        seed: seed for generating names and codes
+        named_indicators: the id, name and source id of indicators to serve
+            in place of the first generated ones, such as real indicators
+            that benchmarks or examples query
+    """
+
+    n_countries: int = 50
+    n_indicators: int = 20
+    first_year: int = 1960
+    last_year: int = 2023
+    missing_rate: float = 0.2
+    last_updated: str = LAST_UPDATED
+    seed: int = 0
+    named_indicators: tuple[tuple[str, str, str], ...] = ()
+
+    @functools.cached_property
+    def countries(self) -> list[dict[str, Any]]:
+        """Country and aggregate metadata, in API order"""
+        rng = random.Random(self.seed)
+        used_iso2 = {i["iso2code"] for i in REGIONS + INCOME_LEVELS}
+        used_iso3 = {i["id"] for i in REGIONS + INCOME_LEVELS} | {"WLD"}
+        aggregate = {"id": "NA", "iso2code": "NA", "value": "Aggregates"}
+        blank = {"id": "", "iso2code": "", "value": ""}
+        countries = [
+            {
+                "id": random_code(rng, 3, used_iso3),
+                "iso2Code": random_code(rng, 2, used_iso2),
+                "name": random_name(rng, rng.randint(1, 3)),
+                "region": rng.choice(REGIONS),
+                "adminregion": blank,
+                "incomeLevel": rng.choice(
+                    [i for i in INCOME_LEVELS if i["id"] not in ("LMY", "MIC")]
+                ),
+                "lendingType": rng.choice(LENDING_TYPES),
+                "capitalCity": random_name(rng, 1),
+                "longitude": f"{rng.uniform(-180, 180):.4f}",
+                "latitude": f"{rng.uniform(-90, 90):.4f}",
+            }
+            for _ in range(self.n_countries)
+        ]
+        aggregates = [
+            {
+                "id": i["id"],
+                "iso2Code": i["iso2code"],
+                "name": i["value"].strip(),
+                "region": aggregate,
+                "adminregion": blank,
+                "incomeLevel": aggregate,
+                "lendingType": aggregate,
+                "capitalCity": "",
+                "longitude": "",
+                "latitude": "",
+            }
+            for i in [
+                *REGIONS,
+                *INCOME_LEVELS[:-1],
+                {"id": "WLD", "iso2code": "1W", "value": "World"},
+            ]
+        ]
+        return sorted(countries + aggregates, key=lambda c: c["id"])
+
+    @functools.cached_property
+    def indicators(self) -> list[dict[str, Any]]:
+        """Indicator metadata, in API order"""
+        rng = random.Random(self.seed + 1)
+        used: set[str] = set()
+        sources = {source["id"]: source for source in SOURCES}
+        indicators = [
+            {
+                "id": ".".join(random_code(rng, 4, used) for _ in range(3)),
+                "name": random_name(rng, rng.randint(3, 8)),
+                "unit": "",
+                "source": {"id": source["id"], "value": source["name"]},
+                "sourceNote": " ".join(
+                    random_name(rng, 1) for _ in range(rng.randint(10, 40))
+                ),
+                "sourceOrganization": random_name(rng, rng.randint(2, 5)),
+                "topics": rng.sample(TOPICS, k=rng.randint(0, 2)),
+            }
+            for source in (SOURCES[i % len(SOURCES)] for i in range(self.n_indicators))
+        ]
+        for indicator, (id_, name, source_id) in zip(
+            indicators, self.named_indicators, strict=False
+        ):
+            source = sources[source_id]
+            indicator.update(
+                id=id_, name=name, source={"id": source_id, "value": source["name"]}
+            )
+        return indicators
+
+    @property
+    def sources(self) -> list[dict[str, Any]]:
+        """Source metadata"""
+        return [
+            {
+                "id": source["id"],
+                "lastupdated": self.last_updated,
+                "name": source["name"],
+                "code": source["code"],
+                "description": "",
+                "url": "",
+                "dataavailability": "Y",
+                "metadataavailability": "Y",
+                "concepts": "3",
+            }
+            for source in SOURCES
+        ]
+
+    def value(self, indicator: str, country: str, date: str) -> float | None:
+        """The value of an observation"""
+        checksum = zlib.crc32(f"{indicator}|{country}|{date}".encode())
+        if checksum % 1000 < self.missing_rate * 1000:
+            return None
+        return round(checksum / 1000, 3)
+
+
+def _parse_ids(part: str) -> list[str]:
+    return [i for i in part.split(";") if i]
+
+
+def _select(
+    rows: list[dict[str, Any]], ids: list[str], fields: Sequence[str] = ("id",)
+) -> list[dict[str, Any]]:
+    wanted = {i.upper() for i in ids}
+    selected = [
+        row for row in rows if any(str(row[f]).upper() in wanted for f in fields)
+    ]
+    if not selected:
+        raise _invalid_value()
+    return selected
+
+
+def _expand_dates(param: str | None, dataset: Dataset) -> list[str]:
+    """Return the requested dates, newest first, as the API does"""
+    if not param:
+        return [str(y) for y in range(dataset.last_year, dataset.first_year - 1, -1)]
+    bounds = param.split(":")
+    matches = [PATTERN_DATE.fullmatch(bound) for bound in bounds]
+    if len(bounds) > 2 or not all(matches):
+        raise _invalid_value()
+    start, end = matches[0], matches[-1]
+    assert start and end
+    freq = start.group(2)
+    if freq != end.group(2):
+        raise _invalid_value()
+    if freq is None:
+        return [str(y) for y in range(int(end.group(1)), int(start.group(1)) - 1, -1)]
+    per_year = 12 if freq == "M" else 4
+    first = int(start.group(1)) * per_year + int(start.group(3)) - 1
+    last = int(end.group(1)) * per_year + int(end.group(3)) - 1
+    return [
+        f"{i // per_year}{freq}{i % per_year + 1:02d}"
+        if freq == "M"
+        else f"{i // per_year}{freq}{i % per_year + 1}"
+        for i in range(last, first - 1, -1)
+    ]
+
+
+def _paginate(
+    rows: list[Any], params: dict[str, str], max_per_page: int | None
+) -> tuple[dict[str, Any], list[Any]]:
+    try:
+        per_page = int(params.get("per_page", DEFAULT_PER_PAGE))
+        page = int(params.get("page", 1))
+    except ValueError as e:
+        raise _invalid_value() from e
+    if max_per_page:
+        per_page = min(per_page, max_per_page)
+    pages = max(1, -(-len(rows) // per_page))
+    header = {"page": page, "pages": pages, "per_page": per_page, "total": len(rows)}
+    return header, rows[(page - 1) * per_page : page * per_page]
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        assert isinstance(self.server, _HTTPServer)
+        stand_in = self.server.stand_in
+        parsed = urllib.parse.urlsplit(self.path)
+        params = dict(urllib.parse.parse_qsl(parsed.query))
+        stand_in._record(parsed.path, params)
+        if stand_in.latency:
+            time.sleep(stand_in.latency)
+        fault = stand_in._next_fault()
+        if fault == "timeout":
+            time.sleep(stand_in.stall)
+        elif fault is not None:
+            self._send_error(fault)
+            return
+        try:
+            body: Any = stand_in.route(parsed.path, params)
+        except APIError as e:
+            body = [{"message": [e.message]}]
+        except LookupError:
+            self._send_error(404)
+            return
+        self._send(200, json.dumps(body), "application/json;charset=utf-8")
+
+    def _send_error(self, status: int) -> None:
+        headers = {"Retry-After": "1"} if status == 429 else {}
+        self._send(
+            status,
+            f"<html><body><h1>{status} {self.responses[status][0]}</h1></body></html>",
+            "text/html",
+            headers,
+        )
+
+    def _send(
+        self,
+        status: int,
+        body: str,
+        content_type: str,
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        encoded = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(encoded)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(encoded)
+
+
+class _HTTPServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    stand_in: "StandInServer"
+
+
+class StandInServer:
+    """
+    A local HTTP server that mimics the World Bank API.
+
+    Faults are injected before a response is built. A fault is either an HTTP
+    status code, which is returned with an HTML body as the real API's gateway
+    does, or `"timeout"`, which stalls the response for `stall` seconds.
+
+    Parameters:
+        dataset: the data to serve
+        host: the interface to listen on
+        port: the port to listen on; 0 picks a free port
+        latency: seconds to wait before answering each request
+        error_rate: probability that a request fails with one of
+            `error_statuses`
+        error_statuses: HTTP statuses used for random errors
+        timeout_rate: probability that a request stalls
+        stall: seconds a stalled request waits before answering
+        max_per_page: largest page size the server honors, to force
+            pagination
+        seed: seed for random fault injection
+    """
+
+    def __init__(
+        self,
+        dataset: Dataset | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        error_statuses: Sequence[int] = (429, 500, 502, 503),
+        timeout_rate: float = 0.0,
+        stall: float = 30.0,
+        max_per_page: int | None = None,
+        seed: int = 0,
+    ):
+        self.dataset = dataset or Dataset()
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.timeout_rate = timeout_rate
+        self.stall = stall
+        self.max_per_page = max_per_page
+        self.requests: list[tuple[str, dict[str, str]]] = []
+        self._faults: deque[int | Literal["timeout"]] = deque()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = _HTTPServer((host, port), _Handler)
+        self._httpd.stand_in = self
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        """The equivalent of `https://api.worldbank.org/v2` for this server"""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host!s}:{port}/v2"
+
+    def start(self) -> "StandInServer":
+        """Start serving in a background thread"""
+        self._thread = threading.Thread(
+            target=self.serve_forever, name="wbdata-testserver", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """Serve in the calling thread until `stop` is called from another"""
+        self._httpd.serve_forever()
+
+    def close(self) -> None:
+        """Release the port. The server must not be serving."""
+        self._httpd.server_close()
+
+    def stop(self) -> None:
+        """Stop serving and release the port"""
+        self._httpd.shutdown()
+        self.close()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "StandInServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def fail_next(self, *faults: int | Literal["timeout"]) -> None:
+        """
+        Queue faults for the next requests, in order.
+
+        Parameters:
+            faults: HTTP status codes or `"timeout"`
+        """
+        with self._lock:
+            self._faults.extend(faults)
+
+    def _record(self, path: str, params: dict[str, str]) -> None:
+        with self._lock:
+            self.requests.append((path, params))
+
+    def _next_fault(self) -> int | Literal["timeout"] | None:
+        with self._lock:
+            if self._faults:
+                return self._faults.popleft()
+            roll = self._rng.random()
+        if roll < self.error_rate:
+            return self._rng.choice(self.error_statuses)
+        if roll < self.error_rate + self.timeout_rate:
+            return "timeout"
+        return None
+
+    def route(self, path: str, params: dict[str, str]) -> list[Any]:
+        """
+        Build the response body for a request.
+
+        Parameters:
+            path: the request path, starting with `/v2`
+            params: the query parameters
+
+        Returns:
+            the `[header, rows]` response body
+
+        Raises:
+            APIError: for requests the API answers with an error message
+            LookupError: for unknown endpoints
+        """
+        parts = [urllib.parse.unquote(i) for i in path.strip("/").split("/")]
+        if not parts or parts[0].lower() != "v2":
+            raise LookupError(path)
+        parts = parts[1:]
+        endpoint = parts[0].lower() if parts else ""
+        ids = _parse_ids(parts[1]) if len(parts) > 1 else []
+        dataset = self.dataset
+        extra: dict[str, Any] = {}
+        rows: list[dict[str, Any]]
+        if endpoint == "countries" and len(parts) == 4 and parts[2] == "indicators":
+            rows = self._observations(ids, parts[3], params)
+            source = params.get("source", "2")
+            extra = {"sourceid": source, "lastupdated": dataset.last_updated}
+        elif endpoint == "countries" and len(parts) <= 2:
+            rows = dataset.countries
+            if ids and ids != ["all"]:
+                rows = _select(rows, ids, ("id", "iso2Code"))
+            for param, field in (
+                ("incomeLevel", "incomeLevel"),
+                ("lendingType", "lendingType"),
+            ):
+                if param in params:
+                    wanted = {i.upper() for i in _parse_ids(params[param])}
+                    rows = [row for row in rows if row[field]["id"] in wanted]
+        elif endpoint == "indicators" and len(parts) <= 2:
+            rows = dataset.indicators
+            if ids and ids != ["all"]:
+                rows = _select(rows, ids)
+        elif endpoint in ("sources", "topics") and len(parts) == 3:
+            if parts[2] != "indicators":
+                raise LookupError(path)
+            field = "source" if endpoint == "sources" else "topics"
+            wanted = set(ids)
+            rows = [
+                row
+                for row in dataset.indicators
+                if (
+                    row[field]["id"] in wanted
+                    if field == "source"
+                    else any(t["id"] in wanted for t in row[field])
+                )
+            ]
+        elif endpoint in ("sources", "topics", "incomelevels", "lendingtypes") and (
+            len(parts) <= 2
+        ):
+            rows = {
+                "sources": dataset.sources,
+                "topics": TOPICS,
+                "incomelevels": INCOME_LEVELS,
+                "lendingtypes": LENDING_TYPES,
+            }[endpoint]
+            if ids and ids != ["all"]:
+                rows = _select(rows, ids)
+        else:
+            raise LookupError(path)
+        header, page = _paginate(rows, params, self.max_per_page)
+        if not extra:
+            # Metadata endpoints report paging information as strings
+            header = {k: str(v) for k, v in header.items()}
+        return [{**header, **extra}, page]
+
+    def _observations(
+        self, ids: list[str], indicator_id: str, params: dict[str, str]
+    ) -> list[dict[str, Any]]:
+        dataset = self.dataset
+        countries = dataset.countries
+        if ids != ["all"]:
+            countries = _select(countries, ids, ("id", "iso2Code"))
+        indicators = [i for i in dataset.indicators if i["id"] == indicator_id.upper()]
+        if not indicators or (
+            "source" in params and indicators[0]["source"]["id"] != params["source"]
+        ):
+            raise APIError(
+                "175",
+                "Invalid format",
+                "The indicator was not found. It may have been deleted or archived.",
+            )
+        indicator = {"id": indicators[0]["id"], "value": indicators[0]["name"]}
+        dates = _expand_dates(params.get("date"), dataset)
+        return [
+            {
+                "indicator": indicator,
+                "country": {"id": country["iso2Code"], "value": country["name"]},
+                "countryiso3code": country["id"],
+                "date": date,
+                "value": dataset.value(indicator["id"], country["id"], date),
+                "unit": "",
+                "obs_status": "",
+                "decimal": 1,
+            }
+            for country in countries
+            for date in dates
+        ]
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m wbdata.testserver",
+        description="Serve a local stand-in for the World Bank API",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--countries", type=int, default=Dataset.n_countries)
+    parser.add_argument("--indicators", type=int, default=Dataset.n_indicators)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--stall", type=float, default=30.0)
+    parser.add_argument("--max-per-page", type=int, default=None)
+    args = parser.parse_args(argv)
+    server = StandInServer(
+        dataset=Dataset(n_countries=args.countries, n_indicators=args.indicators),
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        timeout_rate=args.timeout_rate,
+        stall=args.stall,
+        max_per_page=args.max_per_page,
+    )
+    print(f"Serving World Bank API stand-in at {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
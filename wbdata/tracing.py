@@ -0,0 +1,151 @@
+"""
+wbdata.tracing: instrumentation hooks for the fetch pipeline
+
+A hook is any callable that accepts a `Span`. Hooks are called twice for each
+span: once when the span starts (when `span.end` is `None`) and once when it
+finishes, with timing information and any attributes collected along the way.
+
+The spans emitted by wbdata are:
+
+* `fetch`: a complete query, possibly spanning several pages. Attributes:
+    `url`, `params`, `pages`, `rows`, and `resumed`, the page a download was
+    resumed after, or `deadline_exceeded` if the deadline passed.
+* `cache_lookup`: a cache check for a single page. Attributes: `url`,
+    `params`, `hit`, `bytes`.
+* `http_request`: a request for a single page. Attributes: `url`, `params`,
+    `bytes`.
+* `json_decode`: decoding a single page. Attributes: `bytes`, `rows`,
+    `codec`.
+* `retry`: the wait before a page that failed is tried again. Attributes:
+    `url`, `params`, `error`, `wait`.
+* `plan`: answering a query by selecting rows from a cached query that
+    covers it. Attributes: `url`, `covering_url`, `covering_params`, `rows`
+    (`None` if the rows couldn't be selected and the query was fetched).
+* `postprocess`: post-processing of the rows for a query. Attributes: `rows`.
+* `to_pandas`: conversion of a query result to pandas in
+    `Client.get_series`. Attributes: `indicator`, `rows`.
+* `search_index_update`: syncing the indicator search index with the catalog
+    in `Client.search_indicators`. Attributes: `rows`, `changes`.
+* `to_polars`: conversion of a query result to Polars in `Client.get_series`
+    and `Client.get_dataframe`. Attributes: `indicator`, `rows`.
+* `to_arrow`: conversion of a query result to an Arrow table in
+    `Client.get_table` and `Client.export_parquet`. Attributes: `indicator`,
+    `rows`.
+* `store_query`: a lookup of a query in the local store in
+    `Client.get_data`. Attributes: `indicator`, `hit`, `rows`, and for a
+    `SQLiteStore`, `fetched`, the countries fetched to fill it in.
+
+When responses are streamed, decoding happens as rows are consumed: the
+`http_request` span (or `json_decode` span for cached responses) covers the
+consumption of a page's rows, has a `streamed` attribute and also reports
+`rows`.
+"""
+
+import contextlib
+import contextvars
+import dataclasses
+import logging
+import time
+from collections.abc import Callable, Generator, Iterable
+from typing import Any
+
+log = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class Span:
+    """
+    A timed section of the fetch pipeline.
+
+    Parameters:
+        name: the name of the span
+        attributes: information about the operation, such as urls and sizes
+        start: the `time.perf_counter` value when the span started
+        end: the `time.perf_counter` value when the span finished, or `None`
+            if it is still running
+        parent: the span that was running when this span started, if any
+        error: the exception that ended the span, if any
+    """
+
+    name: str
+    attributes: dict[str, Any]
+    start: float
+    end: float | None = None
+    parent: "Span | None" = None
+    error: BaseException | None = None
+
+    @property
+    def duration(self) -> float | None:
+        """The duration of the span in seconds, or `None` if still running"""
+        return None if self.end is None else self.end - self.start
+
+
+Hook = Callable[[Span], None]
+
+_current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar(
+    "wbdata_current_span", default=None
+)
+
+
+class Tracer:
+    """
+    Dispatches spans to registered hooks.
+
+    Errors raised by hooks are logged and otherwise ignored so that
+    instrumentation can never break a query.
+
+    Parameters:
+        hooks: callables to receive spans
+    """
+
+    def __init__(self, hooks: Iterable[Hook] | None = None):
+        self.hooks: list[Hook] = list(hooks or [])
+
+    def add_hook(self, hook: Hook) -> None:
+        """Register a hook"""
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook: Hook) -> None:
+        """Unregister a hook"""
+        self.hooks.remove(hook)
+
+    def _dispatch(self, span: Span) -> None:
+        # Copied so hooks can be added or removed by other threads
+        for hook in tuple(self.hooks):
+            try:
+                hook(span)
+            except Exception:
+                log.exception(f"Tracing hook {hook!r} failed")
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes: Any) -> Generator[Span, None, None]:
+        """
+        Time a section of code.
+
+        Attributes can be added to the yielded span while it runs, and will be
+        available to hooks when it finishes.
+
+        Parameters:
+            name: the name of the span
+            **attributes: initial attributes of the span
+        """
+        if not self.hooks:
+            yield Span(name=name, attributes=attributes, start=0.0)
+            return
+        span = Span(
+            name=name,
+            attributes=attributes,
+            start=time.perf_counter(),
+            parent=_current_span.get(),
+        )
+        token = _current_span.set(span)
+        self._dispatch(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = e
+            raise
+        finally:
+            span.end = time.perf_counter()
+            _current_span.reset(token)
+            self._dispatch(span)
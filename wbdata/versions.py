@@ -0,0 +1,125 @@
+"""
+wbdata.versions: keep cached data until its source is updated
+
+Every source in the API's list of sources has a `lastupdated` date, and
+every page of observations reports the `lastupdated` date of its source.
+Rather than expiring cached data after a fixed TTL, a `SourceVersions`
+object reloads the list of sources at most once per interval, and a cached
+page is used as long as its date matches its source's current date. When a
+source is updated, its cached pages are fetched again the next time they are
+used, and pages of other sources are kept.
+"""
+
+import datetime as dt
+import itertools
+import logging
+import threading
+import urllib.parse
+from collections.abc import Callable, Hashable, Iterable
+from typing import Any
+
+from . import planner
+
+log = logging.getLogger(__name__)
+
+#: The source of observation queries that don't give one
+DEFAULT_SOURCE = "2"
+
+#: The TTL of cached pages whose source is tracked
+VERSIONED_TTL = dt.timedelta(days=365)
+
+
+def key_source(key: Hashable, default: bool = True) -> str | None:
+    """
+    Get the source id a cache key is for
+
+    Parameters:
+        key: a cache key, as a (url, params) pair
+        default: if True, observation queries without a source are for
+            `DEFAULT_SOURCE`
+
+    Returns:
+        the source id, given by a `source` parameter or a `sources/{id}` part
+            of the url, or `None` if the key isn't for a source
+    """
+    if not isinstance(key, tuple) or len(key) != 2:
+        return None
+    url, params = key
+    try:
+        params = dict(params)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(url, str):
+        return None
+    for name, value in params.items():
+        if isinstance(name, str) and name.lower() == "source":
+            return str(value)
+    segments = urllib.parse.urlsplit(url).path.split("/")
+    for name, value in itertools.pairwise(segments):
+        if name.lower() == "sources" and value:
+            return value
+    if default and planner.OBSERVATIONS_PATTERN.match(url):
+        return DEFAULT_SOURCE
+    return None
+
+
+class SourceVersions:
+    """
+    The `lastupdated` dates of sources, reloaded at most once per interval.
+
+    Parameters:
+        load: a function that returns the rows of the list of sources, each
+            with `id` and `lastupdated` fields, bypassing the cache
+        interval: how long to use the dates before reloading them
+        timer: a function returning the current time
+    """
+
+    def __init__(
+        self,
+        load: Callable[[], Iterable[dict[str, Any]]],
+        interval: dt.timedelta = dt.timedelta(hours=1),
+        timer: Callable[[], dt.datetime] = dt.datetime.now,
+    ):
+        self.load = load
+        self.interval = interval
+        self.timer = timer
+        self._versions: dict[str, str] = {}
+        self._loaded: dt.datetime | None = None
+        self._lock = threading.Lock()
+
+    def versions(self) -> dict[str, str]:
+        """Get the `lastupdated` date of each source, by id"""
+        with self._lock:
+            now = self.timer()
+            if self._loaded is None or now - self._loaded > self.interval:
+                try:
+                    rows = self.load()
+                except Exception:
+                    # Checking versions should never make a query fail, so
+                    # keep the last dates and try again after the interval
+                    log.exception("Couldn't load source versions")
+                else:
+                    self._versions = {
+                        str(row["id"]).upper(): row["lastupdated"]
+                        for row in rows
+                        if row.get("lastupdated")
+                    }
+                self._loaded = now
+            return self._versions
+
+    def is_current(self, source: str | None, last_updated: str | None) -> bool:
+        """
+        Whether a page is from the current version of its source
+
+        Parameters:
+            source: the id of the page's source
+            last_updated: the `lastupdated` date of the page
+
+        Returns:
+            False if the source's current date is known and differs from the
+                page's, otherwise True
+        """
+        if source is None or not last_updated:
+            return True
+        current = self.versions().get(str(source).upper())
+        return current is None or current == last_updated